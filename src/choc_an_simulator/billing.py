@@ -0,0 +1,236 @@
+"""
+Batch service billing.
+
+Clinics that keep their own records upload each day's services as a batch, rather than entering
+them one at a time with record_service_billing_entry. A batch is a CSV, Parquet or JSON lines
+file with a row per service, and the columns:
+    service_date_utc: Date the service was provided.
+    provider_id: ID of the provider who provided the service.
+    member_id: ID of the member who received the service.
+    service_id: Code of the service, from the provider directory.
+    comments: Optional comments.
+
+Every row is validated in one vectorized pass: member IDs against the member eligibility
+sidecar, and provider IDs and service codes against the key indexes of their tables. Accepted
+rows are added to the service log in a single write, and rejected rows are returned along with
+the reasons they were rejected.
+
+Examples-
+    entries = read_service_billing_batch("clinic_2024-01-31.csv")
+    num_recorded, rejects = record_service_billing_batch(entries)
+"""
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import numpy as np
+import pandas as pd
+from .database_management import (
+    add_records_to_file,
+    contains_keys,
+    lookup_members_eligibility,
+)
+from .schemas import (
+    PROVIDER_DIRECTORY_INFO,
+    SERVICE_LOG_INFO,
+    USER_INFO,
+    RecordValidationError,
+)
+
+# Columns of a billing batch. Comments may be left out.
+BILLING_BATCH_COLUMNS = [
+    "service_date_utc",
+    "provider_id",
+    "member_id",
+    "service_id",
+    "comments",
+]
+# Column of the rejected rows that holds the reasons they were rejected.
+REJECT_REASON_COL = "reject_reason"
+_ID_COLS = ["provider_id", "member_id", "service_id"]
+# Range of IDs the service log's integer columns can hold.
+_ID_RANGE = np.iinfo(np.int64)
+
+
+def read_service_billing_batch(path: str) -> pd.DataFrame:
+    """
+    Read a batch of service billing entries from a file.
+
+    The format is chosen by the file's extension: .csv, .parquet, or .jsonl/.ndjson/.json
+    for JSON lines (one entry per line).
+
+    Args-
+        path (str): Path of the file.
+
+    Returns-
+        pd.DataFrame: The entries, with their values as they were read.
+
+    Raises-
+        ValueError: The file extension isn't a supported format, or the file can't be parsed.
+        OSError: The file can't be read.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    match extension:
+        case ".csv":
+            return pd.read_csv(path, dtype={"comments": "string"})
+        case ".parquet":
+            return pd.read_parquet(path)
+        case ".jsonl" | ".ndjson" | ".json":
+            return pd.read_json(path, lines=True, dtype={"comments": "string"})
+    raise ValueError(f"Unsupported billing batch format {extension} for {path}.")
+
+
+def record_service_billing_batch(
+    entries: pd.DataFrame, entry_datetime: Optional[datetime] = None
+) -> Tuple[int, pd.DataFrame]:
+    """
+    Validate a batch of service billing entries, and add the valid ones to the service log.
+
+    Rows are rejected if a value is missing or of the wrong type, the member doesn't exist or
+    is suspended, the provider doesn't exist, the service isn't in the provider directory, or
+    the comments are too long. The remaining rows are added to the service log in one write.
+
+    Args-
+        entries (pd.DataFrame): Entries with the columns in BILLING_BATCH_COLUMNS.
+            The comments column is optional.
+        entry_datetime (Optional[datetime]): Time the entries were received. Defaults to now.
+
+    Returns-
+        Tuple[int, pd.DataFrame]:
+            The number of entries recorded, and the rejected entries, indexed by their
+            position in the batch, with a REJECT_REASON_COL column explaining each rejection.
+
+    Raises-
+        KeyError: A required column is missing from the entries.
+        pyarrow.ArrowInvalid: A database file's format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        num_recorded, rejects = record_service_billing_batch(entries)
+        rejects.to_csv("rejects.csv")
+    """
+    missing = [col for col in BILLING_BATCH_COLUMNS[:-1] if col not in entries.columns]
+    if missing:
+        raise KeyError(f"Billing batch is missing the columns {missing}.")
+
+    entries = entries.reset_index(drop=True)
+    records, reasons = _convert_entries(entries)
+    _add_lookup_rejects(records, reasons)
+    _add_schema_rejects(records, reasons, entry_datetime or datetime.now())
+
+    rejected = [index for index in entries.index if reasons[index]]
+    accepted = records.drop(index=rejected)
+    if not accepted.empty:
+        add_records_to_file(accepted, SERVICE_LOG_INFO)
+
+    rejects = entries.loc[rejected].copy()
+    rejects[REJECT_REASON_COL] = ["; ".join(reasons[index]) for index in rejected]
+    return len(accepted), rejects
+
+
+def _convert_entries(
+    entries: pd.DataFrame,
+) -> Tuple[pd.DataFrame, Dict[object, List[str]]]:
+    """
+    Convert the entries' values to the types of the service log, noting any that can't be.
+
+    Returns-
+        Tuple[pd.DataFrame, Dict[object, List[str]]]:
+            The converted entries, and the reasons each entry is rejected (by index label).
+    """
+    reasons: Dict[object, List[str]] = {index: [] for index in entries.index}
+    records = pd.DataFrame(index=entries.index)
+
+    service_dates = pd.to_datetime(
+        entries["service_date_utc"], errors="coerce", format="mixed"
+    )
+    _note_rejects(reasons, service_dates.isna(), "invalid service_date_utc")
+    records["service_date_utc"] = service_dates.dt.date
+
+    for col in _ID_COLS:
+        ids = _parse_ids(entries[col])
+        _note_rejects(reasons, ids.isna(), f"invalid {col}")
+        records[col] = ids
+
+    comments = entries.get("comments", pd.Series(None, index=entries.index))
+    comments = comments.astype("string").astype(object)
+    records["comments"] = comments.where(comments.notna() & (comments != ""), None)
+    return records, reasons
+
+
+def _parse_ids(values: pd.Series) -> pd.Series:
+    """
+    Parse IDs as exact integers, without going through floats.
+
+    Returns-
+        pd.Series: The IDs, as Int64, with <NA> for each value that isn't a whole number in
+            the range of the service log's integer columns.
+    """
+    if pd.api.types.is_signed_integer_dtype(values):
+        return values.astype("Int64")
+    return pd.Series(
+        [_parse_id(value) for value in values], index=values.index, dtype="Int64"
+    )
+
+
+def _parse_id(value: Any) -> Optional[int]:
+    """Parse one ID as an exact integer, or None if it isn't a whole number in range."""
+    if isinstance(value, (bool, np.bool_)):
+        return None
+    if isinstance(value, (int, np.integer)):
+        parsed = int(value)
+    else:
+        try:
+            number = Decimal(str(value).strip())
+        except InvalidOperation:
+            return None
+        if not number.is_finite() or number != number.to_integral_value():
+            return None
+        parsed = int(number)
+    if not _ID_RANGE.min <= parsed <= _ID_RANGE.max:
+        return None
+    return parsed
+
+
+def _add_lookup_rejects(
+    records: pd.DataFrame, reasons: Dict[object, List[str]]
+) -> None:
+    """Reject entries whose member, provider or service isn't known, using the indexes."""
+    eligible = lookup_members_eligibility(records["member_id"])
+    has_member_id = records["member_id"].notna()
+    _note_rejects(reasons, has_member_id & eligible.isna(), "unknown member_id")
+    _note_rejects(reasons, eligible.eq(False).fillna(False), "member suspended")
+
+    for col, table_info in [
+        ("provider_id", USER_INFO),
+        ("service_id", PROVIDER_DIRECTORY_INFO),
+    ]:
+        has_id = records[col].notna()
+        known = pd.Series(False, index=records.index)
+        known[has_id] = contains_keys(table_info, records.loc[has_id, col])
+        _note_rejects(reasons, has_id & ~known, f"unknown {col}")
+
+
+def _add_schema_rejects(
+    records: pd.DataFrame, reasons: Dict[object, List[str]], entry_datetime: datetime
+) -> None:
+    """Reject entries the service log's schema doesn't allow, e.g. over-long comments."""
+    records.insert(0, "entry_datetime_utc", entry_datetime)
+    remaining = records.drop(index=[index for index in records.index if reasons[index]])
+    while not remaining.empty:
+        try:
+            SERVICE_LOG_INFO.check_dataframe(remaining)
+            return
+        except RecordValidationError as err:
+            for col, rows in err.violations.items():
+                for index in rows:
+                    reasons[index].append(f"invalid {col}")
+            remaining = remaining.drop(index=err.rows)
+
+
+def _note_rejects(
+    reasons: Dict[object, List[str]], mask: pd.Series, reason: str
+) -> None:
+    """Add a reason to every entry selected by a mask."""
+    for index in mask.index[np.asarray(mask, dtype=bool)]:
+        reasons[index].append(reason)
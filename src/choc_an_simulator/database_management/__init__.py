@@ -2,18 +2,67 @@
 Functions for database input/output operations in the ChocAn Simulator.
 
 Includes capabilities to add, load, update, and remove records in database files, as well as
-saving reports. The module works with Parquet and CSV file formats and ensures data integrity
+saving reports. The database can also be kept in SQLite or DuckDB, with set_storage_engine.
+Records can be loaded and queried as Arrow tables, with load_table and the functions of queries,
+or as pandas DataFrames.
+The module works with Parquet and CSV file formats and ensures data integrity
 and schema compatibility.
 """
 
-from .load_records import load_records_from_file
-from .edit_records import update_record, remove_record, add_records_to_file
-from .reports import save_report
+from .load_records import (
+    load_table,
+    load_records_from_file,
+    load_record_by_key,
+    contains_key,
+    contains_keys,
+)
+from .edit_records import (
+    update_record,
+    update_records,
+    remove_record,
+    remove_records,
+    add_records_to_file,
+)
+from .queries import filter_table, join_tables, aggregate_table
+from .reports import save_report, save_report_batches, save_reports
+from ._table_cache import set_table_cache_budget, table_version
+from ._eligibility import lookup_member_eligibility, lookup_members_eligibility
+from .migrations import migrate_provider_directory_prices, migrate_partitioned_tables
+from .transactions import Transaction, recover_transactions
+from .storage_engines import (
+    StorageEngine,
+    SQLiteEngine,
+    DuckDBEngine,
+    set_storage_engine,
+)
 
 __all__ = [
+    "load_table",
+    "filter_table",
+    "join_tables",
+    "aggregate_table",
     "load_records_from_file",
+    "load_record_by_key",
+    "contains_key",
+    "contains_keys",
     "update_record",
+    "update_records",
     "remove_record",
+    "remove_records",
     "add_records_to_file",
     "save_report",
+    "save_report_batches",
+    "save_reports",
+    "set_table_cache_budget",
+    "table_version",
+    "lookup_member_eligibility",
+    "lookup_members_eligibility",
+    "migrate_provider_directory_prices",
+    "migrate_partitioned_tables",
+    "Transaction",
+    "recover_transactions",
+    "StorageEngine",
+    "SQLiteEngine",
+    "DuckDBEngine",
+    "set_storage_engine",
 ]
@@ -0,0 +1,230 @@
+"""
+Member eligibility sidecar, for checking members in without reading the members file.
+
+The sidecar holds every member ID in sorted order, as an int64 array, with a parallel bitmap of
+which members are suspended. It's an Arrow IPC file (Arrow stores booleans as a bitmap),
+memory-mapped on load, so checking a member in is a binary search over the IDs and a single bit
+test. The sidecar is rebuilt whenever the members table is rewritten. It records the size &
+modification time of the files it was built from, and is rebuilt on the next lookup if records
+were appended or another process has changed the files since.
+"""
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ._parquet_utils import _convert_parquet_name_to_eligibility_path_, _list_segments_
+from .storage_engines import StorageEngine, _storage_engine_
+from ..schemas import MEMBER_INFO, TableInfo
+
+# Columns of the members table held by the sidecar.
+_ELIGIBILITY_SCHEMA = pa.schema([("member_id", pa.int64()), ("suspended", pa.bool_())])
+
+
+@dataclass(frozen=True)
+class _Eligibility:
+    """Sorted member IDs, and a parallel bitmap of which members are suspended."""
+
+    signature: str
+    member_ids: np.ndarray
+    suspended_bits: np.ndarray
+    suspended_offset: int
+
+    def lookup(self, member_id: Optional[int]) -> Optional[bool]:
+        """Whether a member is eligible: True if so, False if suspended, None if not a member."""
+        try:
+            member_id = np.int64(member_id)
+        except (TypeError, ValueError, OverflowError):
+            return None
+        position = int(np.searchsorted(self.member_ids, member_id))
+        if position == len(self.member_ids) or self.member_ids[position] != member_id:
+            return None
+        bit = position + self.suspended_offset
+        return not (self.suspended_bits[bit >> 3] >> (bit & 7)) & 1
+
+    def lookup_many(self, member_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Masks of which members exist, and which of those aren't suspended."""
+        positions = np.searchsorted(self.member_ids, member_ids)
+        found = positions < len(self.member_ids)
+        found[found] = self.member_ids[positions[found]] == member_ids[found]
+        bits = positions[found] + self.suspended_offset
+        eligible = np.zeros(len(member_ids), dtype=bool)
+        eligible[found] = (self.suspended_bits[bits >> 3] >> (bits & 7)) & 1 == 0
+        return found, eligible
+
+
+# Eligibility last loaded by this process, and the lock guarding it.
+_current_eligibility: Optional[_Eligibility] = None
+_eligibility_lock = threading.Lock()
+
+
+def lookup_member_eligibility(member_id: int) -> Optional[bool]:
+    """
+    Check whether a member is eligible for services, without reading the members file.
+
+    Args-
+        member_id (int): ID of the member.
+
+    Returns-
+        True: The member exists, and isn't suspended.
+        False: The member is suspended.
+        None: There's no member with the ID.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        if lookup_member_eligibility(123456789) is None:
+            print("Invalid")
+    """
+    return _up_to_date_eligibility().lookup(member_id)
+
+
+def lookup_members_eligibility(member_ids: Iterable[Optional[int]]) -> pd.Series:
+    """
+    Check whether many members are eligible for services, in one pass over the sidecar.
+
+    Args-
+        member_ids (Iterable[Optional[int]]): IDs of the members. Missing IDs are allowed.
+
+    Returns-
+        pd.Series: Nullable booleans, in the order given (keeping the index of a Series).
+            True if the member exists and isn't suspended, False if they're suspended, and
+            <NA> if there's no member with the ID.
+
+    Raises-
+        TypeError: An ID isn't an integer.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        eligible = lookup_members_eligibility(entries["member_id"])
+        entries = entries[eligible.fillna(False)]
+    """
+    member_ids = pd.Series(member_ids, dtype="Int64")
+    eligibility = pd.Series(pd.NA, index=member_ids.index, dtype="boolean")
+    known = member_ids.notna().to_numpy()
+    found, eligible = _up_to_date_eligibility().lookup_many(
+        member_ids[known].to_numpy(dtype=np.int64)
+    )
+    known[known] = found
+    eligibility[known] = eligible[found]
+    return eligibility
+
+
+def _up_to_date_eligibility() -> _Eligibility:
+    """Eligibility matching the members files, reloaded or rebuilt if they've changed."""
+    global _current_eligibility
+    engine = _storage_engine_()
+    if engine is not None:
+        return _engine_eligibility(engine)
+    signature = _segments_signature(_list_segments_(MEMBER_INFO.name))
+    with _eligibility_lock:
+        if _current_eligibility is None or _current_eligibility.signature != signature:
+            _current_eligibility = _load_eligibility(signature)
+            if _current_eligibility is None:
+                _current_eligibility = _write_member_eligibility_(MEMBER_INFO)
+        return _current_eligibility
+
+
+def _write_member_eligibility_(table_info: TableInfo) -> Optional[_Eligibility]:
+    """
+    Internal function to rebuild the eligibility sidecar, if a table is the members table.
+
+    Only the member_id and suspended columns of the table's files are read.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details of the written table.
+
+    Returns-
+        _Eligibility: The eligibility that was saved.
+        None: The table isn't the members table.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    if table_info.name != MEMBER_INFO.name:
+        return None
+    segments = _list_segments_(table_info.name)
+    members = pa.concat_tables(
+        [
+            pq.read_table(path, columns=_ELIGIBILITY_SCHEMA.names).cast(
+                _ELIGIBILITY_SCHEMA
+            )
+            for path in segments
+        ]
+        or [_ELIGIBILITY_SCHEMA.empty_table()]
+    )
+    members = members.take(pc.sort_indices(members.column("member_id")))
+    members = members.combine_chunks().replace_schema_metadata(
+        {"signature": _segments_signature(segments)}
+    )
+
+    path = _convert_parquet_name_to_eligibility_path_(table_info.name)
+    temp_path = path + ".tmp"
+    with pa.OSFile(temp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, members.schema) as writer:
+            writer.write_table(members)
+    os.replace(temp_path, path)
+    return _load_eligibility(_segments_signature(segments))
+
+
+def _load_eligibility(signature: str) -> Optional[_Eligibility]:
+    """Memory-map the eligibility sidecar, or None if it's missing or out of date."""
+    path = _convert_parquet_name_to_eligibility_path_(MEMBER_INFO.name)
+    try:
+        members = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    metadata = members.schema.metadata or {}
+    if metadata.get(b"signature", b"").decode() != signature:
+        return None
+    return _to_eligibility(members, signature)
+
+
+def _engine_eligibility(engine: StorageEngine) -> _Eligibility:
+    """Eligibility of the members in a storage engine, rebuilt when the members change."""
+    global _current_eligibility
+    signature = repr(engine.data_version(MEMBER_INFO))
+    with _eligibility_lock:
+        if _current_eligibility is None or _current_eligibility.signature != signature:
+            members = engine.read_table(MEMBER_INFO, ["member_id", "suspended"])
+            if members is None:
+                members = MEMBER_INFO.select(["member_id", "suspended"]).schema
+                members = members.empty_table()
+            members = members.sort_by("member_id")
+            _current_eligibility = _to_eligibility(members, signature)
+        return _current_eligibility
+
+
+def _to_eligibility(members: pa.Table, signature: str) -> _Eligibility:
+    """Eligibility of members sorted by member_id, without copying their suspended bits."""
+    member_ids = members.column("member_id").combine_chunks()
+    suspended = members.column("suspended").combine_chunks()
+    bitmap = suspended.buffers()[1]
+    return _Eligibility(
+        signature=signature,
+        member_ids=member_ids.to_numpy(),
+        suspended_bits=(
+            np.frombuffer(bitmap, dtype=np.uint8)
+            if bitmap is not None
+            else np.zeros(0, dtype=np.uint8)
+        ),
+        suspended_offset=suspended.offset,
+    )
+
+
+def _segments_signature(segments: List[str]) -> str:
+    """Name, size & modification time of each of a table's files, as a string."""
+    files = []
+    for path in segments:
+        stat = os.stat(path)
+        files.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+    return json.dumps(files)
@@ -0,0 +1,98 @@
+"""
+Memory-mapped Arrow mirror of small tables that are read often, like the members table.
+
+Tables with ipc_mirror set keep an uncompressed Arrow IPC copy of their records next to their
+Parquet file (e.g. storage/members.arrow). The mirror is memory-mapped on load, so reading the
+table costs an mmap instead of decompressing and decoding Parquet, and the returned Arrow table
+points straight into the mapped pages, which are shared between processes through the page
+cache. Records are only converted to pandas when a caller asks for a DataFrame.
+
+The mirror is rewritten whenever the table is rewritten. It records the size & modification
+time of the files it was built from, and is ignored (then rebuilt) on the next read if records
+were appended or another process has changed the files since.
+"""
+from typing import Optional, Tuple
+import json
+import os
+import threading
+import pyarrow as pa
+from ._parquet_utils import _convert_parquet_name_to_mirror_path_
+
+# Key of the mirror's schema metadata holding the signature of the files it was built from.
+_SIGNATURE_KEY = b"signature"
+
+
+def _mirror_signature_(files: Tuple[Tuple[str, int, int], ...]) -> str:
+    """
+    Internal function to get the signature a mirror of a table's files is stored with.
+
+    Args-
+        files (Tuple[Tuple[str, int, int], ...]):
+            Path, size & modification time of each of the table's files, including any logs.
+
+    Returns-
+        str: Name, size & modification time of each file, as a string.
+    """
+    return json.dumps(
+        [[os.path.basename(path), size, mtime] for path, size, mtime in files]
+    )
+
+
+def _load_ipc_mirror_(name: str, signature: str) -> Optional[pa.Table]:
+    """
+    Internal function to memory-map the Arrow mirror of a table.
+
+    Args-
+        name (str): Name of the table.
+        signature (str): Signature of the table's current files, from _mirror_signature_.
+
+    Returns-
+        pa.Table: The table's records, backed by the mapped file.
+        None: The mirror is missing, unreadable, or out of date.
+    """
+    path = _convert_parquet_name_to_mirror_path_(name)
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    metadata = table.schema.metadata or {}
+    if metadata.get(_SIGNATURE_KEY, b"").decode() != signature:
+        return None
+    return table.replace_schema_metadata(None)
+
+
+def _write_ipc_mirror_(name: str, table: pa.Table, signature: str) -> pa.Table:
+    """
+    Internal function to write the Arrow mirror of a table, and memory-map it.
+
+    The mirror is written to a temporary file and renamed into place, so readers never see a
+    partly written mirror.
+
+    Args-
+        name (str): Name of the table.
+        table (pa.Table): Every record of the table.
+        signature (str): Signature of the files the records were read from.
+
+    Returns-
+        pa.Table: The table's records, backed by the mapped mirror.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    path = _convert_parquet_name_to_mirror_path_(name)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    table = table.combine_chunks().replace_schema_metadata(
+        {_SIGNATURE_KEY: signature.encode()}
+    )
+    try:
+        with pa.OSFile(temp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+    except pa.ArrowIOError as err_io:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise err_io
+    mirrored = _load_ipc_mirror_(name, signature)
+    # The mirror may already have been replaced, by another process writing the table
+    return table.replace_schema_metadata(None) if mirrored is None else mirrored
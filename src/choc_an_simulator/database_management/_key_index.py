@@ -0,0 +1,312 @@
+"""
+Persistent primary-key index for database files.
+
+Each parquet file (and each append fragment) has a sidecar index holding its index column's
+values in sorted order, along with the row each value came from. Indexes are Arrow IPC files,
+memory-mapped on load, so duplicate checks and point lookups are binary searches rather than
+scans of the whole table. An index records the size & modification time of the file it was
+built from, and is rebuilt from the index column alone if the file has since changed.
+"""
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ._parquet_utils import (
+    _convert_parquet_name_to_wal_path_,
+    _convert_segment_path_to_index_path_,
+    _convert_wal_path_to_parquet_name_,
+    _list_segments_,
+    _WAL_EXT_,
+)
+from ._partitions import _list_partitions_
+from .storage_engines import _storage_engine_
+from ._write_ahead_log import _read_write_ahead_logs_
+from ..schemas import TableInfo
+
+
+@dataclass(frozen=True)
+class _SegmentIndex:
+    """Sorted index column values of one parquet file, and the row each value is found in."""
+
+    path: str
+    keys: np.ndarray
+    rows: np.ndarray
+    num_rows: int
+
+    def find(self, keys: np.ndarray) -> np.ndarray:
+        """Boolean mask of which keys are found in the file."""
+        positions = np.searchsorted(self.keys, keys)
+        found = positions < len(self.keys)
+        found[found] = self.keys[positions[found]] == keys[found]
+        return found
+
+    def rows_of(self, key: Any) -> np.ndarray:
+        """Rows of the file that have the given key, in file order."""
+        start = np.searchsorted(self.keys, key, side="left")
+        stop = np.searchsorted(self.keys, key, side="right")
+        return np.sort(self.rows[start:stop])
+
+
+def _write_key_index_(
+    keys: pa.Array, segment_path: str, table_info: TableInfo
+) -> _SegmentIndex:
+    """
+    Internal function to build and save the key index of a parquet file.
+
+    Args-
+        keys (pa.Array): Index column of the file, in file order.
+        segment_path (str): Full path of the parquet file the keys were written to.
+        table_info (TableInfo): Object with schema and table details.
+
+    Returns-
+        _SegmentIndex: The index that was saved.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    stat = os.stat(segment_path)
+    index = _build_index(keys, table_info)
+    index = index.replace_schema_metadata(
+        {
+            **index.schema.metadata,
+            "source_size": str(stat.st_size),
+            "source_mtime_ns": str(stat.st_mtime_ns),
+        }
+    )
+
+    index_path = _convert_segment_path_to_index_path_(segment_path)
+    temp_path = index_path + ".tmp"
+    with pa.OSFile(temp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, index.schema) as writer:
+            writer.write_table(index)
+    os.replace(temp_path, index_path)
+    return _to_segment_index(index, segment_path)
+
+
+def _load_key_index_(table_info: TableInfo) -> List[_SegmentIndex]:
+    """
+    Internal function to load the key index of every file holding part of a table.
+
+    Missing or out-of-date indexes are rebuilt from the index column of their file. Records in
+    the table's write-ahead logs are indexed in memory, as if they were one more file.
+    Partitioned tables have the files of each partition, oldest partition first.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+
+    Returns-
+        List[_SegmentIndex]: Index of each file, in the order the files are loaded.
+
+    Raises-
+        KeyError: The table's index column isn't in the file.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    if table_info.partition_col is not None:
+        return [
+            segment
+            for partition_info in _list_partitions_(table_info)
+            for segment in _load_key_index_(partition_info)
+        ]
+    segments = [
+        _load_segment_index(segment_path, table_info)
+        for segment_path in _list_segments_(table_info.name)
+    ]
+    if table_info.write_ahead_log:
+        log_table = _read_write_ahead_logs_(table_info.name)
+        if log_table is not None:
+            keys = log_table.column(table_info.index_col()).combine_chunks()
+            segments.append(
+                _to_segment_index(
+                    _build_index(keys, table_info),
+                    _convert_parquet_name_to_wal_path_(table_info.name),
+                )
+            )
+    return segments
+
+
+def _contains_any_keys_(table_info: TableInfo, keys: Iterable[Any]) -> bool:
+    """
+    Internal function to check if any of the given keys are already in a table's index column.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        keys (Iterable[Any]): Values of the index column to search for.
+
+    Returns-
+        bool: True if at least one key is already in the table.
+    """
+    return bool(_contains_keys_(table_info, keys).any())
+
+
+def _contains_keys_(table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+    """
+    Internal function to check which of the given keys are in a table's index column.
+
+    Every key is searched for in one vectorized pass over each file's index.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        keys (Iterable[Any]): Values of the index column to search for.
+
+    Returns-
+        np.ndarray: Boolean mask of which keys are in the table, in the order given.
+    """
+    engine = _storage_engine_()
+    if engine is not None:
+        return engine.contains_keys(table_info, keys)
+    keys = list(keys)
+    found = np.zeros(len(keys), dtype=bool)
+    key_array = _as_key_array(table_info, keys)
+    if key_array is None:
+        return found
+    for segment in _load_key_index_(table_info):
+        found |= segment.find(key_array)
+    return found
+
+
+def _find_key_positions_(table_info: TableInfo, key: Any) -> List[int]:
+    """
+    Internal function to find the positions of the records with a key in the whole table.
+
+    Positions count from the first record of the table's file through its append fragments,
+    matching the order of the records returned by _load_all_records_from_file_.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        key (Any): Value of the index column to search for.
+
+    Returns-
+        List[int]: Positions of the matching records. Empty if there's no match.
+    """
+    key_array = _as_key_array(table_info, [key])
+    if key_array is None:
+        return []
+    positions: List[int] = []
+    offset = 0
+    for segment in _load_key_index_(table_info):
+        positions += (segment.rows_of(key_array[0]) + offset).tolist()
+        offset += segment.num_rows
+    return positions
+
+
+def _find_key_(table_info: TableInfo, key: Any) -> Optional[Tuple[str, int]]:
+    """
+    Internal function to find the file and row of the first record with a key.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        key (Any): Value of the index column to search for.
+
+    Returns-
+        Tuple[str, int]: Full path of the parquet file, and row of the record within it.
+        None: No record has the key.
+    """
+    key_array = _as_key_array(table_info, [key])
+    if key_array is None:
+        return None
+    for segment in _load_key_index_(table_info):
+        rows = segment.rows_of(key_array[0])
+        if len(rows) > 0:
+            return segment.path, int(rows[0])
+    return None
+
+
+def _read_row_by_key_(table_info: TableInfo, key: Any) -> Optional[pd.Series]:
+    """
+    Internal function to read a single record by its key, without loading the whole table.
+
+    Only the row group containing the record is read.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        key (Any): Value of the index column to search for.
+
+    Returns-
+        pd.Series: The first record with the key.
+        None: No record has the key.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    engine = _storage_engine_()
+    if engine is not None:
+        return engine.read_row_by_key(table_info, key)
+    location = _find_key_(table_info, key)
+    if location is None:
+        return None
+    segment_path, row = location
+    if segment_path.endswith(_WAL_EXT_):
+        log_table = _read_write_ahead_logs_(
+            _convert_wal_path_to_parquet_name_(segment_path)
+        )
+        return log_table.slice(row, 1).to_pandas().iloc[0]
+    parquet_file = pq.ParquetFile(segment_path)
+    for row_group in range(parquet_file.num_row_groups):
+        group_rows = parquet_file.metadata.row_group(row_group).num_rows
+        if row < group_rows:
+            record = parquet_file.read_row_group(row_group).slice(row, 1)
+            return record.to_pandas().iloc[0]
+        row -= group_rows
+    return None
+
+
+def _build_index(keys: pa.Array, table_info: TableInfo) -> pa.Table:
+    """Sort the index column of a file into an index table, skipping null keys."""
+    keys = pc.cast(keys, table_info.schema.field(table_info.index_col()).type)
+    order = pc.sort_indices(keys)
+    order = order.filter(pc.is_valid(pc.take(keys, order)))
+    return pa.table(
+        {"key": pc.take(keys, order), "row": pc.cast(order, pa.int64())},
+        metadata={"key_col": table_info.index_col(), "num_rows": str(len(keys))},
+    )
+
+
+def _load_segment_index(segment_path: str, table_info: TableInfo) -> _SegmentIndex:
+    """Load the index of one parquet file, rebuilding it if it's missing or out of date."""
+    index_path = _convert_segment_path_to_index_path_(segment_path)
+    stat = os.stat(segment_path)
+    try:
+        index = pa.ipc.open_file(pa.memory_map(index_path, "r")).read_all()
+        metadata = index.schema.metadata
+        if (
+            metadata[b"key_col"].decode() == table_info.index_col()
+            and int(metadata[b"source_size"]) == stat.st_size
+            and int(metadata[b"source_mtime_ns"]) == stat.st_mtime_ns
+        ):
+            return _to_segment_index(index, segment_path)
+    except (FileNotFoundError, pa.ArrowInvalid, KeyError):
+        pass
+
+    # Index is missing or stale, rebuild it from the file's index column
+    if table_info.index_col() not in pq.read_schema(segment_path).names:
+        raise KeyError(
+            f"Index column {table_info.index_col()} not found in {segment_path}."
+        )
+    keys = pq.read_table(segment_path, columns=[table_info.index_col()]).column(0)
+    return _write_key_index_(keys.combine_chunks(), segment_path, table_info)
+
+
+def _to_segment_index(index: pa.Table, segment_path: str) -> _SegmentIndex:
+    """Convert a loaded index table to a _SegmentIndex."""
+    return _SegmentIndex(
+        path=segment_path,
+        keys=index.column("key").to_numpy(),
+        rows=index.column("row").to_numpy(),
+        num_rows=int(index.schema.metadata[b"num_rows"]),
+    )
+
+
+def _as_key_array(table_info: TableInfo, keys: Iterable[Any]) -> Optional[np.ndarray]:
+    """Convert keys to the same type as the index, or None if they can't be converted."""
+    key_type = table_info.schema.field(table_info.index_col()).type
+    try:
+        key_array = pa.array(keys, type=key_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return None
+    return key_array.to_numpy(zero_copy_only=False)
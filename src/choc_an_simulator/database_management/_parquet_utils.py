@@ -1,9 +1,26 @@
 """Utilities related to parquet file storage and retrieval."""
 from importlib.resources import files
+from typing import List
 import os
 
 # Directory where all parquet files are stored.
 _PARQUET_DIR_ = str(files("choc_an_simulator") / "storage")
+# Extension of every parquet file, including append fragments.
+_PARQUET_EXT_ = ".pkt"
+# Extension of the primary-key index stored next to each parquet file.
+_INDEX_EXT_ = ".idx"
+# Extension of the member eligibility sidecar stored next to the members file.
+_ELIGIBILITY_EXT_ = ".elig"
+# Extension of the memory-mapped Arrow copy stored next to the parquet file of some tables.
+_MIRROR_EXT_ = ".arrow"
+# Extension of the write-ahead log stored next to the parquet file of some tables.
+_WAL_EXT_ = ".wal"
+# Extension of a write-ahead log that is being folded into a parquet file.
+_FOLDING_EXT_ = ".folding"
+# Extension of a file written by a transaction, before it replaces the table's file.
+_STAGED_EXT_ = ".staged"
+# Name of the journal listing the files a committing transaction is replacing.
+_JOURNAL_NAME_ = "transaction.journal"
 
 
 def _convert_parquet_name_to_path_(name: str) -> str:
@@ -17,4 +34,193 @@ def _convert_parquet_name_to_path_(name: str) -> str:
         str: Full path for the specified file name.
 
     """
-    return os.path.join(_PARQUET_DIR_, name + ".pkt")
+    return os.path.join(_PARQUET_DIR_, name + _PARQUET_EXT_)
+
+
+def _convert_parquet_name_to_partition_dir_(name: str) -> str:
+    """
+    Internal function to convert a table name to the directory holding its partitions.
+
+    Args-
+        name (str): Name of the partitioned table.
+
+    Returns-
+        str: Full path of the directory of the table's partitions.
+    """
+    return os.path.join(_PARQUET_DIR_, name)
+
+
+def _convert_database_name_to_path_(file_name: str) -> str:
+    """
+    Internal function to convert the file name of a database to its full path.
+
+    Args-
+        file_name (str): File name of the database, with its extension.
+
+    Returns-
+        str: Full path of the database, in the storage directory.
+    """
+    return os.path.join(_PARQUET_DIR_, file_name)
+
+
+def _convert_parquet_name_to_append_dir_(name: str) -> str:
+    """
+    Internal function to convert a file name to the directory holding its append fragments.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        str: Full path of the directory of fragments appended to the file.
+    """
+    return os.path.join(_PARQUET_DIR_, name + ".appends")
+
+
+def _list_append_fragments_(name: str) -> List[str]:
+    """
+    Internal function to list the append fragments of a file, oldest first.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        List[str]: Full paths of each fragment. Empty if nothing has been appended.
+    """
+    append_dir = _convert_parquet_name_to_append_dir_(name)
+    if not os.path.isdir(append_dir):
+        return []
+    return [
+        os.path.join(append_dir, fragment)
+        for fragment in sorted(os.listdir(append_dir))
+        if fragment.endswith(_PARQUET_EXT_)
+    ]
+
+
+def _list_segments_(name: str) -> List[str]:
+    """
+    Internal function to list every parquet file holding part of a table, oldest first.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        List[str]: The table's file (if it exists), followed by its append fragments.
+    """
+    path = _convert_parquet_name_to_path_(name)
+    segments = [path] if os.path.exists(path) else []
+    return segments + _list_append_fragments_(name)
+
+
+def _convert_segment_path_to_index_path_(segment_path: str) -> str:
+    """
+    Internal function to convert the path of a parquet file to the path of its key index.
+
+    Args-
+        segment_path (str): Full path of a parquet file or append fragment.
+
+    Returns-
+        str: Full path of the key index for that file.
+    """
+    return segment_path.removesuffix(_PARQUET_EXT_) + _INDEX_EXT_
+
+
+def _convert_parquet_name_to_eligibility_path_(name: str) -> str:
+    """
+    Internal function to convert a file name to the path of its eligibility sidecar.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        str: Full path of the eligibility sidecar for the table.
+    """
+    return os.path.join(_PARQUET_DIR_, name + _ELIGIBILITY_EXT_)
+
+
+def _convert_parquet_name_to_mirror_path_(name: str) -> str:
+    """
+    Internal function to convert a file name to the path of its Arrow mirror.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        str: Full path of the table's Arrow mirror.
+    """
+    return os.path.join(_PARQUET_DIR_, name + _MIRROR_EXT_)
+
+
+def _convert_parquet_name_to_wal_path_(name: str) -> str:
+    """
+    Internal function to convert a file name to the path of its write-ahead log.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        str: Full path of the table's write-ahead log.
+    """
+    return os.path.join(_PARQUET_DIR_, name + _WAL_EXT_)
+
+
+def _convert_wal_path_to_parquet_name_(wal_path: str) -> str:
+    """
+    Internal function to convert the path of a write-ahead log back to its file name.
+
+    Args-
+        wal_path (str): Full path of the write-ahead log.
+
+    Returns-
+        str: Base name of the file the log belongs to.
+    """
+    name = os.path.relpath(wal_path, _PARQUET_DIR_).removesuffix(_WAL_EXT_)
+    return name.replace(os.sep, "/")
+
+
+def _list_write_ahead_logs_(name: str) -> List[str]:
+    """
+    Internal function to list a table's write-ahead logs, oldest first.
+
+    Logs that are being folded into parquet files come first, in the order they were detached,
+    followed by the log currently being appended to.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        List[str]: Full paths of each log. Empty if the table has no write-ahead log.
+    """
+    wal_path = _convert_parquet_name_to_wal_path_(name)
+    wal_dir = os.path.dirname(wal_path)
+    if not os.path.isdir(wal_dir):
+        return []
+    prefix = os.path.basename(wal_path) + "."
+    folding = sorted(
+        os.path.join(wal_dir, file_name)
+        for file_name in os.listdir(wal_dir)
+        if file_name.startswith(prefix) and file_name.endswith(_FOLDING_EXT_)
+    )
+    return folding + ([wal_path] if os.path.exists(wal_path) else [])
+
+
+def _convert_parquet_name_to_staged_path_(name: str) -> str:
+    """
+    Internal function to convert a file name to the path a transaction stages it at.
+
+    Args-
+        name (str): Base name of the file.
+
+    Returns-
+        str: Full path of the file's staged replacement.
+    """
+    return _convert_parquet_name_to_path_(name) + _STAGED_EXT_
+
+
+def _transaction_journal_path_() -> str:
+    """
+    Internal function to get the path of the journal of the transaction being committed.
+
+    Returns-
+        str: Full path of the transaction journal.
+    """
+    return os.path.join(_PARQUET_DIR_, _JOURNAL_NAME_)
@@ -0,0 +1,165 @@
+"""
+Date-partitioned storage of time-series tables, such as the service log.
+
+A table with a partition column is stored as one file per period of that column's dates, in
+Hive-style directories named after the period:
+    storage/service_log/year=2024/month=01/part.pkt
+    storage/service_log/year=2024/week=05/part.pkt      (ISO weeks)
+Each partition is stored like an unpartitioned table named after its path (e.g.
+"service_log/year=2024/month=01/part"), with its own append fragments, key index and
+write-ahead log, and is cached on its own. Loads filtered on the partition column only open the
+partitions whose period can match, appends only touch the partitions of the records appended,
+and partitions whose records don't change are never rewritten.
+"""
+from dataclasses import replace
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from ._parquet_utils import _convert_parquet_name_to_partition_dir_
+from ..schemas import TableInfo
+
+# Name of the file holding each partition's records, within the partition's directory.
+_PARTITION_FILE_NAME = "part"
+# Directory name of each level of a partition, e.g. "year=2024".
+_PARTITION_DIR_PATTERN = re.compile(r"^(year|month|week)=(\d+)$")
+
+
+def _list_partitions_(
+    table_info: TableInfo, date_range: Optional[Tuple[Any, Any]] = None
+) -> List[TableInfo]:
+    """
+    Internal function to list the partitions of a table, oldest first.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details, with a partition column.
+        date_range (Optional[Tuple[Any, Any]]):
+            Earliest and latest dates to list partitions for. Either may be None, for no limit.
+
+    Returns-
+        List[TableInfo]: TableInfo of each partition, named after its path.
+    """
+    table_dir = _convert_parquet_name_to_partition_dir_(table_info.name)
+    low, high = date_range if date_range is not None else (None, None)
+    partitions = []
+    for year in _list_period_dirs(table_dir, "year"):
+        year_dir = os.path.join(table_dir, f"year={year:04d}")
+        for number in _list_period_dirs(year_dir, table_info.partition_period):
+            start, end = _period_bounds(table_info.partition_period, year, number)
+            if (low is None or end >= low) and (high is None or start <= high):
+                partitions.append(_partition_info(table_info, year, number))
+    return partitions
+
+
+def _split_by_partition_(
+    table_info: TableInfo, table: pa.Table
+) -> Dict[str, Tuple[TableInfo, pa.Table]]:
+    """
+    Internal function to split records into the partitions they belong in.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details, with a partition column.
+        table (pa.Table): Records of the table, in any partitions.
+
+    Returns-
+        Dict[str, Tuple[TableInfo, pa.Table]]:
+            TableInfo of each partition with records, and its records in their original order,
+            by the partition's name.
+
+    Raises-
+        ValueError: A record has no date in the partition column.
+    """
+    dates = table.column(table_info.partition_col)
+    if dates.null_count > 0:
+        raise ValueError(f"Records must have a {table_info.partition_col} date.")
+    if table_info.partition_period == "week":
+        years, numbers = pc.iso_year(dates), pc.iso_week(dates)
+    else:
+        years, numbers = pc.year(dates), pc.month(dates)
+    periods = pc.add(pc.multiply(pc.cast(years, pa.int64()), 100), numbers)
+
+    partitions = {}
+    for period in sorted(pc.unique(periods).to_pylist()):
+        partition_info = _partition_info(table_info, period // 100, period % 100)
+        partitions[partition_info.name] = (
+            partition_info,
+            table.filter(pc.equal(periods, period)),
+        )
+    return partitions
+
+
+def _partition_date_range_(
+    table_info: TableInfo,
+    eq_cols: Optional[Dict[str, Any]],
+    lt_cols: Optional[Dict[str, Any]],
+    gt_cols: Optional[Dict[str, Any]],
+) -> Optional[Tuple[Optional[date], Optional[date]]]:
+    """
+    Internal function to find the range of partition dates that filters can match.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        eq_cols (Optional[Dict[str, Any]]): Columns and values for equality filtering.
+        lt_cols (Optional[Dict[str, Any]]): Columns and values for less-than filtering.
+        gt_cols (Optional[Dict[str, Any]]): Columns and values for greater-than filtering.
+
+    Returns-
+        Tuple[Optional[date], Optional[date]]: Earliest and latest dates that can match.
+        None: The table isn't partitioned, or the filters don't limit its partition column.
+    """
+    if table_info.partition_col is None:
+        return None
+    col = table_info.partition_col
+    low = _to_date((gt_cols or {}).get(col))
+    high = _to_date((lt_cols or {}).get(col))
+    equal = _to_date((eq_cols or {}).get(col))
+    if equal is not None:
+        low, high = equal, equal
+    if low is None and high is None:
+        return None
+    return low, high
+
+
+def _partition_info(table_info: TableInfo, year: int, number: int) -> TableInfo:
+    """Get the TableInfo of one partition of a table, named after the partition's path."""
+    period_dir = f"year={year:04d}/{table_info.partition_period}={number:02d}"
+    return replace(
+        table_info,
+        name=f"{table_info.name}/{period_dir}/{_PARTITION_FILE_NAME}",
+        partition_col=None,
+    )
+
+
+def _list_period_dirs(parent_dir: str, level: str) -> List[int]:
+    """Numbers of the period directories of one level, like "month=01", in a directory."""
+    if not os.path.isdir(parent_dir):
+        return []
+    numbers = []
+    for dir_name in os.listdir(parent_dir):
+        match = _PARTITION_DIR_PATTERN.match(dir_name)
+        if match is not None and match.group(1) == level:
+            numbers.append(int(match.group(2)))
+    return sorted(numbers)
+
+
+def _period_bounds(period: str, year: int, number: int) -> Tuple[date, date]:
+    """First and last dates of a month, or an ISO week."""
+    if period == "week":
+        start = date.fromisocalendar(year, number, 1)
+        return start, start + timedelta(days=6)
+    start = date(year, number, 1)
+    next_month = date(year + number // 12, number % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+def _to_date(value: Any) -> Optional[date]:
+    """Convert a filter value to a date, or None if it isn't one."""
+    if value is None:
+        return None
+    try:
+        return pd.Timestamp(value).date()
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,185 @@
+"""
+In-process cache of database tables.
+
+Tables are cached as Arrow tables, keyed by TableInfo.name. A cached table is only used while
+the files it was read from are unchanged: each entry is stored with the size & modification time
+of every file in the table, including any write-ahead logs, and with a version number that is
+bumped whenever this process writes to the table. The cache has a memory budget, and evicts the
+least recently used tables to stay within it.
+"""
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Tuple
+import os
+import threading
+import pyarrow as pa
+from ._parquet_utils import _list_segments_, _list_write_ahead_logs_
+from ._partitions import _list_partitions_
+from .storage_engines import _storage_engine_
+from ..schemas import TableInfo
+
+# Default memory budget of the table cache, in bytes.
+_DEFAULT_CACHE_BUDGET_BYTES_ = 256 * 1024 * 1024
+
+
+class _TableCache:
+    """Least-recently-used cache of Arrow tables, with a memory budget."""
+
+    def __init__(self, max_bytes: int):
+        """
+        Create an empty cache.
+
+        Args-
+            max_bytes (int): Memory budget of the cache. 0 disables caching.
+        """
+        self.max_bytes = max_bytes
+        self._tables: OrderedDict[str, Tuple[Hashable, pa.Table]] = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, signature: Hashable) -> Optional[pa.Table]:
+        """
+        Get a cached table, if it was cached with the same signature.
+
+        Args-
+            name (str): Name of the table.
+            signature (Hashable): Current signature of the table's files.
+
+        Returns-
+            pa.Table: The cached table.
+            None: The table isn't cached, or has changed since it was cached.
+        """
+        with self._lock:
+            entry = self._tables.get(name)
+            if entry is None:
+                return None
+            if entry[0] != signature:
+                del self._tables[name]
+                return None
+            self._tables.move_to_end(name)
+            return entry[1]
+
+    def put(self, name: str, signature: Hashable, table: pa.Table) -> None:
+        """
+        Cache a table, evicting the least recently used tables to stay within budget.
+
+        Tables larger than the whole budget aren't cached.
+
+        Args-
+            name (str): Name of the table.
+            signature (Hashable): Signature of the files the table was read from.
+            table (pa.Table): The table to cache.
+        """
+        with self._lock:
+            self._tables.pop(name, None)
+            if table.nbytes > self.max_bytes:
+                return
+            self._tables[name] = (signature, table)
+            self._evict()
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        """Change the memory budget, evicting tables if the cache is now over budget."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def version(self, name: str) -> int:
+        """Number of times this process has written to a table."""
+        return self._versions.get(name, 0)
+
+    def bump_version(self, name: str) -> None:
+        """Record that this process wrote to a table, invalidating its cached copy."""
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._tables.pop(name, None)
+
+    def clear(self) -> None:
+        """Remove every table from the cache."""
+        with self._lock:
+            self._tables.clear()
+
+    def _evict(self) -> None:
+        """Drop the least recently used tables until the cache is within budget."""
+        total_bytes = sum(table.nbytes for _, table in self._tables.values())
+        while self._tables and total_bytes > self.max_bytes:
+            _, (_, table) = self._tables.popitem(last=False)
+            total_bytes -= table.nbytes
+
+
+# Cache shared by every database function in this process.
+_TABLE_CACHE_ = _TableCache(_DEFAULT_CACHE_BUDGET_BYTES_)
+
+
+def _table_signature_(
+    name: str, write_ahead_log: bool = False
+) -> Tuple[int, Tuple[Tuple[str, int, int], ...], Tuple[Tuple[str, int, int], ...]]:
+    """
+    Internal function to get the signature of a table's files.
+
+    Args-
+        name (str): Name of the table.
+        write_ahead_log (bool): Whether the table has write-ahead logs to include.
+
+    Returns-
+        The table's write version, then the path, size & modification time of each of its
+        Parquet files, and of each of its write-ahead logs.
+    """
+    logs = _list_write_ahead_logs_(name) if write_ahead_log else []
+    return (
+        _TABLE_CACHE_.version(name),
+        _file_stats(_list_segments_(name)),
+        _file_stats(logs),
+    )
+
+
+def _file_stats(paths: List[str]) -> Tuple[Tuple[str, int, int], ...]:
+    """Path, size & modification time of each file."""
+    files = []
+    for path in paths:
+        stat = os.stat(path)
+        files.append((path, stat.st_size, stat.st_mtime_ns))
+    return tuple(files)
+
+
+def table_version(table_info: TableInfo) -> Hashable:
+    """
+    Get a token identifying the current contents of a table's files.
+
+    The token changes whenever the table is written to, by this process or another, so callers
+    can keep data derived from a table and rebuild it only when the token changes. Only the
+    table's files are checked with os.stat; none of them are read.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+
+    Returns-
+        Hashable: Token that compares equal until the table changes.
+
+    Examples-
+        version = table_version(USER_INFO)
+        ...
+        if table_version(USER_INFO) != version:
+            # USER_INFO has changed, reload it
+    """
+    engine = _storage_engine_()
+    if engine is not None:
+        return engine.data_version(table_info)
+    if table_info.partition_col is not None:
+        return tuple(
+            _table_signature_(partition_info.name, partition_info.write_ahead_log)
+            for partition_info in _list_partitions_(table_info)
+        )
+    return _table_signature_(table_info.name, table_info.write_ahead_log)
+
+
+def set_table_cache_budget(max_bytes: int) -> None:
+    """
+    Set the memory budget of the in-process table cache.
+
+    Args-
+        max_bytes (int): Maximum bytes of tables to keep in memory. 0 disables caching.
+
+    Examples-
+        # Cache at most 1 GiB of tables
+        set_table_cache_budget(1024 ** 3)
+    """
+    _TABLE_CACHE_.set_max_bytes(max_bytes)
@@ -0,0 +1,252 @@
+"""
+Write-ahead log for tables that receive many small appends, such as the service log.
+
+Records added to such a table are appended to a log file next to its Parquet file, instead of
+being written as a new Parquet fragment. Each commit is a single sequential write of one frame:
+    [4-byte length][4-byte CRC32 of the payload][Arrow IPC stream of the records]
+and is durable once the log has been fsynced. Concurrent commits share fsyncs (group commit):
+while one commit's fsync is in progress, others append their frames, and the next fsync covers
+all of them at once.
+
+A frame that was only partly written when the process died fails its length or CRC check, and
+is dropped, along with anything after it, the next time the log is opened for appending.
+
+Reads merge the log's records after those in the table's Parquet files. Logs are folded into a
+Parquet append fragment by _fold_write_ahead_log_, in _write_records. To fold a log, it's first
+detached: renamed to a .folding file, so new commits start a fresh log while it's folded.
+"""
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import os
+import struct
+import threading
+import time
+import zlib
+import pyarrow as pa
+from ._parquet_utils import (
+    _convert_parquet_name_to_wal_path_,
+    _convert_wal_path_to_parquet_name_,
+    _list_write_ahead_logs_,
+    _FOLDING_EXT_,
+)
+
+# Header of each frame: payload length, and CRC32 of the payload.
+_FRAME_HEADER = struct.Struct("<II")
+
+
+class _WriteAheadLog:
+    """Append-only log file of one table, with group commit."""
+
+    def __init__(self, path: str):
+        """
+        Create the log of a table. The file is opened on the first append.
+
+        Args-
+            path (str): Full path of the log file.
+        """
+        self.path = path
+        self._cond = threading.Condition()
+        self._file = None
+        # Number of commits written to the file, and how many of those have been fsynced
+        self._appended = 0
+        self._synced = 0
+        self._syncing = False
+
+    def append(self, table: pa.Table) -> int:
+        """
+        Durably append records to the log.
+
+        Args-
+            table (pa.Table): Records to append.
+
+        Returns-
+            int: Size of the log in bytes, after the append.
+
+        Raises-
+            OSError: I/O error occurs.
+        """
+        frame = _encode_frame(table)
+        with self._cond:
+            if self._file is None:
+                self._file = _open_for_append(self.path)
+            self._file.write(frame)
+            self._file.flush()
+            self._appended += 1
+            commit = self._appended
+            size = self._file.tell()
+
+            # Group commit: wait for an fsync covering this commit, or start one
+            while self._synced < commit:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                target = self._appended
+                file_no = self._file.fileno()
+                self._cond.release()
+                try:
+                    os.fsync(file_no)
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced = max(self._synced, target)
+            return size
+
+    def detach(self) -> Optional[str]:
+        """
+        Rename the log to a .folding file, so later commits start a new log.
+
+        Returns-
+            str: Full path of the detached log.
+            None: The log is empty.
+        """
+        with self._cond:
+            self._close()
+            if not os.path.exists(self.path):
+                return None
+            folding_path = f"{self.path}.{time.time_ns():020d}{_FOLDING_EXT_}"
+            os.replace(self.path, folding_path)
+            return folding_path
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Hold off commits to the log, so its records can be rewritten elsewhere & the log removed.
+
+        Commits that started before are finished first. Those made while paused wait until the
+        context exits.
+        """
+        with self._cond:
+            while self._syncing:
+                self._cond.wait()
+            yield
+
+    def remove(self) -> None:
+        """Delete the log and any detached logs, whose records have been written elsewhere."""
+        with self._cond:
+            self._close()
+            for path in _list_write_ahead_logs_(
+                _convert_wal_path_to_parquet_name_(self.path)
+            ):
+                _remove_log_file_(path)
+
+    def _close(self) -> None:
+        """Close the log file, once its commits are durable. The lock must be held."""
+        while self._syncing:
+            self._cond.wait()
+        if self._file is not None:
+            # Commits still waiting for an fsync are covered by this one
+            if self._synced < self._appended:
+                os.fsync(self._file.fileno())
+                self._synced = self._appended
+            self._file.close()
+            self._file = None
+
+
+# Log of each table, by the path of its log file.
+_logs: Dict[str, _WriteAheadLog] = {}
+_logs_lock = threading.Lock()
+# Records read from each log file, with the size & modification time they were read at.
+_read_cache: Dict[str, Tuple[Tuple[int, int], List[pa.Table]]] = {}
+
+
+def _write_ahead_log_(name: str) -> _WriteAheadLog:
+    """Internal function to get the write-ahead log of a table."""
+    path = _convert_parquet_name_to_wal_path_(name)
+    with _logs_lock:
+        if path not in _logs:
+            _logs[path] = _WriteAheadLog(path)
+        return _logs[path]
+
+
+def _read_write_ahead_logs_(name: str) -> Optional[pa.Table]:
+    """
+    Internal function to read the records in a table's write-ahead logs, oldest first.
+
+    Args-
+        name (str): Name of the table.
+
+    Returns-
+        pa.Table: Records of every complete commit in the logs.
+        None: The table has no records in its logs.
+
+    Raises-
+        OSError: I/O error occurs.
+    """
+    tables = []
+    for path in _list_write_ahead_logs_(name):
+        tables += _read_log_file_(path)
+    if not tables:
+        return None
+    return pa.concat_tables(tables)
+
+
+def _read_log_file_(path: str) -> List[pa.Table]:
+    """
+    Internal function to read the records of each complete commit in one log file.
+
+    Logs only grow between folds, so records already read are reused when the file is unchanged.
+
+    Raises-
+        OSError: I/O error occurs.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return []
+    file_stat = (stat.st_size, stat.st_mtime_ns)
+    cached = _read_cache.get(path)
+    if cached is not None and cached[0] == file_stat:
+        return cached[1]
+    with open(path, "rb") as log_file:
+        tables, _ = _decode_frames(log_file.read())
+    _read_cache[path] = (file_stat, tables)
+    return tables
+
+
+def _remove_log_file_(path: str) -> None:
+    """Internal function to delete a log file whose records have been written elsewhere."""
+    os.remove(path)
+    _read_cache.pop(path, None)
+
+
+def _encode_frame(table: pa.Table) -> bytes:
+    """Encode records as one frame of the log."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue().to_pybytes()
+    return _FRAME_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode_frames(data: bytes) -> Tuple[List[pa.Table], int]:
+    """
+    Decode the frames of a log, stopping at the first incomplete or corrupt frame.
+
+    Returns-
+        Tuple[List[pa.Table], int]: Records of each complete frame, and the length of the log
+            up to the end of the last complete frame.
+    """
+    view = memoryview(data)
+    tables = []
+    offset = 0
+    while offset + _FRAME_HEADER.size <= len(view):
+        length, crc = _FRAME_HEADER.unpack_from(view, offset)
+        start = offset + _FRAME_HEADER.size
+        end = start + length
+        if end > len(view) or zlib.crc32(view[start:end]) != crc:
+            break
+        tables.append(pa.ipc.open_stream(pa.py_buffer(view[start:end])).read_all())
+        offset = end
+    return tables, offset
+
+
+def _open_for_append(path: str):
+    """Open a log for appending, first dropping any incomplete frame at its end."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        with open(path, "r+b") as log_file:
+            _, valid_length = _decode_frames(log_file.read())
+            log_file.truncate(valid_length)
+    return open(path, "ab")
@@ -1,14 +1,58 @@
 """Functions for writing records to a database file."""
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import inspect
+import os
+import shutil
+import threading
 import pandas as pd
 import pyarrow as pa
-from ._parquet_utils import _convert_parquet_name_to_path_
+import pyarrow.parquet as pq
+from ._parquet_utils import (
+    _convert_parquet_name_to_path_,
+    _convert_parquet_name_to_append_dir_,
+    _convert_segment_path_to_index_path_,
+    _list_append_fragments_,
+    _list_segments_,
+    _list_write_ahead_logs_,
+    _FOLDING_EXT_,
+    _PARQUET_EXT_,
+)
+from .load_records import _read_table_
+from ._partitions import _list_partitions_, _split_by_partition_
+from ._eligibility import _write_member_eligibility_
+from ._key_index import _write_key_index_
+from ._table_cache import _TABLE_CACHE_
+from ._write_ahead_log import _read_log_file_, _remove_log_file_, _write_ahead_log_
+from .storage_engines import _storage_engine_
 from ..schemas import TableInfo
 
+# Number of append fragments a table may accumulate before they are compacted into its file.
+_MAX_APPEND_FRAGMENTS_ = 32
+# Size a table's write-ahead log may grow to before it's folded into a Parquet fragment.
+_WAL_FOLD_BYTES_ = 4 * 1024 * 1024
+# Key of the fragment metadata naming the write-ahead log it was folded from.
+_WAL_FOLD_KEY = "wal_fold"
+
+# Whether the installed pyarrow can write bloom filters, which older versions can't.
+_BLOOM_FILTERS_SUPPORTED = (
+    "bloom_filter_options" in inspect.signature(pq.write_table).parameters
+)
+
+# Held while folding write-ahead logs, or rewriting a table's files.
+_fold_lock = threading.RLock()
+# Background threads folding write-ahead logs, by table name.
+_fold_threads: Dict[str, threading.Thread] = {}
+_fold_threads_lock = threading.Lock()
+
 
 def _overwrite_records_to_file_(records: pd.DataFrame, table_info: TableInfo) -> None:
     """
         Internal function to overwrite a Parquet file with new records.
 
+        Any append fragments are removed, since the new records replace them, and the file's
+        key index is rebuilt, along with the member eligibility sidecar of the members table.
+
         Args-
             records (pd.DataFrame): Records to be written.
             table_info (TableInfo): Object with schema and table details.
@@ -29,8 +73,481 @@ def _overwrite_records_to_file_(records: pd.DataFrame, table_info: TableInfo) ->
     except ArithmeticError as err_limit:
         raise err_limit
 
+    table = pa.Table.from_pandas(
+        records, schema=table_info.schema, preserve_index=False
+    )
+    _overwrite_table_to_file_(table, table_info)
+
+
+def _overwrite_table_to_file_(table: pa.Table, table_info: TableInfo) -> None:
+    """
+    Internal function to overwrite a Parquet file with an Arrow table of records.
+
+    Unlike _overwrite_records_to_file_, the records aren't converted to or from pandas. They
+    are expected to have already been validated against table_info.
+
+    Args-
+        table (pa.Table): Validated records to be written, with the schema's columns.
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    engine = _storage_engine_()
+    if engine is not None:
+        engine.write_table(table, table_info)
+        return
+    with _rewriting_table_(table_info):
+        if table_info.partition_col is not None:
+            _overwrite_partitions_(table, table_info)
+            return
+
+        try:
+            path = _convert_parquet_name_to_path_(table_info.name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            table = _write_parquet_file_(table, path, table_info)
+        except pa.ArrowIOError as err_io:
+            raise err_io
+        finally:
+            _TABLE_CACHE_.bump_version(table_info.name)
+
+        keys = table.column(table_info.index_col()).combine_chunks()
+        _replace_appended_records(path, keys, table_info)
+
+
+@contextmanager
+def _rewriting_table_(table_info: TableInfo) -> Iterator[None]:
+    """
+    Internal context manager for loading every record of a table and writing them back.
+
+    Write-ahead logs are neither folded nor committed to until the context exits, so the
+    records loaded within it include every logged record, and the logs can be removed once
+    the records are written. Records loaded before the context may be missing logged records.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+
+    Examples-
+        with _rewriting_table_(table_info):
+            table = _read_table_(table_info)
+            _overwrite_table_to_file_(table.filter(mask), table_info)
+    """
+    log_infos = [table_info]
+    if table_info.partition_col is not None:
+        log_infos = _list_partitions_(table_info)
+    with _fold_lock, ExitStack() as logs:
+        for log_info in log_infos:
+            if log_info.write_ahead_log:
+                logs.enter_context(_write_ahead_log_(log_info.name).paused())
+        yield
+
+
+def _write_parquet_file_(table: pa.Table, path: str, table_info: TableInfo) -> pa.Table:
+    """
+    Internal function to write records to a Parquet file, laid out by the table's options.
+
+    The records are sorted by the table's sort keys first, keeping the order of records with
+    equal keys, and the sort order is recorded in the file's row group metadata.
+
+    Args-
+        table (pa.Table): Validated records to be written, with the schema's columns.
+        path (str): Full path of the file to write.
+        table_info (TableInfo): Object with schema, table details and Parquet options.
+
+    Returns-
+        pa.Table: The records as written, in the file's order.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    table = _sort_records_(table, table_info)
+    pq.write_table(table, path, **_parquet_write_kwargs(table, table_info))
+    return table
+
+
+def _parquet_write_kwargs(table: pa.Table, table_info: TableInfo) -> Dict[str, Any]:
+    """Keyword arguments of pq.write_table for writing records by a table's options."""
+    options = table_info.parquet_options
+    kwargs: Dict[str, Any] = {
+        "row_group_size": options.row_group_size,
+        "compression": options.compression,
+        "compression_level": options.compression_level,
+        "write_page_index": options.page_index,
+    }
+    if options.dictionary_cols is not None:
+        kwargs["use_dictionary"] = list(options.dictionary_cols)
+    if options.sort_keys:
+        kwargs["sorting_columns"] = pq.SortingColumn.from_ordering(
+            table.schema, [(col, "ascending") for col in options.sort_keys]
+        )
+    if options.bloom_filter_cols and _BLOOM_FILTERS_SUPPORTED:
+        # Sized for every record of a row group having a distinct value
+        distinct_values = max(1, min(table.num_rows, options.row_group_size or 1 << 20))
+        kwargs["bloom_filter_options"] = {
+            col: {"ndv": distinct_values} for col in options.bloom_filter_cols
+        }
+    return kwargs
+
+
+def _overwrite_partitions_(table: pa.Table, table_info: TableInfo) -> None:
+    """
+    Internal function to overwrite the partitions of a partitioned table.
+
+    Only partitions whose records changed are rewritten, and partitions left without records
+    are removed. The rest keep their files as they are.
+
+    Args-
+        table (pa.Table): Validated records of the whole table, with the schema's columns.
+        table_info (TableInfo): Object with schema and table details, with a partition column.
+
+    Raises-
+        ValueError: A record has no date in the partition column.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    removed, changed = _changed_partitions_(table, table_info)
+    for partition_info in removed:
+        _remove_partition(partition_info)
+    for partition_info, records in changed:
+        _overwrite_table_to_file_(records, partition_info)
+
+
+def _changed_partitions_(
+    table: pa.Table, table_info: TableInfo
+) -> Tuple[List[TableInfo], List[Tuple[TableInfo, pa.Table]]]:
+    """
+    Internal function to compare a partitioned table's records with its stored partitions.
+
+    Args-
+        table (pa.Table): Records of the whole table, with the schema's columns.
+        table_info (TableInfo): Object with schema and table details, with a partition column.
+
+    Returns-
+        Tuple[List[TableInfo], List[Tuple[TableInfo, pa.Table]]]:
+            Stored partitions with none of the records, and each partition whose records
+            differ from those stored, with its records.
+
+    Raises-
+        ValueError: A record has no date in the partition column.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    partitions = {
+        name: (partition_info, _sort_records_(records, partition_info))
+        for name, (partition_info, records) in _split_by_partition_(
+            table_info, table
+        ).items()
+    }
+    removed = [
+        partition_info
+        for partition_info in _list_partitions_(table_info)
+        if partition_info.name not in partitions
+    ]
+    changed = []
+    for partition_info, records in partitions.values():
+        stored = _read_table_(partition_info)
+        if stored is None or not stored.equals(records):
+            changed.append((partition_info, records))
+    return removed, changed
+
+
+def _sort_records_(table: pa.Table, table_info: TableInfo) -> pa.Table:
+    """Internal function to sort records by a table's sort keys, as they're written."""
+    sort_keys = table_info.parquet_options.sort_keys
+    if not sort_keys:
+        return table
+    return table.sort_by([(col, "ascending") for col in sort_keys])
+
+
+def _remove_partition(partition_info: TableInfo) -> None:
+    """Delete a partition's directory, and its year's directory if that's now empty."""
+    _write_ahead_log_(partition_info.name).remove()
+    partition_dir = os.path.dirname(_convert_parquet_name_to_path_(partition_info.name))
     try:
-        path = _convert_parquet_name_to_path_(table_info.name)
-        records.to_parquet(path, schema=table_info.schema)
+        shutil.rmtree(partition_dir, ignore_errors=True)
+        if not os.listdir(os.path.dirname(partition_dir)):
+            os.rmdir(os.path.dirname(partition_dir))
+    finally:
+        _TABLE_CACHE_.bump_version(partition_info.name)
+
+
+def _append_records_to_partitions_(
+    records: pd.DataFrame, table_info: TableInfo
+) -> None:
+    """
+    Internal function to append records to the partitions of a partitioned table.
+
+    Each partition's records are appended like those of an unpartitioned table, so only the
+    partitions of the appended records are touched.
+    The records are expected to have already been validated against table_info.
+
+    Args-
+        records (pd.DataFrame): Validated records to be appended.
+        table_info (TableInfo): Object with schema and table details, with a partition column.
+
+    Raises-
+        ValueError: A record has no date in the partition column.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    table = pa.Table.from_pandas(
+        records, schema=table_info.schema, preserve_index=False
+    )
+    for partition_info, partition_records in _split_by_partition_(
+        table_info, table
+    ).values():
+        if partition_info.write_ahead_log:
+            _append_table_to_write_ahead_log_(partition_records, partition_info)
+            continue
+        _append_table_to_file_(partition_records, partition_info)
+        if _needs_compaction_(partition_info):
+            _compact_records_file_(partition_info)
+
+
+def _append_records_to_file_(records: pd.DataFrame, table_info: TableInfo) -> None:
+    """
+    Internal function to append records to a table without rewriting its Parquet file.
+
+    The records are written on their own, as a new fragment next to the table's file, along
+    with a key index of the fragment. The cost of an append depends only on the number of
+    records appended, not the size of the table, so the table's sidecars are left out of date
+    until they're next read.
+    The records are expected to have already been validated against table_info.
+
+    Args-
+        records (pd.DataFrame): Validated records to be appended.
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    table = pa.Table.from_pandas(
+        records, schema=table_info.schema, preserve_index=False
+    )
+    _append_table_to_file_(table, table_info)
+
+
+def _append_table_to_file_(
+    table: pa.Table, table_info: TableInfo, metadata: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Internal function to append an Arrow table of records to a table, as a new fragment.
+
+    Like _append_records_to_file_, but the records aren't converted from pandas.
+
+    Args-
+        table (pa.Table): Validated records to be appended, with the schema's columns.
+        table_info (TableInfo): Object with schema and table details.
+        metadata (Optional[Dict[str, str]]): Extra metadata to store in the fragment's schema.
+
+    Raises-
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    if metadata:
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), **metadata}
+        )
+    path = _next_fragment_path(table_info)
+    try:
+        table = _write_parquet_file_(table, path, table_info)
     except pa.ArrowIOError as err_io:
         raise err_io
+    finally:
+        _TABLE_CACHE_.bump_version(table_info.name)
+    keys = table.column(table_info.index_col()).combine_chunks()
+    _write_key_index_(keys, path, table_info)
+    # The eligibility sidecar & Arrow mirror no longer match the table's files, so they're
+    # rebuilt on their next read, rather than reading the whole table on every append
+
+
+def _append_records_to_write_ahead_log_(
+    records: pd.DataFrame, table_info: TableInfo
+) -> None:
+    """
+    Internal function to append records to a table's write-ahead log.
+
+    The records are durable once this returns. Once the log grows past _WAL_FOLD_BYTES_, it's
+    folded into a Parquet fragment by a background thread.
+    The records are expected to have already been validated against table_info.
+
+    Args-
+        records (pd.DataFrame): Validated records to be appended.
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        pyarrow.ArrowInvalid: Records can't be converted to the schema.
+        OSError: I/O error occurs.
+    """
+    table = pa.Table.from_pandas(
+        records, schema=table_info.schema, preserve_index=False
+    )
+    _append_table_to_write_ahead_log_(table, table_info)
+
+
+def _append_table_to_write_ahead_log_(table: pa.Table, table_info: TableInfo) -> None:
+    """
+    Internal function to append an Arrow table of records to a table's write-ahead log.
+
+    Like _append_records_to_write_ahead_log_, but the records aren't converted from pandas.
+
+    Args-
+        table (pa.Table): Validated records to be appended, with the schema's columns.
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        OSError: I/O error occurs.
+    """
+    try:
+        size = _write_ahead_log_(table_info.name).append(table)
+    finally:
+        _TABLE_CACHE_.bump_version(table_info.name)
+    if size >= _WAL_FOLD_BYTES_:
+        _fold_write_ahead_log_in_background_(table_info)
+
+
+def _fold_write_ahead_log_(table_info: TableInfo) -> None:
+    """
+    Internal function to fold a table's write-ahead logs into a Parquet append fragment.
+
+    The current log is detached first, so records can keep being logged while it's folded.
+    Each fragment records the log it was folded from, so a log that was folded but not yet
+    removed when the process died isn't folded twice.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    with _fold_lock:
+        _write_ahead_log_(table_info.name).detach()
+        for path in _list_write_ahead_logs_(table_info.name):
+            if not path.endswith(_FOLDING_EXT_):
+                continue
+            fold_id = os.path.basename(path)
+            if _last_fold_id(table_info) != fold_id:
+                tables = _read_log_file_(path)
+                if tables:
+                    _append_table_to_file_(
+                        pa.concat_tables(tables), table_info, {_WAL_FOLD_KEY: fold_id}
+                    )
+            try:
+                _remove_log_file_(path)
+            finally:
+                _TABLE_CACHE_.bump_version(table_info.name)
+        if _needs_compaction_(table_info):
+            _compact_records_file_(table_info)
+
+
+def _fold_write_ahead_log_in_background_(table_info: TableInfo) -> None:
+    """Start folding a table's write-ahead logs on a background thread, unless one is running."""
+    with _fold_threads_lock:
+        thread = _fold_threads.get(table_info.name)
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(
+            target=_fold_quietly,
+            args=(table_info,),
+            name=f"fold-{table_info.name}",
+            daemon=True,
+        )
+        _fold_threads[table_info.name] = thread
+        thread.start()
+
+
+def _fold_quietly(table_info: TableInfo) -> None:
+    """Fold a table's write-ahead logs, leaving them to be read as logs if it fails."""
+    try:
+        _fold_write_ahead_log_(table_info)
+    except (pa.ArrowInvalid, OSError):
+        pass
+
+
+def _last_fold_id(table_info: TableInfo) -> Optional[str]:
+    """Name of the log the table's last append fragment was folded from, if any."""
+    fragments = _list_append_fragments_(table_info.name)
+    if not fragments:
+        return None
+    metadata = pq.read_schema(fragments[-1]).metadata or {}
+    fold_id = metadata.get(_WAL_FOLD_KEY.encode())
+    return None if fold_id is None else fold_id.decode()
+
+
+def _next_fragment_path(table_info: TableInfo) -> str:
+    """Full path of the next append fragment of a table, creating its directory if needed."""
+    append_dir = _convert_parquet_name_to_append_dir_(table_info.name)
+    fragments = _list_append_fragments_(table_info.name)
+    next_fragment_num = 0
+    if fragments:
+        last_fragment = os.path.basename(fragments[-1])
+        next_fragment_num = int(last_fragment.removesuffix(_PARQUET_EXT_)) + 1
+
+    os.makedirs(append_dir, exist_ok=True)
+    return os.path.join(append_dir, f"{next_fragment_num:010d}{_PARQUET_EXT_}")
+
+
+def _needs_compaction_(table_info: TableInfo) -> bool:
+    """Check whether a table has accumulated enough append fragments to be compacted."""
+    return len(_list_append_fragments_(table_info.name)) >= _MAX_APPEND_FRAGMENTS_
+
+
+def _compact_records_file_(table_info: TableInfo) -> None:
+    """
+    Internal function to fold a table's append fragments back into its Parquet file.
+
+    Only the file and the fragments it's compacted from are rewritten. Records in the table's
+    write-ahead logs stay in the logs, and fragments appended during compaction are kept.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    with _fold_lock:
+        segments = _list_segments_(table_info.name)
+        fragments = _list_append_fragments_(table_info.name)
+        if not fragments:
+            return
+        table = pa.concat_tables([pq.read_table(segment) for segment in segments])
+        metadata = dict(table.schema.metadata or {})
+        metadata.pop(_WAL_FOLD_KEY.encode(), None)
+
+        path = _convert_parquet_name_to_path_(table_info.name)
+        try:
+            table = _write_parquet_file_(
+                table.replace_schema_metadata(metadata), path, table_info
+            )
+        except pa.ArrowIOError as err_io:
+            raise err_io
+        finally:
+            _TABLE_CACHE_.bump_version(table_info.name)
+
+        for fragment in fragments:
+            index_path = _convert_segment_path_to_index_path_(fragment)
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            os.remove(fragment)
+        keys = table.column(table_info.index_col()).combine_chunks()
+        _write_key_index_(keys, path, table_info)
+        _write_sidecars(table_info)
+
+
+def _replace_appended_records(path: str, keys: pa.Array, table_info: TableInfo) -> None:
+    """Remove a rewritten table's append fragments & logs, and rebuild its index & sidecars."""
+    shutil.rmtree(
+        _convert_parquet_name_to_append_dir_(table_info.name), ignore_errors=True
+    )
+    if table_info.write_ahead_log:
+        _write_ahead_log_(table_info.name).remove()
+    _write_key_index_(keys, path, table_info)
+    _write_sidecars(table_info)
+
+
+def _write_sidecars(table_info: TableInfo) -> None:
+    """Rebuild the member eligibility sidecar & Arrow mirror of a table that was written."""
+    _write_member_eligibility_(table_info)
+    if table_info.ipc_mirror:
+        # Reading the table rebuilds its mirror, which is now out of date
+        _read_table_(table_info)
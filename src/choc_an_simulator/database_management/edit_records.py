@@ -1,9 +1,21 @@
 """Functions for adding to, updating, or removing from the database."""
-from typing import Any, Dict, Optional, cast
+from typing import Any, Dict, Iterable, List, Mapping, Union
+import numpy as np
 import pandas as pd
 import pyarrow as pa
-from .load_records import _load_all_records_from_file_
-from ._write_records import _overwrite_records_to_file_
+import pyarrow.compute as pc
+from .load_records import _load_all_records_from_file_, _read_table_
+from ._key_index import _contains_any_keys_, _contains_keys_, _find_key_positions_
+from ._write_records import (
+    _overwrite_table_to_file_,
+    _append_records_to_file_,
+    _append_records_to_partitions_,
+    _append_records_to_write_ahead_log_,
+    _compact_records_file_,
+    _needs_compaction_,
+    _rewriting_table_,
+)
+from .storage_engines import _storage_engine_
 from ..schemas import TableInfo
 
 
@@ -11,6 +23,14 @@ def add_records_to_file(records: pd.DataFrame, table_info: TableInfo) -> None:
     """
     Add new records to an existing Parquet file based on the provided schema.
 
+    Only the new records are validated and written. They are stored as an append fragment next
+    to the file, so the cost of adding records doesn't grow with the size of the table. Once
+    enough fragments accumulate, they are compacted back into the file.
+    Records of tables with a write-ahead log, like the service log, are appended to the log
+    instead, and folded into a fragment in the background once the log is large enough.
+    Records of partitioned tables are only added to the partitions they belong in.
+    When a storage engine is in use, the records are appended to its table instead.
+
     Args-
         records (pd.DataFrame): New records to be added.
         table_info (TableInfo): Object containing schema and other table-related information.
@@ -24,25 +44,40 @@ def add_records_to_file(records: pd.DataFrame, table_info: TableInfo) -> None:
         ArithmeticError: Value exceeds a character or numeric limit set by table_info
 
     """
-    # Load file into memory
+    # Check for compatibility with the schema.
+    table_info.check_dataframe(records)
+
+    # Check that the addition will cause no duplicate indices, using the table's key index
     try:
-        existing_records = _load_all_records_from_file_(table_info)
+        if table_info.unique_index and _any_duplicate_values(
+            records[table_info.index_col()], table_info
+        ):
+            raise ValueError("Added entries cause duplicates in the first column.")
     except pa.ArrowInvalid as err_invalid:
         raise err_invalid
     except pa.ArrowIOError as err_io:
         raise err_io
 
-    # Check for compatibility with the schema.
-    table_info.check_dataframe(records)
-
-    # Check that the addition will cause no duplicate indices
-    if _any_duplicate_values(existing_records.iloc[:, 0], records.iloc[:, 0]):
-        raise ValueError("Added entries cause duplicates in the first column.")
-
-    # Add the new data and save
-    records = pd.concat([existing_records, records])
+    # Save only the new data
+    engine = _storage_engine_()
+    if engine is not None:
+        engine.append_table(
+            pa.Table.from_pandas(
+                records, schema=table_info.schema, preserve_index=False
+            ),
+            table_info,
+        )
+        return
+    if table_info.partition_col is not None:
+        _append_records_to_partitions_(records, table_info)
+        return
+    if table_info.write_ahead_log:
+        _append_records_to_write_ahead_log_(records, table_info)
+        return
     try:
-        _overwrite_records_to_file_(records, table_info)
+        _append_records_to_file_(records, table_info)
+        if _needs_compaction_(table_info):
+            _compact_records_file_(table_info)
     except pa.ArrowIOError as err_io:
         raise err_io
 
@@ -51,6 +86,8 @@ def update_record(index: Any, table_info: TableInfo, **kwargs) -> pd.Series:
     """
     Update a specific record in a database file based on the provided index and changes.
 
+    When a storage engine is in use, only the record's row is updated.
+
     Args-
         index (Any): Index value of the record to update.
         table_info (TableInfo): Object with schema and table details.
@@ -63,6 +100,7 @@ def update_record(index: Any, table_info: TableInfo, **kwargs) -> pd.Series:
         AssertionError: No key-value pairs provided for update.
         IndexError: Specified index not found in the database.
         KeyError: Mismatch between provided fields & schema.
+        ValueError: The update would give two records the same index value.
         pyarrow.ArrowInvalid: Type mismatch with the schema after update.
         pyarrow.ArrowIOError: I/O error occurs.
 
@@ -83,21 +121,42 @@ def update_record(index: Any, table_info: TableInfo, **kwargs) -> pd.Series:
         )
     """
     assert len(kwargs) > 0, "Must provide at least one key/value pair to update"
-    try:
-        records = _load_all_records_from_file_(table_info)
-    except pa.ArrowInvalid as err_invalid:
-        raise err_invalid
-    except pa.ArrowIOError as err_io:
-        raise err_io
-
-    records = _validate_and_update_fields(records, index, kwargs, table_info)
-
-    try:
-        _overwrite_records_to_file_(records, table_info)
-    except pa.ArrowIOError as err_io:
-        raise err_io
-
-    return cast(pd.Series, _get_row_by_index(records, index))
+    for field_name, updated_value in kwargs.items():
+        _validate_field(updated_value, field_name, table_info)
+    new_index = kwargs.get(table_info.index_col(), index)
+    changes_index = table_info.unique_index and new_index != index
+    engine = _storage_engine_()
+    if engine is not None:
+        if changes_index and engine.contains_keys(table_info, [new_index])[0]:
+            raise ValueError("Updated entry causes duplicates in the first column.")
+        record = engine.update_record(table_info, index, kwargs)
+        if record is None:
+            raise IndexError("Index not found.")
+        return record
+    with _rewriting_table_(table_info):
+        try:
+            positions = _find_key_positions_(table_info, index)
+            if not positions:
+                raise IndexError("Index not found.")
+            if changes_index and _contains_keys_(table_info, [new_index])[0]:
+                raise ValueError("Updated entry causes duplicates in the first column.")
+            table = _read_table_(table_info)
+        except pa.ArrowInvalid as err_invalid:
+            raise err_invalid
+        except pa.ArrowIOError as err_io:
+            raise err_io
+        if table is None or positions[0] >= table.num_rows:
+            raise IndexError("Index not found.")
+        table_info.check_columns(table.schema.names)
+
+        table = _set_fields(table.select(table_info.schema.names), positions[0], kwargs)
+
+        try:
+            _overwrite_table_to_file_(table, table_info)
+        except pa.ArrowIOError as err_io:
+            raise err_io
+
+    return table.slice(positions[0], 1).to_pandas().iloc[0]
 
 
 def remove_record(index: Any, table_info: TableInfo) -> bool:
@@ -122,112 +181,233 @@ def remove_record(index: Any, table_info: TableInfo) -> bool:
         else:
             print("Member 1234 Not Found.")
     """
-    try:
-        records = _load_all_records_from_file_(table_info)
-    except pa.ArrowInvalid as err_invalid:
-        raise err_invalid
-    except pa.ArrowIOError as err_io:
-        raise err_io
+    engine = _storage_engine_()
+    if engine is not None:
+        return bool(engine.remove_records(table_info, [index])[0])
+    with _rewriting_table_(table_info):
+        try:
+            # If the index isn't in the key index, there's nothing to remove.
+            if not _find_key_positions_(table_info, index):
+                return False
+        except pa.ArrowInvalid as err_invalid:
+            raise err_invalid
+        except pa.ArrowIOError as err_io:
+            raise err_io
+        _remove_found_keys(table_info, [index])
+    return True
 
-    num_records_before = len(records)
-    records = records[records[table_info.index_col()] != index]
-    # If records are the same size after removing the index, index did not exist.
-    if len(records) == num_records_before:
-        return False
 
-    try:
-        _overwrite_records_to_file_(records, table_info)
-    except pa.ArrowIOError as err_io:
-        raise err_io
-    return True
+def update_records(
+    updates: Union[pd.DataFrame, Mapping[Any, Mapping[str, Any]]],
+    table_info: TableInfo,
+) -> Dict[Any, bool]:
+    """
+    Update many records of a database file at once.
 
+    The file is loaded once, every change is applied and validated in one vectorized pass, and
+    the file is written once. If any change is invalid, nothing is written. As with
+    update_record, only the first record with each index value is updated.
 
-def _any_duplicate_values(col_a: pd.Series, col_b: pd.Series) -> bool:
-    """Check if two series contain any duplicate values."""
-    return col_a.isin(col_b).any()
+    Args-
+        updates (Union[pd.DataFrame, Mapping[Any, Mapping[str, Any]]]):
+            Either a DataFrame indexed by the index values of the records to update, whose
+            columns are the fields to set, or a mapping of index value -> {field: new value}.
+        table_info (TableInfo): Object with schema and table details.
 
+    Returns-
+        Dict[Any, bool]: For each index value, True if its record was updated, or False if
+            the index value wasn't found.
 
-def _get_row_by_index(records: pd.DataFrame, index: Any) -> Optional[pd.Series]:
+    Raises-
+        KeyError: Mismatch between provided fields & schema.
+        TypeError: Type of an updated value is incorrect.
+        ArithmeticError: An updated value is out of numeric or character range.
+        ValueError: The updates would give two records the same index value.
+        pyarrow.ArrowInvalid: Invalid file format.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        # Suspend members 1234 and 5678
+        outcomes = update_records({1234: {"suspended": True}, 5678: {"suspended": True}},
+                                  MEMBER_INFO)
+
+        # Suspend every member in a DataFrame of overdue members
+        outcomes = update_records(overdue.set_index("member_id")[["suspended"]], MEMBER_INFO)
+    """
+    field_updates = _field_updates(updates)
+    keys = list(
+        dict.fromkeys(key for values in field_updates.values() for key in values.index)
+    )
+    for field_name in field_updates:
+        if field_name not in table_info.schema.names:
+            raise KeyError(f"Field {field_name} not found in schema.")
+    with _rewriting_table_(table_info):
+        try:
+            found = _contains_keys_(table_info, keys)
+            outcomes = dict(zip(keys, found.tolist()))
+            if not found.any():
+                return outcomes
+            records = _load_all_records_from_file_(table_info)
+        except pa.ArrowInvalid as err_invalid:
+            raise err_invalid
+        except pa.ArrowIOError as err_io:
+            raise err_io
+
+        index_values = records[table_info.index_col()]
+        first_records = ~index_values.duplicated(keep="first")
+        changed = pd.Series(False, index=records.index)
+        for field_name, values in field_updates.items():
+            mask = first_records & index_values.isin(values.index)
+            # Set the values on an object column, so a value of the wrong type can't be
+            # silently coerced, then restore the column's type for validation.
+            column = records[field_name].astype(object)
+            column[mask] = index_values[mask].map(values).to_numpy()
+            records[field_name] = column.infer_objects()
+            changed |= mask
+
+        try:
+            table_info.check_dataframe(records[changed])
+        except KeyError as err_key:
+            raise err_key
+        except TypeError as err_type:
+            raise err_type
+        except ArithmeticError as err_limit:
+            raise err_limit
+        if (
+            table_info.unique_index
+            and records[table_info.index_col()].duplicated().any()
+        ):
+            raise ValueError("Updated entries cause duplicates in the first column.")
+
+        # Only the changed records were validated, since the rest were validated when written
+        table = pa.Table.from_pandas(
+            records, schema=table_info.schema, preserve_index=False
+        )
+        try:
+            _overwrite_table_to_file_(table, table_info)
+        except pa.ArrowIOError as err_io:
+            raise err_io
+    return outcomes
+
+
+def remove_records(indices: Iterable[Any], table_info: TableInfo) -> Dict[Any, bool]:
     """
-    Get a row by matching an index to the first column.
+    Remove many records from a database file at once, with a single load and write.
 
     Args-
-        records (pd.DataFrame): Records to search for index
-        index (Any): The index to search the first column for
+        indices (Iterable[Any]): Index values of the records to be removed.
+        table_info (TableInfo): Object with schema and table details.
 
     Returns-
-        pd.Series: The matching row
-        None: No matching row found.
+        Dict[Any, bool]: For each index value, True if its records were removed, or False if
+            the index value wasn't found.
+
+    Raises-
+        pyarrow.ArrowInvalid: Invalid file format.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        outcomes = remove_records([1234, 5678], MEMBER_INFO)
+        not_found = [member_id for member_id, removed in outcomes.items() if not removed]
+    """
+    keys = list(dict.fromkeys(indices))
+    engine = _storage_engine_()
+    if engine is not None:
+        return dict(zip(keys, engine.remove_records(table_info, keys).tolist()))
+    with _rewriting_table_(table_info):
+        try:
+            found = _contains_keys_(table_info, keys)
+            outcomes = dict(zip(keys, found.tolist()))
+            if not found.any():
+                return outcomes
+        except pa.ArrowInvalid as err_invalid:
+            raise err_invalid
+        except pa.ArrowIOError as err_io:
+            raise err_io
+        _remove_found_keys(table_info, [key for key in keys if outcomes[key]])
+    return outcomes
+
+
+def _remove_found_keys(table_info: TableInfo, found_keys: List[Any]) -> None:
     """
-    rows = records.loc[records.iloc[:, 0] == index]
-    if rows.empty:
-        return None
-    return rows.iloc[0]
+    Rewrite a table without every record with one of the keys, which were found in its index.
+
+    The records are filtered as Arrow with a mask over the index column, and written without
+    converting them to pandas or validating them again, since none of their values changed.
+    """
+    try:
+        table = _read_table_(table_info)
+    except pa.ArrowInvalid as err_invalid:
+        raise err_invalid
+    except pa.ArrowIOError as err_io:
+        raise err_io
+    if table is None:
+        return
+    table_info.check_columns(table.schema.names)
+
+    index_col = table_info.index_col()
+    removed = pc.is_in(
+        table.column(index_col),
+        value_set=pa.array(
+            found_keys, type=table_info.schema.field(index_col).type, from_pandas=True
+        ),
+    )
+    table = table.select(table_info.schema.names).filter(pc.invert(removed))
+
+    try:
+        _overwrite_table_to_file_(table, table_info)
+    except pa.ArrowIOError as err_io:
+        raise err_io
+
 
+def _any_duplicate_values(keys: pd.Series, table_info: TableInfo) -> bool:
+    """Check if any keys are already in the index column of a table."""
+    return _contains_any_keys_(table_info, keys)
 
-def _validate_and_update_fields(
-        records: pd.DataFrame,
-        index: int,
-        field_updates: Dict[str, Any],
-        table_info: TableInfo,
-) -> pd.DataFrame:
+
+def _set_fields(
+    table: pa.Table, position: int, field_updates: Dict[str, Any]
+) -> pa.Table:
     """
-    Validates and updates specified fields in a record of a DataFrame.
+    Set fields of one row of a table, returning a new table.
 
-    This function iterates over each field to be updated, validates the value against
-    the schema defined in 'table_info', and applies the update to the record at the
-    specified index in the DataFrame.
+    Each updated column is rebuilt with a single masked replacement. Untouched columns are
+    shared with the original table rather than copied.
 
     Args-
-        records (pd.DataFrame): The DataFrame containing the records.
-        index (int): The index of the record in the DataFrame to be updated.
-        field_updates (Dict[str, Any]): A dictionary containing field names as keys and
-                                        the corresponding new values as values.
-        table_info (TableInfo): An object containing the schema information and other
-                                details about the table.
+        table (pa.Table): The table's records.
+        position (int): Position of the row to update.
+        field_updates (Dict[str, Any]): Validated field names and their new values.
 
     Returns-
-        pd.DataFrame: The updated records.
-
-    Raises-
-        KeyError: If a field name in 'field_updates' does not exist in the table schema.
-        TypeError: If the type of a value in 'field_updates' does not match the expected
-                   type defined in the table schema.
-        ArithmeticError: If a value in 'field_updates' falls outside the acceptable range
-                         defined for that field in the table schema.
-        IndexError: The index was not found.
-    """
-    row = _get_row_by_index(records, index)
-    if row is None:
-        raise IndexError("Index not found.")
+        pa.Table: The records, with the row's fields updated.
+    """
+    mask = np.zeros(table.num_rows, dtype=bool)
+    mask[position] = True
+    row_mask = pa.array(mask)
     for field_name, updated_value in field_updates.items():
-        _validate_and_update_field(row, field_name, updated_value, table_info)
-
-    return records
+        col_index = table.schema.get_field_index(field_name)
+        column = table.column(col_index)
+        updated_column = pc.replace_with_mask(
+            column, row_mask, pa.array([updated_value], type=column.type)
+        )
+        table = table.set_column(col_index, table.field(col_index), updated_column)
+    return table
 
 
-def _validate_and_update_field(
-        row: pd.Series,
-        field_name: str,
-        updated_value: Any,
-        table_info: TableInfo,
-) -> pd.Series:
+def _validate_field(updated_value: Any, field_name: str, table_info: TableInfo) -> None:
     """
-    Check that a field is valid, and then write it to its location in a dataframe.
+    Check that a new value is valid for a field.
 
     Args-
-        row (pd.Series): Row containing the data to change.
-        field_name (str): Field within row to change.
         updated_value (Any): Value to set.
-        table_info (TableInfo): Validation information for the row.
+        field_name (str): Field to set.
+        table_info (TableInfo): Validation information for the field.
 
     Raises-
-        KeyError: Field is not in row.
+        KeyError: Field is not in the schema.
         TypeError: Type of updated_value is incorrect.
         ArithmeticError: updated_value is out of numeric or character range.
-
-    Returns-
-        pd.Series: row with updated field.
     """
     try:
         table_info.check_field(updated_value, field_name)
@@ -237,5 +417,23 @@ def _validate_and_update_field(
         raise err_type
     except ArithmeticError as err_out_of_range:
         raise err_out_of_range
-    row[field_name] = updated_value
-    return row
+
+
+def _field_updates(
+    updates: Union[pd.DataFrame, Mapping[Any, Mapping[str, Any]]],
+) -> Dict[str, pd.Series]:
+    """New values of each updated field, as a Series indexed by the records' index values."""
+    if isinstance(updates, pd.DataFrame):
+        if updates.index.has_duplicates:
+            raise ValueError("Each index value may only be updated once.")
+        return {str(field_name): updates[field_name] for field_name in updates.columns}
+    field_values: Dict[str, Dict[Any, Any]] = {}
+    for key, fields in updates.items():
+        for field_name, updated_value in fields.items():
+            field_values.setdefault(field_name, {})[key] = updated_value
+    return {
+        field_name: pd.Series(
+            list(values.values()), index=list(values.keys()), dtype=object
+        )
+        for field_name, values in field_values.items()
+    }
@@ -1,33 +1,107 @@
 """Functions for loading data from the database."""
-from typing import Dict, Callable, Any, Optional
+from typing import Dict, Callable, Any, Iterable, List, Optional, Sequence, Tuple
 import operator
+import numpy as np
 import pandas as pd
 import pyarrow as pa
-from ._parquet_utils import _convert_parquet_name_to_path_
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ._partitions import _list_partitions_, _partition_date_range_
+from .storage_engines import _storage_engine_
+from ._ipc_mirror import _load_ipc_mirror_, _mirror_signature_, _write_ipc_mirror_
+from ._key_index import _contains_keys_, _read_row_by_key_
+from ._table_cache import _TABLE_CACHE_, _table_signature_
+from ._write_ahead_log import _read_write_ahead_logs_
 from ..schemas import TableInfo
 
 
+def load_table(
+    table_info: TableInfo,
+    eq_cols: Optional[Dict[str, Any]] = None,
+    lt_cols: Optional[Dict[str, Any]] = None,
+    gt_cols: Optional[Dict[str, Any]] = None,
+    columns: Optional[List[str]] = None,
+) -> pa.Table:
+    """
+    Load records as an Arrow table, optionally applying filters for record selection.
+
+    The records are never converted to pandas, so tables read from a memory-mapped mirror or the
+    table cache are returned without being copied. Filters and columns are pushed down to the
+    Parquet reader as in load_records_from_file.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        eq_cols (Optional[Dict[str, Any]]): Specifies columns and values for equality filtering.
+        lt_cols (Optional[Dict[str, Any]]): Specifies columns and values for less-than filtering.
+        gt_cols (Optional[Dict[str, Any]]): Specifies columns and values for greater-than filtering.
+        columns (Optional[List[str]]):
+            Columns to load, in the order they should appear. Loads every column if None.
+            Filters may use columns that aren't loaded.
+
+    Returns-
+        pa.Table: Records matching the filters, or an empty table of the schema if none do.
+
+    Raises-
+        KeyError: Mismatch between schema & records, or a column isn't in the schema.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+        TypeError: Unsupported type comparisons in filters.
+
+    Examples-
+        # Count the services rendered by provider 123456789
+        services = load_table(SERVICE_LOG_INFO, eq_cols={"provider_id": 123456789})
+        print(services.num_rows)
+    """
+    # Build filters
+    row_filter = _build_filter(None, eq_cols, operator.eq, table_info.schema)
+    row_filter = _build_filter(row_filter, lt_cols, operator.lt, table_info.schema)
+    row_filter = _build_filter(row_filter, gt_cols, operator.gt, table_info.schema)
+    comparisons = _comparisons_(eq_cols, lt_cols, gt_cols)
+
+    # Only partitions whose dates can match the filters are read
+    date_range = _partition_date_range_(table_info, eq_cols, lt_cols, gt_cols)
+
+    try:
+        return _load_table_(table_info, row_filter, columns, date_range, comparisons)
+    except pa.ArrowInvalid as err_invalid:
+        raise err_invalid
+    except pa.ArrowIOError as err_io:
+        raise err_io
+    except KeyError as err_key:
+        raise err_key
+
+
 def load_records_from_file(
     table_info: TableInfo,
     eq_cols: Optional[Dict[str, Any]] = None,
     lt_cols: Optional[Dict[str, Any]] = None,
     gt_cols: Optional[Dict[str, Any]] = None,
+    columns: Optional[List[str]] = None,
 ) -> pd.DataFrame:
     """
     Load records from a Parquet file, optionally applying filters for record selection.
 
+    Filters are pushed down to the Parquet reader, so row groups whose min/max statistics can't
+    match the filters are skipped rather than read. For partitioned tables, partitions whose
+    dates can't match the filters aren't opened at all. Likewise, if columns are given, only those
+    columns are read from the file and decompressed. The records are loaded with load_table, and
+    converted to a DataFrame.
+
     Args-
         table_info (TableInfo): Object with schema and table details.
         eq_cols (Optional[Dict[str, Any]]): Specifies columns and values for equality filtering.
         lt_cols (Optional[Dict[str, Any]]): Specifies columns and values for less-than filtering.
         gt_cols (Optional[Dict[str, Any]]): Specifies columns and values for greater-than filtering.
+        columns (Optional[List[str]]):
+            Columns to load, in the order they should appear. Loads every column if None.
+            Filters may use columns that aren't loaded.
 
     Returns-
         pd.DataFrame:
             Records matching the specified filters, or all records if no filters are applied.
 
     Raises-
-        KeyError: Mismatch between schema & records.
+        KeyError: Mismatch between schema & records, or a column isn't in the schema.
         pyarrow.ArrowTypeError: Type mismatch in the added records.
         pyarrow.ArrowInvalid: Schema-dataframe mismatch.
         pyarrow.ArrowIOError: I/O error occurs.
@@ -48,9 +122,44 @@ def load_records_from_file(
             table_info = example_table_info,
             eq_cols = {"ID" : 1234}
         )
+
+        #Ex 4. Get only the names of every record
+        names = load_records_from_file(example_table_info, columns=["name"])
     """
+    records = load_table(table_info, eq_cols, lt_cols, gt_cols, columns).to_pandas()
+    if columns is not None:
+        table_info = table_info.select(columns)
     try:
-        records = _load_all_records_from_file_(table_info)
+        table_info.check_dataframe(records)
+    except KeyError as err_mismatch:
+        raise err_mismatch
+    return records
+
+
+def contains_keys(table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+    """
+    Check which of many values are in a table's index column, without loading the table.
+
+    The values are looked up in the table's key index, all at once.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        keys (Iterable[Any]): Values of the index column to search for.
+
+    Returns-
+        np.ndarray: Boolean mask of which values are in the table, in the order given.
+
+    Raises-
+        KeyError: The table's index column isn't in the file.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        # Which of these services are in the provider directory?
+        found = contains_keys(PROVIDER_DIRECTORY_INFO, [100001, 100002, 999999])
+    """
+    try:
+        return _contains_keys_(table_info, keys)
     except pa.ArrowInvalid as err_invalid:
         raise err_invalid
     except pa.ArrowIOError as err_io:
@@ -58,52 +167,143 @@ def load_records_from_file(
     except KeyError as err_key:
         raise err_key
 
-    # Apply filters
-    records = _apply_filter(records, eq_cols, operator.eq, table_info)
-    records = _apply_filter(records, lt_cols, operator.lt, table_info)
-    records = _apply_filter(records, gt_cols, operator.gt, table_info)
 
-    return records
+def contains_key(table_info: TableInfo, key: Any) -> bool:
+    """
+    Check whether a value is in a table's index column, without loading the table.
 
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        key (Any): Value of the index column to search for.
 
-def _apply_filter(
-    records: pd.DataFrame,
+    Returns-
+        bool: True if a record has the key.
+
+    Raises-
+        KeyError: The table's index column isn't in the file.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        if not contains_key(USER_INFO, provider_id):
+            print("Invalid Provider ID")
+    """
+    return bool(contains_keys(table_info, [key])[0])
+
+
+def load_record_by_key(table_info: TableInfo, key: Any) -> Optional[pd.Series]:
+    """
+    Load the record with a value in the table's index column, without loading the table.
+
+    The record is found with the table's key index, and only the row group holding it is read.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        key (Any): Value of the index column to search for.
+
+    Returns-
+        pd.Series: The first record with the key.
+        None: No record has the key.
+
+    Raises-
+        KeyError: The table's index column isn't in the file.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        service = load_record_by_key(PROVIDER_DIRECTORY_INFO, 100001)
+        if service is not None:
+            print(service["service_name"])
+    """
+    try:
+        return _read_row_by_key_(table_info, key)
+    except pa.ArrowInvalid as err_invalid:
+        raise err_invalid
+    except pa.ArrowIOError as err_io:
+        raise err_io
+    except KeyError as err_key:
+        raise err_key
+
+
+def _build_filter(
+    row_filter: Optional[pc.Expression],
     col_filters: Optional[Dict[str, Any]],
     operator: Callable,
-    table_info: TableInfo,
-) -> pd.DataFrame:
+    schema: pa.Schema,
+) -> Optional[pc.Expression]:
     """
-    Apply a filter to the DataFrame based on the specified operator.
+    Add comparisons to a filter expression, to be evaluated by the Parquet reader.
 
     Args-
-        records (pd.DataFrame): The DataFrame to be filtered.
+        row_filter (Optional[pc.Expression]): Filter to add to, or None to start a new filter.
         col_filters (Dict[str, DB_FIELD_PYTYPE]): The columns and values for filtering.
         operator (Callable): The comparison operator (e.g., eq, lt, gt).
-        table_info (TableInfo): Object with schema and table details.
+        schema (pa.Schema): Schema of the records to filter.
 
     Returns-
-        pd.DataFrame: Filtered DataFrame.
+        Optional[pc.Expression]: The combined filter, or None if there are no filters.
+
+    Raises-
+        KeyError: A column isn't in the schema.
+        TypeError: The comparison isn't supported for the column's type.
     """
     if col_filters is None:
-        return records
+        return row_filter
+    # Comparisons are checked against an empty table, so a bad filter fails before any reads.
+    empty_table = schema.empty_table()
     for col, val in col_filters.items():
-        if col not in table_info.schema.names:
+        if col not in schema.names:
             raise KeyError(f"Column name {col} not found in schema.")
         try:
-            records = records[operator(records[col], val)]
-        except TypeError as err_type:
+            comparison = operator(pc.field(col), _to_scalar(val, schema, col))
+            empty_table.filter(comparison)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as err:
             raise TypeError(
-                f"{err_type}: Operation {operator} on {col} with value {val} not supported."
+                f"{err}: Operation {operator} on {col} with value {val} not supported."
             )
-    return records
+        row_filter = comparison if row_filter is None else row_filter & comparison
+    return row_filter
+
+
+def _comparisons_(
+    eq_cols: Optional[Dict[str, Any]],
+    lt_cols: Optional[Dict[str, Any]],
+    gt_cols: Optional[Dict[str, Any]],
+) -> List[Tuple[str, str, Any]]:
+    """Internal function to list filters as (column, operator, value), for storage engines."""
+    return [
+        (col, op, val)
+        for col_filters, op in [(eq_cols, "=="), (lt_cols, "<"), (gt_cols, ">")]
+        for col, val in (col_filters or {}).items()
+    ]
+
+
+def _to_scalar(val: Any, schema: pa.Schema, col: str) -> pa.Scalar:
+    """Convert a filter value to an Arrow scalar, of the column's type if possible."""
+    try:
+        return pa.scalar(val, type=schema.field(col).type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return pa.scalar(val)
 
 
-def _load_all_records_from_file_(table_info: TableInfo) -> pd.DataFrame:
+def _load_all_records_from_file_(
+    table_info: TableInfo,
+    row_filter: Optional[pc.Expression] = None,
+    columns: Optional[List[str]] = None,
+    date_range: Optional[Tuple[Any, Any]] = None,
+) -> pd.DataFrame:
     """
     Internal function to load all records from a Parquet file into a DataFrame.
 
+    Records appended to the file since it was last written are included, in the order they
+    were appended, followed by any records in the table's write-ahead logs.
+
     Args-
         table_info (TableInfo): Object with schema and table details.
+        row_filter (Optional[pc.Expression]): Only load records matching this filter.
+        columns (Optional[List[str]]): Only load these columns. Loads every column if None.
+        date_range (Optional[Tuple[Any, Any]]):
+            Only read the partitions of a partitioned table with dates in this range.
 
     Returns-
         pd.DataFrame:
@@ -114,19 +314,205 @@ def _load_all_records_from_file_(table_info: TableInfo) -> pd.DataFrame:
         pyarrow.ArrowIOError: I/O error occurs.
         KeyError: File columns do not match schema.
     """
-    path = _convert_parquet_name_to_path_(table_info.name)
+    records = _load_table_(table_info, row_filter, columns, date_range).to_pandas()
+    if columns is not None:
+        table_info = table_info.select(columns)
+    try:
+        table_info.check_dataframe(records)
+    except KeyError as err_mismatch:
+        raise err_mismatch
+
+    return records
+
+
+def _load_table_(
+    table_info: TableInfo,
+    row_filter: Optional[pc.Expression] = None,
+    columns: Optional[List[str]] = None,
+    date_range: Optional[Tuple[Any, Any]] = None,
+    comparisons: Sequence[Tuple[str, str, Any]] = (),
+) -> pa.Table:
+    """
+    Internal function to load all records of a table into an Arrow table.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        row_filter (Optional[pc.Expression]): Only load records matching this filter.
+        columns (Optional[List[str]]): Only load these columns. Loads every column if None.
+        date_range (Optional[Tuple[Any, Any]]):
+            Only read the partitions of a partitioned table with dates in this range.
+        comparisons (Sequence[Tuple[str, str, Any]]):
+            The filter as (column, operator, value) comparisons, for a storage engine to run.
+
+    Returns-
+        pa.Table: Every record of the table, or an empty table of the schema if no file was found.
+
+    Raises-
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+        KeyError: File columns do not match schema.
+    """
+    if columns is not None:
+        table_info = table_info.select(columns)
     try:
-        records = pd.read_parquet(path)
-    except FileNotFoundError:
-        return pa.Table.from_pylist([], schema=table_info.schema).to_pandas()
+        table = _read_table_(table_info, columns, row_filter, date_range, comparisons)
     except pa.ArrowIOError as err_io:
         raise err_io
     except pa.ArrowInvalid as err_invalid:
         raise err_invalid
-
+    if table is None:
+        return table_info.schema.empty_table()
     try:
-        table_info.check_dataframe(records)
+        table_info.check_columns(table.schema.names)
     except KeyError as err_mismatch:
         raise err_mismatch
+    return table
 
-    return records
+
+def _read_table_(
+    table_info: TableInfo,
+    columns: Optional[List[str]] = None,
+    row_filter: Optional[pc.Expression] = None,
+    date_range: Optional[Tuple[Any, Any]] = None,
+    comparisons: Sequence[Tuple[str, str, Any]] = (),
+) -> Optional[pa.Table]:
+    """
+    Internal function to read a table's Parquet file and append fragments into one Arrow table.
+
+    Records in the table's write-ahead logs, if it has any, are merged in after the fragments.
+    Partitioned tables are read one partition at a time, oldest first. When a storage engine is
+    in use, the table is read from the engine instead, which selects the columns and runs the
+    comparisons itself (as SQL), so only matching records are ever read.
+
+    Tables are read through the in-process table cache, and cached tables are filtered in
+    memory. On a cache miss, only unfiltered reads of every column read the whole table and
+    cache it (if it fits within the cache's budget). Filtered reads push the filters and columns
+    down to the Parquet reader instead, so row groups are skipped without decoding them. Tables
+    with an Arrow mirror are read from the memory-mapped mirror instead of their Parquet files.
+
+    Args-
+        table_info (TableInfo): Object with schema and table details.
+        columns (Optional[List[str]]): Only read these columns. Reads all columns if None.
+        row_filter (Optional[pc.Expression]):
+            Only read records matching this filter. Row groups are skipped using their statistics.
+        date_range (Optional[Tuple[Any, Any]]):
+            Only read the partitions of a partitioned table with dates in this range.
+        comparisons (Sequence[Tuple[str, str, Any]]):
+            The filter as (column, operator, value) comparisons, for a storage engine to run.
+
+    Returns-
+        pa.Table: The table's records, or None if nothing has been written to the table.
+
+    Raises-
+        KeyError: One of the columns isn't in a file.
+        pyarrow.ArrowInvalid: File format is invalid, or files have mismatched columns.
+        pyarrow.ArrowIOError: I/O error occurs.
+    """
+    engine = _storage_engine_()
+    if engine is not None:
+        return engine.read_table(table_info, columns, comparisons)
+
+    if table_info.partition_col is not None:
+        partitions = [
+            _read_table_(partition_info, columns, row_filter)
+            for partition_info in _list_partitions_(table_info, date_range)
+        ]
+        partitions = [table for table in partitions if table is not None]
+        return pa.concat_tables(partitions) if partitions else None
+
+    signature = _table_signature_(table_info.name, table_info.write_ahead_log)
+    _, files, logs = signature
+    if not files and not logs:
+        return None
+
+    table = _TABLE_CACHE_.get(table_info.name, signature)
+    if table is None and table_info.ipc_mirror:
+        table = _read_mirrored_table(table_info, files, logs)
+        if table is None:
+            return None
+        _TABLE_CACHE_.put(table_info.name, signature, table)
+    if table is None and columns is None and row_filter is None:
+        table = _concat_with_logs(
+            [_read_segment(path, None, None) for path, _, _ in files], table_info
+        )
+        if table is None:
+            return None
+        _TABLE_CACHE_.put(table_info.name, signature, table)
+    if table is None:
+        segments = [_read_segment(path, columns, row_filter) for path, _, _ in files]
+        log_table = _read_write_ahead_logs_(table_info.name) if logs else None
+        if log_table is not None:
+            log_table = _filter_table(log_table, table_info, columns, row_filter)
+            segments.append(_match_segments(log_table, segments))
+        return pa.concat_tables(segments) if segments else None
+
+    return _filter_table(table, table_info, columns, row_filter)
+
+
+def _read_mirrored_table(
+    table_info: TableInfo,
+    files: Tuple[Tuple[str, int, int], ...],
+    logs: Tuple[Tuple[str, int, int], ...],
+) -> Optional[pa.Table]:
+    """Memory-map a table's Arrow mirror, rebuilding it from the table's files if out of date."""
+    signature = _mirror_signature_(files + logs)
+    table = _load_ipc_mirror_(table_info.name, signature)
+    if table is not None:
+        return table
+    table = _concat_with_logs(
+        [_read_segment(path, None, None) for path, _, _ in files], table_info
+    )
+    if table is None:
+        return None
+    return _write_ipc_mirror_(table_info.name, table, signature)
+
+
+def _concat_with_logs(
+    segments: List[pa.Table], table_info: TableInfo
+) -> Optional[pa.Table]:
+    """Concatenate a table's Parquet segments, followed by any records in its write-ahead logs."""
+    if table_info.write_ahead_log:
+        log_table = _read_write_ahead_logs_(table_info.name)
+        if log_table is not None:
+            segments = segments + [_match_segments(log_table, segments)]
+    return pa.concat_tables(segments) if segments else None
+
+
+def _match_segments(log_table: pa.Table, segments: List[pa.Table]) -> pa.Table:
+    """
+    Cast records read from a write-ahead log to the types read from the Parquet segments.
+
+    Parquet has no millisecond date type, so date64 columns are read back from Parquet as
+    date32, while logs keep the type the records were written with.
+    """
+    if not segments or log_table.schema.equals(segments[0].schema):
+        return log_table
+    return log_table.cast(segments[0].schema)
+
+
+def _filter_table(
+    table: pa.Table,
+    table_info: TableInfo,
+    columns: Optional[List[str]],
+    row_filter: Optional[pc.Expression],
+) -> pa.Table:
+    """Filter and select the columns of a table that's already in memory."""
+    if row_filter is not None:
+        table = table.filter(row_filter)
+    if columns is not None:
+        missing = set(columns) - set(table.schema.names)
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {table_info.name}.")
+        table = table.select(columns)
+    return table
+
+
+def _read_segment(
+    path: str, columns: Optional[List[str]], row_filter: Optional[pc.Expression]
+) -> pa.Table:
+    """Read one Parquet file of a table, checking that it has the requested columns."""
+    if columns is not None:
+        missing = set(columns) - set(pq.read_schema(path).names)
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {path}.")
+    return pq.read_table(path, columns=columns, filters=row_filter)
@@ -0,0 +1,160 @@
+"""Functions for migrating database files written by older versions of the ChocAn Simulator."""
+from dataclasses import replace
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from ._parquet_utils import (
+    _convert_parquet_name_to_append_dir_,
+    _convert_parquet_name_to_path_,
+    _convert_segment_path_to_index_path_,
+    _list_segments_,
+)
+from ._write_records import (
+    _overwrite_records_to_file_,
+    _overwrite_table_to_file_,
+    _rewriting_table_,
+)
+from ._partitions import _split_by_partition_
+from ._write_ahead_log import _write_ahead_log_
+from .load_records import _read_table_
+from ._table_cache import _TABLE_CACHE_
+from .storage_engines import _storage_engine_
+from ..schemas import (
+    MONEY_TYPE,
+    PROVIDER_DIRECTORY_INFO,
+    SERVICE_LOG_INFO,
+    RecordLimitError,
+)
+
+
+def migrate_provider_directory_prices() -> bool:
+    """
+    Convert the provider directory's prices from dollars & cents columns to a price in cents.
+
+    Older provider directories stored each price in "price_dollars" and "price_cents" columns.
+    These are replaced by a single "price" column, holding the whole price in cents. Files that
+    were already migrated are left as they are, so it's safe to run this every time the
+    simulator starts. Nothing is migrated when a storage engine is in use.
+
+    Returns-
+        bool: True if the provider directory was migrated.
+
+    Raises-
+        KeyError: Mismatch between the migrated records and the schema columns.
+        RecordLimitError (ArithmeticError): A migrated price is outside the price limit. The
+            provider directory is left as it was, so those prices can be corrected first.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        if migrate_provider_directory_prices():
+            print("Provider directory prices converted to cents.")
+    """
+    if _storage_engine_() is not None:
+        return False
+    with _rewriting_table_(PROVIDER_DIRECTORY_INFO):
+        segments = _list_segments_(PROVIDER_DIRECTORY_INFO.name)
+        if not any("price_dollars" in pq.read_schema(path).names for path in segments):
+            return False
+
+        # Fold the base file and any append fragments into one migrated file
+        tables = []
+        for path in segments:
+            table = pq.read_table(path)
+            if "price_dollars" in table.column_names:
+                table = _combine_price_columns(table)
+            tables.append(
+                table.select(PROVIDER_DIRECTORY_INFO.schema.names).cast(
+                    PROVIDER_DIRECTORY_INFO.schema
+                )
+            )
+        records = pa.concat_tables(tables).to_pandas()
+        _check_migrated_prices(records)
+        _overwrite_records_to_file_(records, PROVIDER_DIRECTORY_INFO)
+    return True
+
+
+def migrate_partitioned_tables() -> bool:
+    """
+    Split the single file of each partitioned table into its date partitions.
+
+    Older versions stored the service log in one file. Its records, including any appended
+    or logged since it was last written, are moved into a partition per period, ahead of any
+    records already in that partition, and the old file is removed. Tables that were already
+    migrated are left as they are, so it's safe to run this every time the simulator starts.
+    Nothing is migrated when a storage engine is in use.
+
+    Returns-
+        bool: True if a table was migrated.
+
+    Raises-
+        ValueError: A record has no date in its table's partition column.
+        pyarrow.ArrowInvalid: File format is invalid.
+        pyarrow.ArrowIOError: I/O error occurs.
+
+    Examples-
+        if migrate_partitioned_tables():
+            print("Service log split into monthly partitions.")
+    """
+    if _storage_engine_() is not None:
+        return False
+    migrated = False
+    for table_info in [SERVICE_LOG_INFO]:
+        single_file_info = replace(table_info, partition_col=None)
+        with _rewriting_table_(single_file_info), _rewriting_table_(table_info):
+            table = _read_table_(single_file_info)
+            if table is None:
+                continue
+            table = table.select(table_info.schema.names).cast(table_info.schema)
+            for partition_info, records in _split_by_partition_(
+                table_info, table
+            ).values():
+                stored = _read_table_(partition_info)
+                if stored is not None:
+                    # Written before an interrupted migration, or added since the upgrade
+                    if stored.equals(records):
+                        continue
+                    records = pa.concat_tables([records, stored.cast(records.schema)])
+                _overwrite_table_to_file_(records, partition_info)
+
+            # Only remove the single file once every partition has been written
+            path = _convert_parquet_name_to_path_(table_info.name)
+            try:
+                shutil.rmtree(
+                    _convert_parquet_name_to_append_dir_(table_info.name),
+                    ignore_errors=True,
+                )
+                _write_ahead_log_(table_info.name).remove()
+                for old_path in [path, _convert_segment_path_to_index_path_(path)]:
+                    if os.path.exists(old_path):
+                        os.remove(old_path)
+            finally:
+                _TABLE_CACHE_.bump_version(table_info.name)
+        migrated = True
+    return migrated
+
+
+def _check_migrated_prices(records: pd.DataFrame) -> None:
+    """Raise a RecordLimitError naming the services whose migrated price is out of range."""
+    limit_range = PROVIDER_DIRECTORY_INFO.numeric_limits["price"]
+    outside = ~records["price"].between(limit_range.start, limit_range.stop)
+    if outside.any():
+        raise RecordLimitError(
+            PROVIDER_DIRECTORY_INFO.name,
+            f"have prices outside {limit_range.start} to {limit_range.stop} cents once "
+            "migrated, so nothing was migrated. Correct the prices of these services",
+            {"service_id": records.loc[outside, "service_id"].tolist()},
+        )
+
+
+def _combine_price_columns(table: pa.Table) -> pa.Table:
+    """Replace the price_dollars & price_cents columns with a price column in cents."""
+    dollars = pc.cast(table.column("price_dollars"), MONEY_TYPE)
+    cents = pc.cast(table.column("price_cents"), MONEY_TYPE)
+    price = pc.add(pc.multiply(dollars, 100), cents)
+    return table.drop_columns(["price_dollars", "price_cents"]).append_column(
+        "price", price
+    )
@@ -0,0 +1,125 @@
+"""
+Arrow-native queries over tables loaded with load_table.
+
+Each function takes and returns pyarrow Tables, and is computed with pyarrow compute kernels,
+so a query over loaded records never goes through pandas. Convert the final result with
+Table.to_pandas() if a DataFrame is needed.
+
+Examples-
+    # Total fee of each provider's services this week
+    services = load_table(SERVICE_LOG_INFO, gt_cols={"service_date_utc": week_start})
+    prices = load_table(PROVIDER_DIRECTORY_INFO, columns=["service_id", "price"])
+    fees = aggregate_table(
+        join_tables(services, prices, "service_id"), ["provider_id"], [("price", "sum")]
+    )
+"""
+from typing import Any, Dict, List, Optional, Tuple, Union
+import operator
+import pyarrow as pa
+from .load_records import _build_filter
+
+# Column numbering the left table's records during a join, so their order can be restored.
+_ROW_NUMBER_COL = "__row_number"
+
+
+def filter_table(
+    table: pa.Table,
+    eq_cols: Optional[Dict[str, Any]] = None,
+    lt_cols: Optional[Dict[str, Any]] = None,
+    gt_cols: Optional[Dict[str, Any]] = None,
+) -> pa.Table:
+    """
+    Select the records of a table matching every filter, in their original order.
+
+    Args-
+        table (pa.Table): Records to filter.
+        eq_cols (Optional[Dict[str, Any]]): Specifies columns and values for equality filtering.
+        lt_cols (Optional[Dict[str, Any]]): Specifies columns and values for less-than filtering.
+        gt_cols (Optional[Dict[str, Any]]): Specifies columns and values for greater-than filtering.
+
+    Returns-
+        pa.Table: The matching records.
+
+    Raises-
+        KeyError: A column isn't in the table.
+        TypeError: Unsupported type comparisons in filters.
+
+    Examples-
+        suspended = filter_table(members, eq_cols={"suspended": True})
+    """
+    row_filter = _build_filter(None, eq_cols, operator.eq, table.schema)
+    row_filter = _build_filter(row_filter, lt_cols, operator.lt, table.schema)
+    row_filter = _build_filter(row_filter, gt_cols, operator.gt, table.schema)
+    return table if row_filter is None else table.filter(row_filter)
+
+
+def join_tables(
+    left: pa.Table,
+    right: pa.Table,
+    keys: Union[str, List[str]],
+    right_keys: Optional[Union[str, List[str]]] = None,
+    join_type: str = "inner",
+) -> pa.Table:
+    """
+    Join two tables on key columns, keeping the records in the order of the left table.
+
+    Args-
+        left (pa.Table): Left table of the join.
+        right (pa.Table): Right table of the join. Its other columns are added after the left's.
+        keys (Union[str, List[str]]): Key columns of the left table.
+        right_keys (Optional[Union[str, List[str]]]):
+            Key columns of the right table, if they're named differently. They aren't kept.
+        join_type (str): "inner", "left outer", "right outer", "full outer", "left semi",
+            "right semi", "left anti" or "right anti". Defaults to "inner".
+
+    Returns-
+        pa.Table: The joined records. Left records come in their original order, and any right
+            records without a match come last.
+
+    Raises-
+        pyarrow.ArrowInvalid: A column is in both tables, or a key column isn't.
+
+    Examples-
+        # Each service, with its name & price from the provider directory
+        services = join_tables(services, provider_directory, "service_id")
+    """
+    numbered = left.append_column(
+        _ROW_NUMBER_COL, pa.array(range(left.num_rows), type=pa.int64())
+    )
+    joined = numbered.join(right, keys, right_keys=right_keys, join_type=join_type)
+    if _ROW_NUMBER_COL not in joined.column_names:
+        return joined
+    return joined.sort_by(_ROW_NUMBER_COL).drop_columns([_ROW_NUMBER_COL])
+
+
+def aggregate_table(
+    table: pa.Table, keys: List[str], aggregations: List[Tuple[str, str]]
+) -> pa.Table:
+    """
+    Group a table's records by key columns, and aggregate each group's values.
+
+    Groups are returned in the order of their first record, and ordered aggregations like
+    "first" and "list" follow the order of the records.
+
+    Args-
+        table (pa.Table): Records to group.
+        keys (List[str]): Columns to group by.
+        aggregations (List[Tuple[str, str]]):
+            Column and aggregation function of each aggregate, like ("fee", "sum"). See
+            pyarrow.TableGroupBy.aggregate for the available functions.
+
+    Returns-
+        pa.Table: The key columns, and a column named "<column>_<function>" for each aggregate.
+
+    Raises-
+        KeyError: A column isn't in the table.
+        pyarrow.ArrowInvalid: An aggregation isn't supported for its column's type.
+
+    Examples-
+        # Number of services & total fee of each provider
+        totals = aggregate_table(services, ["provider_id"], [("fee", "count"), ("fee", "sum")])
+    """
+    for col in keys + [col for col, _ in aggregations]:
+        if col not in table.column_names:
+            raise KeyError(f"Column name {col} not found in table.")
+    return table.group_by(keys, use_threads=False).aggregate(aggregations)
@@ -1,9 +1,14 @@
 """Functions for saving report files."""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from importlib.resources import files
 import os
-from datetime import date
+from typing import AbstractSet, Deque, Iterable, Iterator, Optional, Tuple
 from dateutil.tz import tzlocal
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 
 # Directory where report files are stored.
 _REPORT_DIR_ = str(files("choc_an_simulator") / "reports")
@@ -11,15 +16,28 @@ _REPORT_DIR_ = str(files("choc_an_simulator") / "reports")
 DTTM_FMT = "%m-%d-%Y %H:%M"
 # Format for date strings in the report file
 DATE_FMT = "%m-%d-%Y"
+# Default number of report files save_reports writes at once
+_DEFAULT_REPORT_WORKERS_ = 8
+# Number of rows of a DataFrame formatted and written to its report file at a time
+_REPORT_BATCH_ROWS_ = 64 * 1024
+# Options of the CSV writer of report files
+_CSV_WRITE_OPTIONS = pa_csv.WriteOptions(quoting_style="needed", eol=os.linesep)
 
 
-def save_report(table: pd.DataFrame, file_name: str) -> str:
+def save_report(
+    table: pd.DataFrame, file_name: str, money_cols: Iterable[str] = ()
+) -> str:
     """
     Save a DataFrame to a CSV file, converting dates and datetimes to local time strings.
 
+    The DataFrame isn't modified. It's converted and written a slice of rows at a time, as by
+    save_report_batches, so only one slice of formatted values is held in memory at once.
+
     Args-
         table (pd.DataFrame): Data to be saved.
         file_name (str): Name of the file (without directory or extension) to save the report.
+        money_cols (Iterable[str]): Columns holding money as a whole number of cents, which are
+            saved as dollars & cents (e.g. 12345 -> "123.45").
 
     Returns-
         str: Full path where the report was saved.
@@ -27,39 +45,208 @@ def save_report(table: pd.DataFrame, file_name: str) -> str:
     Raises-
         IOError: Error while writing the report to the file.
     """
+    return save_report_batches(_to_record_batches(table), file_name, money_cols)
+
+
+def save_report_batches(
+    batches: Iterable[pa.RecordBatch], file_name: str, money_cols: Iterable[str] = ()
+) -> str:
+    """
+    Save record batches to a CSV file one at a time, converting dates and datetimes to strings.
+
+    Each batch is formatted with Arrow compute kernels and written by Arrow's CSV writer before
+    the next batch is taken from the iterable, so memory use stays flat however many rows the
+    report has, and no value is converted to a Python object. Dates are written as DATE_FMT,
+    and timestamps as DTTM_FMT; timezone-aware timestamps are converted to local time first.
+    Every batch must have the same columns.
+    Values are written as DataFrame.to_csv writes them: booleans as True or False, whole floats
+    with a trailing .0 (e.g. 2.0), and missing values left empty. Unlike DataFrame.to_csv, the
+    header and every string value are quoted, which CSV readers parse the same.
+
+    Args-
+        batches (Iterable[pa.RecordBatch]): Data to be saved. If there are no batches, the file
+            is left empty.
+        file_name (str): Name of the file (without directory or extension) to save the report.
+        money_cols (Iterable[str]): Columns holding money as a whole number of cents, which are
+            saved as dollars & cents (e.g. 12345 -> "123.45").
+
+    Returns-
+        str: Full path where the report was saved.
+
+    Raises-
+        IOError: Error while writing the report to the file.
+
+    Examples-
+        # Save a report straight from a parquet file, without loading it all at once
+        save_report_batches(pq.ParquetFile(path).iter_batches(), "report")
+    """
     path = _convert_report_name_to_path_(file_name)
-    table = _convert_datetimes_to_formatted_str(table)
+    money_cols = set(money_cols)
+    writer = None
     try:
-        table.to_csv(path, index=False)
+        with open(path, "wb") as sink:
+            for batch in batches:
+                batch = _format_batch(batch, money_cols)
+                if writer is None:
+                    writer = pa_csv.CSVWriter(
+                        sink, batch.schema, write_options=_CSV_WRITE_OPTIONS
+                    )
+                writer.write_batch(batch)
+            if writer is not None:
+                writer.close()
     except IOError as err_io:
         raise err_io
 
     return path
 
 
-def _convert_datetimes_to_formatted_str(table: pd.DataFrame) -> pd.DataFrame:
+def save_reports(
+    reports: Iterable[Tuple[pd.DataFrame, str]],
+    max_workers: Optional[int] = None,
+    money_cols: Iterable[str] = (),
+) -> Iterator[str]:
     """
-    Convert each date and datetime column to a column of formatted strings.
+    Save many DataFrames to CSV files concurrently, using a bounded pool of threads.
+
+    Each report is saved as by save_report. Reports are only taken from the iterable as workers
+    become free, so a lazily generated iterable of reports is never held in memory all at once.
+    The path of each report is returned in the order the reports were given, as soon as it and
+    every report before it have been saved, so callers can show progress as they iterate.
 
     Args-
-        table (pd.DataFrame): Table to convert.
+        reports (Iterable[Tuple[pd.DataFrame, str]]): Data and file name of each report.
+        max_workers (int): Number of reports to write at once. Defaults to 8.
+        money_cols (Iterable[str]): Columns of every report holding money as a whole number of
+            cents, as passed to save_report.
 
     Returns-
-        pd.DataFrame: The converted table.
+        Iterator[str]: Full path where each report was saved.
+
+    Raises-
+        IOError: Error while writing a report to its file. Reports not yet started are skipped.
+        ValueError: max_workers is less than 1.
 
+    Examples-
+        for path in save_reports((table, name) for name, table in tables.items()):
+            print(f"Report saved to {path}")
     """
-    for col_name, col_dtype in table.dtypes.items():
-        # Convert all dates to strings
-        if str(col_dtype) == "object":
-            table[col_name] = table[col_name].apply(
-                lambda val: val.strftime(DATE_FMT) if isinstance(val, date) else val
-            )
-        # Convert all timezone-aware datetimes to local time
-        elif str(col_dtype).startswith("datetime64[ns, "):
-            table[col_name] = (
-                table[col_name].dt.tz_convert(tzlocal()).dt.strftime(DTTM_FMT)
-            )
-    return table
+    if max_workers is None:
+        max_workers = _DEFAULT_REPORT_WORKERS_
+    money_cols = list(money_cols)
+    pending: Deque[Future] = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for table, file_name in reports:
+                # Keep at most two reports queued per worker
+                if len(pending) >= 2 * max_workers:
+                    yield pending.popleft().result()
+                pending.append(
+                    executor.submit(save_report, table, file_name, money_cols)
+                )
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _to_record_batches(table: pd.DataFrame) -> Iterator[pa.RecordBatch]:
+    """
+    Convert a DataFrame to record batches, a slice of rows at a time.
+
+    Object columns are converted to dates or strings, so every batch has the same schema even
+    though Arrow infers the type of each slice separately. Values Arrow can't convert (e.g.
+    lists of values with different types) are converted to strings, as they would be by
+    DataFrame.to_csv. A table with no rows gives one empty batch, so its header is still written.
+    """
+    for start in range(0, max(len(table), 1), _REPORT_BATCH_ROWS_):
+        end = start + _REPORT_BATCH_ROWS_
+        rows = table.iloc[start:end]
+        yield pa.RecordBatch.from_arrays(
+            [_to_arrow(rows.iloc[:, col]) for col in range(rows.shape[1])],
+            names=[str(col_name) for col_name in rows.columns],
+        )
+
+
+def _to_arrow(series: pd.Series) -> pa.Array:
+    """Convert a column to Arrow, falling back to the string of each value."""
+    try:
+        array = pa.array(series, from_pandas=True)
+        if series.dtype == object and not pa.types.is_date(array.type):
+            array = pc.cast(array, pa.string())
+        return array
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return pa.array(
+            series.map(str, na_action="ignore"), type=pa.string(), from_pandas=True
+        )
+
+
+def _format_batch(
+    batch: pa.RecordBatch, money_cols: AbstractSet[str]
+) -> pa.RecordBatch:
+    """
+    Convert the money, date, datetime, boolean and float columns of a batch to strings.
+
+    Args-
+        batch (pa.RecordBatch): Batch to convert.
+        money_cols (AbstractSet[str]): Columns holding money as a whole number of cents.
+
+    Returns-
+        pa.RecordBatch: The converted batch.
+    """
+    return pa.RecordBatch.from_arrays(
+        [
+            _format_column(column, name in money_cols)
+            for name, column in zip(batch.schema.names, batch.columns)
+        ],
+        names=batch.schema.names,
+    )
+
+
+def _format_column(column: pa.Array, is_money: bool) -> pa.Array:
+    """Format a column of money, dates, datetimes, booleans or floats. Others are unchanged."""
+    if is_money:
+        return _format_money(column)
+    if pa.types.is_timestamp(column.type):
+        if column.type.tz is not None:
+            # Convert timezone-aware datetimes to local time
+            local = column.to_pandas().dt.tz_convert(tzlocal()).dt.tz_localize(None)
+            column = pa.array(local, from_pandas=True)
+        return pc.strftime(column, format=DTTM_FMT)
+    if pa.types.is_date(column.type):
+        return pc.strftime(column, format=DATE_FMT)
+    if pa.types.is_boolean(column.type):
+        return pc.if_else(column, "True", "False")
+    if pa.types.is_floating(column.type):
+        return _format_float(column)
+    return column
+
+
+def _format_float(column: pa.Array) -> pa.Array:
+    """Convert floats to strings, writing whole numbers with a trailing .0 (e.g. 2 -> "2.0")."""
+    whole = pc.and_(pc.equal(column, pc.floor(column)), pc.less(pc.abs(column), 1e16))
+    whole_text = pc.binary_join_element_wise(
+        pc.cast(pc.cast(pc.if_else(whole, column, 0), pa.int64()), pa.string()),
+        ".0",
+        "",
+    )
+    text = pc.if_else(whole, whole_text, pc.cast(column, pa.string()))
+    # NaN is a missing value, which is left empty
+    return pc.if_else(pc.is_nan(column), pa.scalar(None, pa.string()), text)
+
+
+def _format_money(cents: pa.Array) -> pa.Array:
+    """Convert a whole number of cents to a dollars & cents string (e.g. -12345 -> "-123.45")."""
+    cents = pc.cast(cents, pa.int64())
+    magnitude = pc.abs(cents)
+    dollars = pc.divide(magnitude, 100)
+    remainder = pc.subtract(magnitude, pc.multiply(dollars, 100))
+    sign = pc.if_else(pc.less(cents, 0), "-", "")
+    return pc.binary_join_element_wise(
+        pc.binary_join_element_wise(sign, pc.cast(dollars, pa.string()), ""),
+        pc.utf8_lpad(pc.cast(remainder, pa.string()), width=2, padding="0"),
+        ".",
+    )
 
 
 def _convert_report_name_to_path_(name: str) -> str:
@@ -0,0 +1,715 @@
+"""
+Storage engines, for keeping the database somewhere other than Parquet files.
+
+By default, every table is stored in Parquet files in the storage directory. A StorageEngine
+replaces those files as the place database_management reads and writes records. The functions
+of database_management keep validating records against each TableInfo as before, and only
+hand validated records to the engine.
+
+Engines:
+    "parquet"   Parquet files (the default). Best for reports over whole tables.
+    "sqlite"    An embedded SQLite database, with an index on each table's index column.
+                Point lookups, updates and removals only touch the affected rows.
+    "duckdb"    An embedded DuckDB database, for analytical queries over large tables.
+                Needs the optional duckdb package.
+
+The engine is chosen with the CHOC_AN_STORAGE_ENGINE environment variable, or with
+set_storage_engine. Records aren't copied between engines when the engine changes.
+
+Examples-
+    # Keep the database in SQLite, at storage/choc_an.sqlite
+    set_storage_engine("sqlite")
+
+    # Keep the database in a DuckDB file of your choosing
+    set_storage_engine(DuckDBEngine("/var/lib/choc_an/choc_an.duckdb"))
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import os
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from ._parquet_utils import _convert_database_name_to_path_
+from ..schemas import TableInfo
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Name of the table each engine stores the Arrow schema of every other table in.
+_SCHEMAS_TABLE = "_choc_an_schemas"
+# Most values to bind to one SQL statement, to stay within SQLite's variable limit.
+_MAX_SQL_VARIABLES = 500
+# SQL operator of each comparison an engine can run.
+_SQL_OPERATORS = {"==": "=", "<": "<", ">": ">"}
+
+
+class StorageEngine(ABC):
+    """
+    Interface of a storage engine, holding the records of every table.
+
+    Records handed to an engine have already been validated against their TableInfo. Records
+    are returned in the order they were added, and "the first record with a key" is the first
+    in that order.
+    """
+
+    @abstractmethod
+    def read_table(
+        self,
+        table_info: TableInfo,
+        columns: Optional[List[str]] = None,
+        comparisons: Sequence[Tuple[str, str, Any]] = (),
+    ) -> Optional[pa.Table]:
+        """
+        Read the records of a table.
+
+        Args-
+            table_info (TableInfo): Object with schema and table details.
+            columns (Optional[List[str]]): Only read these columns. Reads all columns if None.
+            comparisons (Sequence[Tuple[str, str, Any]]): Only read records matching every
+                comparison, given as (column, operator, value) with an operator of "==", "<"
+                or ">".
+
+        Returns-
+            pa.Table: The table's records.
+            None: Nothing has been written to the table.
+
+        Raises-
+            KeyError: One of the columns isn't in the table.
+        """
+
+    def write_table(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Replace every record of a table."""
+        self.write_tables([(table_info, table)])
+
+    @abstractmethod
+    def write_tables(self, tables: List[Tuple[TableInfo, pa.Table]]) -> None:
+        """Replace every record of several tables, all at once or not at all."""
+
+    @abstractmethod
+    def append_table(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Add records to the end of a table."""
+
+    @abstractmethod
+    def contains_keys(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Boolean mask of which keys are in the table's index column, in the order given."""
+
+    @abstractmethod
+    def read_row_by_key(self, table_info: TableInfo, key: Any) -> Optional[pd.Series]:
+        """The first record with a key, or None if no record has the key."""
+
+    @abstractmethod
+    def update_record(
+        self, table_info: TableInfo, key: Any, field_updates: Dict[str, Any]
+    ) -> Optional[pd.Series]:
+        """Set fields of the first record with a key, returning it, or None if not found."""
+
+    @abstractmethod
+    def remove_records(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Remove every record with one of the keys, returning a mask of the keys found."""
+
+    @abstractmethod
+    def data_version(self, table_info: TableInfo) -> Any:
+        """Token that compares equal until the table changes."""
+
+
+class SQLiteEngine(StorageEngine):
+    """Storage engine keeping every table in one SQLite database file."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) a SQLite database.
+
+        Args-
+            path (Optional[str]): Path of the database. Defaults to choc_an.sqlite in the
+                storage directory.
+        """
+        self.path = path or _convert_database_name_to_path_("choc_an.sqlite")
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_SCHEMAS_TABLE} (name TEXT PRIMARY KEY, schema BLOB)"
+        )
+        self._lock = threading.RLock()
+        self._versions: Dict[str, int] = {}
+
+    def read_table(
+        self,
+        table_info: TableInfo,
+        columns: Optional[List[str]] = None,
+        comparisons: Sequence[Tuple[str, str, Any]] = (),
+    ) -> Optional[pa.Table]:
+        """Read the records of a table, selecting only the columns & rows asked for in SQL."""
+        with self._lock:
+            schema = self._stored_schema(table_info.name)
+            if schema is None:
+                return None
+            where, values = _where_clause(schema, comparisons, _to_stored_value)
+            schema = _select_fields(schema, columns)
+            rows = self._connection.execute(
+                f"SELECT {_column_list(schema.names)} FROM {_quote(table_info.name)} "
+                f"{where} ORDER BY rowid",
+                values,
+            ).fetchall()
+        return _rows_to_table(rows, schema)
+
+    def write_tables(self, tables: List[Tuple[TableInfo, pa.Table]]) -> None:
+        """Replace every record of several tables, in one SQLite transaction."""
+        with self._lock, self._transaction():
+            for table_info, table in tables:
+                name = _quote(table_info.name)
+                self._connection.execute(f"DROP TABLE IF EXISTS {name}")
+                self._create_table(table_info)
+                self._insert(table, table_info)
+        for table_info, _ in tables:
+            self._bump_version(table_info)
+
+    def append_table(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Add records to the end of a table, creating the table if needed."""
+        with self._lock, self._transaction():
+            if self._stored_schema(table_info.name) is None:
+                self._create_table(table_info)
+            self._insert(table, table_info)
+        self._bump_version(table_info)
+
+    def contains_keys(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Boolean mask of which keys are in the table's index column, using its index."""
+        keys = list(keys)
+        stored_keys = _to_stored_keys(table_info, keys)
+        with self._lock:
+            if stored_keys is None or self._stored_schema(table_info.name) is None:
+                return np.zeros(len(keys), dtype=bool)
+            found = set()
+            index_col = _quote(table_info.index_col())
+            for start in range(0, len(stored_keys), _MAX_SQL_VARIABLES):
+                end = start + _MAX_SQL_VARIABLES
+                chunk = list(dict.fromkeys(stored_keys[start:end]))
+                found.update(
+                    row[0]
+                    for row in self._connection.execute(
+                        f"SELECT DISTINCT {index_col} FROM {_quote(table_info.name)} "
+                        f"WHERE {index_col} IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+        return np.array([key in found for key in stored_keys], dtype=bool)
+
+    def read_row_by_key(self, table_info: TableInfo, key: Any) -> Optional[pd.Series]:
+        """The first record with a key, found with the table's index."""
+        with self._lock:
+            rowid = self._first_rowid(table_info, key)
+            if rowid is None:
+                return None
+            return self._read_row(table_info, rowid)
+
+    def update_record(
+        self, table_info: TableInfo, key: Any, field_updates: Dict[str, Any]
+    ) -> Optional[pd.Series]:
+        """Set fields of the first record with a key, updating only that row."""
+        schema = table_info.schema
+        values = [
+            _to_stored_values(pa.array([value], type=schema.field(name).type))[0]
+            for name, value in field_updates.items()
+        ]
+        assignments = ", ".join(f"{_quote(name)} = ?" for name in field_updates)
+        with self._lock:
+            rowid = self._first_rowid(table_info, key)
+            if rowid is None:
+                return None
+            self._connection.execute(
+                f"UPDATE {_quote(table_info.name)} SET {assignments} WHERE rowid = ?",
+                values + [rowid],
+            )
+            self._bump_version(table_info)
+            return self._read_row(table_info, rowid)
+
+    def remove_records(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Remove every record with one of the keys, deleting only those rows."""
+        keys = list(keys)
+        with self._lock, self._transaction():
+            found = self.contains_keys(table_info, keys)
+            stored_keys = _to_stored_keys(table_info, keys) or []
+            removed = [key for key, was_found in zip(stored_keys, found) if was_found]
+            for start in range(0, len(removed), _MAX_SQL_VARIABLES):
+                end = start + _MAX_SQL_VARIABLES
+                chunk = removed[start:end]
+                self._connection.execute(
+                    f"DELETE FROM {_quote(table_info.name)} "
+                    f"WHERE {_quote(table_info.index_col())} "
+                    f"IN ({', '.join('?' * len(chunk))})",
+                    chunk,
+                )
+        if found.any():
+            self._bump_version(table_info)
+        return found
+
+    def data_version(self, table_info: TableInfo) -> Any:
+        """Changes when this engine writes the table, or another process writes the file."""
+        with self._lock:
+            (file_version,) = self._connection.execute("PRAGMA data_version").fetchone()
+        return self._versions.get(table_info.name, 0), file_version
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def _transaction(self) -> "_SQLTransaction":
+        """Context manager committing the statements run in it together."""
+        return _SQLTransaction(self._connection)
+
+    def _stored_schema(self, name: str) -> Optional[pa.Schema]:
+        """Arrow schema a table was created with, or None if it doesn't exist."""
+        row = self._connection.execute(
+            f"SELECT schema FROM {_SCHEMAS_TABLE} WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else pa.ipc.read_schema(pa.py_buffer(row[0]))
+
+    def _create_table(self, table_info: TableInfo) -> None:
+        """Create a table, with an index on its index column."""
+        column_defs = ", ".join(
+            f"{_quote(field.name)} {_sqlite_type(field.type)}"
+            + ("" if field.nullable else " NOT NULL")
+            for field in table_info.schema
+        )
+        name = _quote(table_info.name)
+        self._connection.execute(f"CREATE TABLE {name} ({column_defs})")
+        self._connection.execute(
+            f"CREATE INDEX {_quote(table_info.name + '_key')} "
+            f"ON {name} ({_quote(table_info.index_col())})"
+        )
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO {_SCHEMAS_TABLE} VALUES (?, ?)",
+            (table_info.name, table_info.schema.serialize().to_pybytes()),
+        )
+
+    def _insert(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Insert records at the end of a table."""
+        names = table_info.schema.names
+        columns = [_to_stored_values(table.column(name)) for name in names]
+        self._connection.executemany(
+            f"INSERT INTO {_quote(table_info.name)} ({_column_list(names)}) "
+            f"VALUES ({', '.join('?' * len(names))})",
+            zip(*columns),
+        )
+
+    def _first_rowid(self, table_info: TableInfo, key: Any) -> Optional[int]:
+        """Get the rowid of the first record with a key."""
+        stored_keys = _to_stored_keys(table_info, [key])
+        if stored_keys is None or self._stored_schema(table_info.name) is None:
+            return None
+        row = self._connection.execute(
+            f"SELECT min(rowid) FROM {_quote(table_info.name)} "
+            f"WHERE {_quote(table_info.index_col())} = ?",
+            stored_keys,
+        ).fetchone()
+        return row[0]
+
+    def _read_row(self, table_info: TableInfo, rowid: int) -> pd.Series:
+        """Read one record by its rowid."""
+        schema = self._stored_schema(table_info.name)
+        rows = self._connection.execute(
+            f"SELECT {_column_list(schema.names)} FROM {_quote(table_info.name)} "
+            "WHERE rowid = ?",
+            (rowid,),
+        ).fetchall()
+        return _rows_to_table(rows, schema).to_pandas().iloc[0]
+
+    def _bump_version(self, table_info: TableInfo) -> None:
+        """Record that this engine wrote to a table."""
+        self._versions[table_info.name] = self._versions.get(table_info.name, 0) + 1
+
+
+class DuckDBEngine(StorageEngine):
+    """Storage engine keeping every table in one DuckDB database file."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Open (or create) a DuckDB database.
+
+        Args-
+            path (Optional[str]): Path of the database. Defaults to choc_an.duckdb in the
+                storage directory.
+
+        Raises-
+            ImportError: The duckdb package isn't installed.
+        """
+        if duckdb is None:
+            raise ImportError("The duckdb storage engine needs: pip install duckdb")
+        self.path = path or _convert_database_name_to_path_("choc_an.duckdb")
+        self._connection = duckdb.connect(self.path)
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_SCHEMAS_TABLE} (name VARCHAR PRIMARY KEY, schema BLOB)"
+        )
+        self._lock = threading.RLock()
+        self._versions: Dict[str, int] = {}
+
+    def read_table(
+        self,
+        table_info: TableInfo,
+        columns: Optional[List[str]] = None,
+        comparisons: Sequence[Tuple[str, str, Any]] = (),
+    ) -> Optional[pa.Table]:
+        """Read the records of a table as Arrow, selecting only the columns & rows asked for."""
+        with self._lock:
+            schema = self._stored_schema(table_info.name)
+            if schema is None:
+                return None
+            where, values = _where_clause(schema, comparisons, _to_python_value)
+            schema = _select_fields(schema, columns)
+            table = self._connection.execute(
+                f"SELECT {_column_list(schema.names)} FROM {_quote(table_info.name)} "
+                f"{where} ORDER BY rowid",
+                values,
+            ).arrow()
+        return table.cast(schema)
+
+    def write_tables(self, tables: List[Tuple[TableInfo, pa.Table]]) -> None:
+        """Replace every record of several tables, in one DuckDB transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN TRANSACTION")
+            try:
+                for table_info, table in tables:
+                    self._connection.execute(
+                        f"DROP TABLE IF EXISTS {_quote(table_info.name)}"
+                    )
+                    self._create_table(table_info)
+                    self._insert(table, table_info)
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        for table_info, _ in tables:
+            self._bump_version(table_info)
+
+    def append_table(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Add records to the end of a table, creating the table if needed."""
+        with self._lock:
+            if self._stored_schema(table_info.name) is None:
+                self._create_table(table_info)
+            self._insert(table, table_info)
+        self._bump_version(table_info)
+
+    def contains_keys(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Boolean mask of which keys are in the table's index column."""
+        keys = list(keys)
+        key_array = _to_key_array(table_info, keys)
+        with self._lock:
+            if key_array is None or self._stored_schema(table_info.name) is None:
+                return np.zeros(len(keys), dtype=bool)
+            index_col = _quote(table_info.index_col())
+            found = self._connection.execute(
+                f"SELECT DISTINCT {index_col} FROM {_quote(table_info.name)} "
+                f"WHERE {index_col} IN (SELECT UNNEST(?))",
+                [key_array.to_pylist()],
+            ).arrow()
+        found_keys = found.column(0).combine_chunks().cast(key_array.type)
+        return pc.is_in(key_array, value_set=found_keys).to_numpy(zero_copy_only=False)
+
+    def read_row_by_key(self, table_info: TableInfo, key: Any) -> Optional[pd.Series]:
+        """The first record with a key."""
+        with self._lock:
+            rowid = self._first_rowid(table_info, key)
+            if rowid is None:
+                return None
+            return self._read_row(table_info, rowid)
+
+    def update_record(
+        self, table_info: TableInfo, key: Any, field_updates: Dict[str, Any]
+    ) -> Optional[pd.Series]:
+        """Set fields of the first record with a key, updating only that row."""
+        assignments = ", ".join(f"{_quote(name)} = ?" for name in field_updates)
+        with self._lock:
+            rowid = self._first_rowid(table_info, key)
+            if rowid is None:
+                return None
+            self._connection.execute(
+                f"UPDATE {_quote(table_info.name)} SET {assignments} WHERE rowid = ?",
+                list(field_updates.values()) + [rowid],
+            )
+            self._bump_version(table_info)
+            return self._read_row(table_info, rowid)
+
+    def remove_records(self, table_info: TableInfo, keys: Iterable[Any]) -> np.ndarray:
+        """Remove every record with one of the keys."""
+        keys = list(keys)
+        with self._lock:
+            found = self.contains_keys(table_info, keys)
+            removed = [key for key, was_found in zip(keys, found) if was_found]
+            if removed:
+                self._connection.execute(
+                    f"DELETE FROM {_quote(table_info.name)} "
+                    f"WHERE {_quote(table_info.index_col())} IN (SELECT UNNEST(?))",
+                    [removed],
+                )
+                self._bump_version(table_info)
+        return found
+
+    def data_version(self, table_info: TableInfo) -> Any:
+        """Changes when this engine writes the table, or another process writes the file."""
+        files = []
+        for path in [self.path, self.path + ".wal"]:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+        return self._versions.get(table_info.name, 0), tuple(files)
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+    def _stored_schema(self, name: str) -> Optional[pa.Schema]:
+        """Arrow schema a table was created with, or None if it doesn't exist."""
+        row = self._connection.execute(
+            f"SELECT schema FROM {_SCHEMAS_TABLE} WHERE name = ?", [name]
+        ).fetchone()
+        return None if row is None else pa.ipc.read_schema(pa.py_buffer(row[0]))
+
+    def _create_table(self, table_info: TableInfo) -> None:
+        """Create an empty table from the schema, recording its Arrow schema."""
+        self._connection.register("_choc_an_incoming", table_info.schema.empty_table())
+        self._connection.execute(
+            f"CREATE TABLE {_quote(table_info.name)} AS SELECT * FROM _choc_an_incoming"
+        )
+        self._connection.unregister("_choc_an_incoming")
+        self._connection.execute(
+            f"INSERT OR REPLACE INTO {_SCHEMAS_TABLE} VALUES (?, ?)",
+            [table_info.name, table_info.schema.serialize().to_pybytes()],
+        )
+
+    def _insert(self, table: pa.Table, table_info: TableInfo) -> None:
+        """Insert records at the end of a table, straight from Arrow."""
+        self._connection.register(
+            "_choc_an_incoming", table.select(table_info.schema.names)
+        )
+        self._connection.execute(
+            f"INSERT INTO {_quote(table_info.name)} SELECT * FROM _choc_an_incoming"
+        )
+        self._connection.unregister("_choc_an_incoming")
+
+    def _first_rowid(self, table_info: TableInfo, key: Any) -> Optional[int]:
+        """Get the rowid of the first record with a key."""
+        if self._stored_schema(table_info.name) is None:
+            return None
+        row = self._connection.execute(
+            f"SELECT min(rowid) FROM {_quote(table_info.name)} "
+            f"WHERE {_quote(table_info.index_col())} = ?",
+            [key],
+        ).fetchone()
+        return row[0]
+
+    def _read_row(self, table_info: TableInfo, rowid: int) -> pd.Series:
+        """Read one record by its rowid."""
+        schema = self._stored_schema(table_info.name)
+        table = self._connection.execute(
+            f"SELECT {_column_list(schema.names)} FROM {_quote(table_info.name)} "
+            "WHERE rowid = ?",
+            [rowid],
+        ).arrow()
+        return table.cast(schema).to_pandas().iloc[0]
+
+    def _bump_version(self, table_info: TableInfo) -> None:
+        """Record that this engine wrote to a table."""
+        self._versions[table_info.name] = self._versions.get(table_info.name, 0) + 1
+
+
+class _SQLTransaction:
+    """Context manager running SQLite statements in one transaction."""
+
+    def __init__(self, connection: sqlite3.Connection):
+        """Wrap a connection in autocommit mode."""
+        self._connection = connection
+
+    def __enter__(self) -> None:
+        """Begin the transaction, unless one is already open."""
+        self._nested = self._connection.in_transaction
+        if not self._nested:
+            self._connection.execute("BEGIN")
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        """Commit the transaction, or roll it back if an exception was raised."""
+        if self._nested:
+            return
+        self._connection.execute("COMMIT" if exc_type is None else "ROLLBACK")
+
+
+# Names of the engines that can be chosen by name, and their classes.
+_ENGINES = {"sqlite": SQLiteEngine, "duckdb": DuckDBEngine}
+
+# Engine chosen by name or set_storage_engine. None for the default Parquet files.
+_engine_name: str = os.environ.get("CHOC_AN_STORAGE_ENGINE", "parquet")
+_engine: Optional[StorageEngine] = None
+_engine_lock = threading.Lock()
+
+
+def set_storage_engine(engine: Union[str, StorageEngine]) -> None:
+    """
+    Choose where the database is stored.
+
+    Args-
+        engine (Union[str, StorageEngine]): "parquet", "sqlite" or "duckdb", to use that
+            engine at its default path, or an engine to use.
+
+    Raises-
+        ValueError: The engine name isn't known.
+        ImportError: The engine needs a package that isn't installed.
+
+    Examples-
+        set_storage_engine("sqlite")
+    """
+    global _engine_name, _engine
+    with _engine_lock:
+        if isinstance(engine, StorageEngine):
+            _engine_name, _engine = type(engine).__name__, engine
+            return
+        if engine != "parquet" and engine not in _ENGINES:
+            raise ValueError(f"Unknown storage engine {engine}")
+        _engine_name = engine
+        _engine = None if engine == "parquet" else _ENGINES[engine]()
+
+
+def _storage_engine_() -> Optional[StorageEngine]:
+    """
+    Internal function to get the storage engine in use.
+
+    Returns-
+        StorageEngine: The engine holding the database.
+        None: The database is stored in Parquet files, by the functions of database_management.
+    """
+    global _engine
+    if _engine_name == "parquet":
+        return None
+    with _engine_lock:
+        if _engine is None:
+            if _engine_name not in _ENGINES:
+                raise ValueError(f"Unknown storage engine {_engine_name}")
+            _engine = _ENGINES[_engine_name]()
+        return _engine
+
+
+def _quote(identifier: str) -> str:
+    """Quote a table or column name for SQL."""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _column_list(names: List[str]) -> str:
+    """Comma-separated list of quoted column names."""
+    return ", ".join(_quote(name) for name in names)
+
+
+def _sqlite_type(data_type: pa.DataType) -> str:
+    """Get the SQLite type of a column."""
+    if pa.types.is_floating(data_type):
+        return "REAL"
+    if pa.types.is_string(data_type) or pa.types.is_large_string(data_type):
+        return "TEXT"
+    if pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+        return "BLOB"
+    return "INTEGER"
+
+
+def _stored_type(data_type: pa.DataType) -> pa.DataType:
+    """Type a column's values are stored as in SQLite: dates as integers, booleans as 0 or 1."""
+    if pa.types.is_date32(data_type):
+        return pa.int32()
+    if pa.types.is_date64(data_type) or pa.types.is_timestamp(data_type):
+        return pa.int64()
+    if pa.types.is_boolean(data_type):
+        return pa.int8()
+    return data_type
+
+
+def _to_stored_values(values: Union[pa.Array, pa.ChunkedArray]) -> List[Any]:
+    """Convert a column to the Python values stored in SQLite."""
+    return pc.cast(values, _stored_type(values.type)).to_pylist()
+
+
+def _to_key_array(table_info: TableInfo, keys: List[Any]) -> Optional[pa.Array]:
+    """Convert keys to the type of the index column, or None if they can't be converted."""
+    key_type = table_info.schema.field(table_info.index_col()).type
+    try:
+        return pa.array(keys, type=key_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return None
+
+
+def _to_stored_keys(table_info: TableInfo, keys: List[Any]) -> Optional[List[Any]]:
+    """Convert keys to the values stored in SQLite, or None if they can't be converted."""
+    key_array = _to_key_array(table_info, keys)
+    return None if key_array is None else _to_stored_values(key_array)
+
+
+def _rows_to_table(rows: List[Tuple], schema: pa.Schema) -> pa.Table:
+    """Convert rows read from SQLite to an Arrow table of the schema."""
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays(
+        [
+            pa.array(values, type=_stored_type(field.type)).cast(field.type)
+            for values, field in zip(columns, schema)
+        ],
+        schema=schema,
+    )
+
+
+def _select_fields(schema: pa.Schema, columns: Optional[List[str]]) -> pa.Schema:
+    """Schema of the columns to read from a table, in the order asked for."""
+    if columns is None:
+        return schema
+    missing = set(columns) - set(schema.names)
+    if missing:
+        raise KeyError(f"Columns {missing} not found.")
+    return pa.schema([schema.field(name) for name in columns])
+
+
+def _where_clause(
+    schema: pa.Schema,
+    comparisons: Sequence[Tuple[str, str, Any]],
+    to_value: Callable[[Any, pa.DataType], Any],
+) -> Tuple[str, List[Any]]:
+    """
+    SQL WHERE clause matching every comparison, and the values to bind to it.
+
+    Args-
+        schema (pa.Schema): Stored schema of the table.
+        comparisons (Sequence[Tuple[str, str, Any]]): Comparisons as (column, operator, value).
+        to_value (Callable[[Any, pa.DataType], Any]): Converts a value to bind for a column type.
+
+    Returns-
+        Tuple[str, List[Any]]: The clause (empty if there are no comparisons) and its values.
+
+    Raises-
+        KeyError: A compared column isn't in the table.
+    """
+    predicates, values = [], []
+    for col, op, value in comparisons:
+        if col not in schema.names:
+            raise KeyError(f"Column name {col} not found in schema.")
+        predicates.append(f"{_quote(col)} {_SQL_OPERATORS[op]} ?")
+        values.append(to_value(value, schema.field(col).type))
+    if not predicates:
+        return "", []
+    return "WHERE " + " AND ".join(predicates), values
+
+
+def _to_python_value(value: Any, data_type: pa.DataType) -> Any:
+    """Convert a value compared with a column to a Python value of the column's type."""
+    try:
+        return pa.scalar(value, type=data_type).as_py()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return value
+
+
+def _to_stored_value(value: Any, data_type: pa.DataType) -> Any:
+    """Convert a value compared with a column to the value it's stored as in SQLite."""
+    try:
+        scalar = pa.scalar(value, type=data_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, OverflowError):
+        return value
+    return pc.cast(scalar, _stored_type(data_type)).as_py()
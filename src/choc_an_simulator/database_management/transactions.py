@@ -0,0 +1,374 @@
+"""
+Transactions, for writing changes to several tables all at once.
+
+Changes made through a Transaction are staged in memory, and nothing is written until it's
+committed. On commit, each changed table is written in full to a staged file next to its Parquet
+file (or for partitioned tables, each changed partition is), and every staged file is flushed
+to disk together. A journal listing the files is then written, and the staged files are
+swapped into place with atomic renames. If the process dies partway through the swaps, the
+journal is replayed by recover_transactions, so either every table of a transaction is
+replaced, or none are. No table file is ever left half-written.
+When a storage engine is in use, the changed tables are written in one engine transaction.
+
+Examples-
+    # Add a member and record a service for them, together
+    with Transaction() as transaction:
+        transaction.add_records(new_member, MEMBER_INFO)
+        transaction.add_records(service_entry, SERVICE_LOG_INFO)
+"""
+from contextlib import ExitStack
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+from ._parquet_utils import (
+    _convert_parquet_name_to_append_dir_,
+    _convert_parquet_name_to_path_,
+    _convert_parquet_name_to_staged_path_,
+    _transaction_journal_path_,
+    _STAGED_EXT_,
+)
+from ._table_cache import _TABLE_CACHE_
+from ._write_ahead_log import _write_ahead_log_
+from ._write_records import (
+    _changed_partitions_,
+    _replace_appended_records,
+    _rewriting_table_,
+    _write_parquet_file_,
+)
+from .load_records import _load_all_records_from_file_
+from .storage_engines import _storage_engine_
+from ..schemas import TableInfo
+
+
+class Transaction:
+    """Changes to one or more tables, staged in memory until they're committed together."""
+
+    def __init__(self):
+        """Start a transaction, with no changes staged."""
+        # Records of each table used by the transaction, including its changes
+        self._records_by_table: Dict[str, pd.DataFrame] = {}
+        # Tables changed by the transaction
+        self._changed: Dict[str, TableInfo] = {}
+
+    def load_records(self, table_info: TableInfo) -> pd.DataFrame:
+        """
+        Load every record of a table, including the changes staged by this transaction.
+
+        Args-
+            table_info (TableInfo): Object with schema and table details.
+
+        Returns-
+            pd.DataFrame: A copy of the table's records, as they will be once committed.
+
+        Raises-
+            pyarrow.ArrowInvalid: File format is invalid.
+            pyarrow.ArrowIOError: I/O error occurs.
+            KeyError: File columns do not match schema.
+        """
+        return self._records(table_info).copy()
+
+    def add_records(self, records: pd.DataFrame, table_info: TableInfo) -> None:
+        """
+        Stage new records to be added to a table.
+
+        Args-
+            records (pd.DataFrame): New records to be added.
+            table_info (TableInfo): Object with schema and table details.
+
+        Raises-
+            ValueError: Added records result in duplicate entries in the index column.
+            KeyError: Mismatch between schema & records.
+            TypeError: Type mismatch between schema & records.
+            ArithmeticError: Value exceeds a character or numeric limit set by table_info
+            pyarrow.ArrowInvalid: File format is invalid.
+            pyarrow.ArrowIOError: I/O error occurs.
+        """
+        table_info.check_dataframe(records)
+        staged = self._records(table_info)
+        added = records[staged.columns].reset_index(drop=True)
+        if not staged.empty:
+            added = pd.concat([staged, added], ignore_index=True)
+        if table_info.unique_index and added[table_info.index_col()].duplicated().any():
+            raise ValueError("Added entries cause duplicates in the first column.")
+        self._stage(table_info, added)
+
+    def update_record(self, index: Any, table_info: TableInfo, **kwargs) -> pd.Series:
+        """
+        Stage changes to the first record of a table with an index value.
+
+        Args-
+            index (Any): Index value of the record to update.
+            table_info (TableInfo): Object with schema and table details.
+            **kwargs: Key-value pairs representing the fields to update and their new values.
+
+        Returns-
+            pd.Series: Updated record.
+
+        Raises-
+            AssertionError: No key-value pairs provided for update.
+            IndexError: Specified index not found in the table.
+            KeyError: Mismatch between provided fields & schema.
+            TypeError: Type of an updated value is incorrect.
+            ArithmeticError: An updated value is out of numeric or character range.
+            pyarrow.ArrowInvalid: File format is invalid.
+            pyarrow.ArrowIOError: I/O error occurs.
+        """
+        assert len(kwargs) > 0, "Must provide at least one key/value pair to update"
+        for field_name, updated_value in kwargs.items():
+            table_info.check_field(updated_value, field_name)
+        records = self._records(table_info)
+        matches = (records[table_info.index_col()] == index).to_numpy().nonzero()[0]
+        if len(matches) == 0:
+            raise IndexError("Index not found.")
+
+        records = records.copy()
+        for field_name, updated_value in kwargs.items():
+            records.iat[matches[0], records.columns.get_loc(field_name)] = updated_value
+        self._stage(table_info, records)
+        return records.iloc[matches[0]]
+
+    def remove_records(self, indices: Iterable[Any], table_info: TableInfo) -> int:
+        """
+        Stage the removal of every record of a table with one of the given index values.
+
+        Args-
+            indices (Iterable[Any]): Index values of the records to be removed.
+            table_info (TableInfo): Object with schema and table details.
+
+        Returns-
+            int: Number of records removed.
+
+        Raises-
+            pyarrow.ArrowInvalid: File format is invalid.
+            pyarrow.ArrowIOError: I/O error occurs.
+        """
+        records = self._records(table_info)
+        removed = records[table_info.index_col()].isin(list(indices))
+        self._stage(table_info, records[~removed])
+        return int(removed.sum())
+
+    def commit(self) -> None:
+        """
+        Write every staged change, replacing each changed table's file atomically.
+
+        The staged files are flushed to disk with a single barrier before any is swapped into
+        place, so committing several tables costs about the same as committing one. Each
+        directory the files are staged & swapped into is flushed once per barrier, not once
+        per file, and the journal is flushed once.
+
+        Raises-
+            KeyError: Mismatch between staged records and schema columns.
+            TypeError: Incorrect types in staged records.
+            ValueError: A staged record of a partitioned table has no partition date.
+            ArithmeticError: Values in staged records outside specified limits.
+            pyarrow.ArrowIOError: I/O error occurs.
+            Nothing is committed if an error is raised, and the changes stay staged.
+        """
+        recover_transactions()
+        staged = [
+            (table_info, self._records_by_table[name])
+            for name, table_info in self._changed.items()
+        ]
+        if not staged:
+            return
+
+        engine = _storage_engine_()
+        if engine is not None:
+            tables = []
+            for table_info, records in staged:
+                table_info.check_dataframe(records)
+                tables.append(
+                    (
+                        table_info,
+                        pa.Table.from_pandas(
+                            records, schema=table_info.schema, preserve_index=False
+                        ),
+                    )
+                )
+            engine.write_tables(tables)
+            self.rollback()
+            return
+
+        staged_paths: List[str] = []
+        try:
+            files = []
+            for table_info, records in staged:
+                table_info.check_dataframe(records)
+                files += _files_to_stage(table_info, records)
+            for file_num, (file_info, table) in enumerate(files):
+                staged_path = _convert_parquet_name_to_staged_path_(file_info.name)
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                staged_paths.append(staged_path)
+                table = _write_parquet_file_(table, staged_path, file_info)
+                files[file_num] = (file_info, table)
+            for staged_path in staged_paths:
+                _fsync_path(staged_path)
+            # The staged files must be found by name if the journal is replayed
+            _fsync_dirs(staged_paths)
+            _write_journal([file_info.name for file_info, _ in files])
+        except (
+            pa.ArrowIOError,
+            KeyError,
+            TypeError,
+            ValueError,
+            ArithmeticError,
+        ) as err:
+            for staged_path in staged_paths:
+                if os.path.exists(staged_path):
+                    os.remove(staged_path)
+            raise err
+
+        # The journal is durable, so the commit will complete even if it's interrupted here
+        self.rollback()
+        with ExitStack() as rewriting:
+            # Logs aren't folded while the files they're removed with are swapped in
+            for table_info, _ in staged:
+                rewriting.enter_context(_rewriting_table_(table_info))
+            recover_transactions()
+            for file_info, table in files:
+                path = _convert_parquet_name_to_path_(file_info.name)
+                keys = table.column(file_info.index_col()).combine_chunks()
+                _replace_appended_records(path, keys, file_info)
+
+    def rollback(self) -> None:
+        """Discard every staged change."""
+        self._records_by_table = {}
+        self._changed = {}
+
+    def __enter__(self) -> "Transaction":
+        """Use the transaction as a context manager, which commits it on exit."""
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        """Commit the transaction, or roll it back if an exception was raised."""
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    def _records(self, table_info: TableInfo) -> pd.DataFrame:
+        """Records of a table including staged changes, loading them on first use."""
+        if table_info.name not in self._records_by_table:
+            self._records_by_table[table_info.name] = _load_all_records_from_file_(
+                table_info
+            )
+        return self._records_by_table[table_info.name]
+
+    def _stage(self, table_info: TableInfo, records: pd.DataFrame) -> None:
+        """Stage the new records of a table."""
+        self._records_by_table[table_info.name] = records
+        self._changed[table_info.name] = table_info
+
+
+def recover_transactions() -> bool:
+    """
+    Finish committing a transaction that was interrupted, or clean up after an aborted one.
+
+    If a transaction's journal was written, every staged file it lists is swapped into place.
+    Otherwise, any staged files are left over from a transaction that never committed, and are
+    removed. It's safe to call this every time the simulator starts.
+
+    Returns-
+        bool: True if an interrupted commit was completed.
+
+    Raises-
+        OSError: I/O error occurs.
+    """
+    journal_path = _transaction_journal_path_()
+    table_names = _read_journal(journal_path)
+    if table_names is None:
+        _remove_unjournaled_staged_files(os.path.dirname(journal_path))
+        return False
+
+    replaced_paths = [journal_path]
+    for name in table_names:
+        staged_path = _convert_parquet_name_to_staged_path_(name)
+        if os.path.exists(staged_path):
+            path = _convert_parquet_name_to_path_(name)
+            try:
+                os.replace(staged_path, path)
+            finally:
+                _TABLE_CACHE_.bump_version(name)
+            replaced_paths.append(path)
+            # Fragments & logged records were already folded into the staged file
+            shutil.rmtree(
+                _convert_parquet_name_to_append_dir_(name), ignore_errors=True
+            )
+            _write_ahead_log_(name).remove()
+    # Every rename, including those into partition directories, is durable before the journal
+    # that would replay it is removed
+    _fsync_dirs(replaced_paths)
+    os.remove(journal_path)
+    return True
+
+
+def _files_to_stage(
+    table_info: TableInfo, records: pd.DataFrame
+) -> List[Tuple[TableInfo, pa.Table]]:
+    """
+    Files to write for a changed table, as the TableInfo naming each file and its records.
+
+    An unpartitioned table is written as one file. Only the partitions of a partitioned table
+    whose records changed are written, and partitions left without records are emptied.
+    """
+    table = pa.Table.from_pandas(
+        records, schema=table_info.schema, preserve_index=False
+    )
+    if table_info.partition_col is None:
+        return [(table_info, table)]
+    removed, changed = _changed_partitions_(table, table_info)
+    return [(partition_info, table.slice(0, 0)) for partition_info in removed] + changed
+
+
+def _write_journal(table_names: List[str]) -> None:
+    """Durably write the journal of the tables a transaction is replacing."""
+    journal_path = _transaction_journal_path_()
+    with open(journal_path + ".tmp", "w") as journal:
+        json.dump({"tables": table_names}, journal)
+        journal.flush()
+        os.fsync(journal.fileno())
+    os.replace(journal_path + ".tmp", journal_path)
+    _fsync_dirs([journal_path])
+
+
+def _read_journal(journal_path: str) -> Optional[List[str]]:
+    """Names of the tables in a transaction journal, or None if there's no journal."""
+    try:
+        with open(journal_path) as journal:
+            return json.load(journal)["tables"]
+    except FileNotFoundError:
+        return None
+
+
+def _remove_unjournaled_staged_files(storage_dir: str) -> None:
+    """Remove staged files left by a transaction that failed before writing its journal."""
+    for dir_path, _, file_names in os.walk(storage_dir):
+        for file_name in file_names:
+            if file_name.endswith(_STAGED_EXT_):
+                os.remove(os.path.join(dir_path, file_name))
+
+
+def _fsync_path(path: str) -> None:
+    """Flush a file's contents to disk."""
+    with open(path, "rb") as file:
+        os.fsync(file.fileno())
+
+
+def _fsync_dirs(paths: Iterable[str]) -> None:
+    """Flush each directory holding one of the paths to disk once, so renames in it are durable."""
+    for dir_path in sorted({os.path.dirname(path) for path in paths}):
+        _fsync_dir(dir_path)
+
+
+def _fsync_dir(dir_path: str) -> None:
+    """Flush a directory to disk."""
+    if os.name != "posix":
+        return
+    dir_fd = os.open(dir_path, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
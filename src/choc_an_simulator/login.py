@@ -4,17 +4,73 @@ Login Sub-System.
 This module ensures secure access for providers and managers.
 It includes functions for display the login menu, generating a secure password,
 secure password verification, and user type authorization.
+
+Users' types and password hashes are kept in memory, keyed by user ID, and only reloaded when the
+providers file changes. A login reads the file at most once, and not at all once it's loaded.
 """
-import bcrypt
+import threading
+from typing import Dict, Hashable, Optional, Tuple
 import pyarrow as pa
-from choc_an_simulator.database_management import load_records_from_file
+from choc_an_simulator.database_management import load_records_from_file, table_version
 from choc_an_simulator.schemas import USER_INFO
+from .password_pool import PasswordPool, check_password, hash_password
 from .user_io import PColor, prompt_int
 from .manager import manager_menu
 from .provider import show_provider_menu
 import getpass
 
 
+class _UserCredentials:
+    """Map of user ID -> (user type, password hash), reloaded whenever USER_INFO changes."""
+
+    def __init__(self):
+        """Create an empty map, which is loaded on the first lookup."""
+        self._version: Optional[Hashable] = None
+        self._users: Dict[int, Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, user_id: int) -> Optional[Tuple[int, bytes]]:
+        """
+        Look up a user's type and password hash.
+
+        Args-
+            user_id (int): ID of the user.
+
+        Returns-
+            Tuple[int, bytes]: The user's type and password hash.
+            None: There's no user with the ID.
+
+        Raises-
+            pyarrow.ArrowIOError: I/O error occurs while reloading the users.
+        """
+        version = table_version(USER_INFO)
+        with self._lock:
+            if version != self._version:
+                users = load_records_from_file(
+                    USER_INFO, columns=["id", "type", "password_hash"]
+                )
+                self._users = {}
+                if not users.empty:
+                    self._users = dict(
+                        zip(
+                            users["id"].tolist(),
+                            zip(users["type"].tolist(), users["password_hash"]),
+                        )
+                    )
+                self._version = version
+            return self._users.get(user_id)
+
+    def clear(self) -> None:
+        """Forget every user, so they're reloaded on the next lookup."""
+        with self._lock:
+            self._version = None
+            self._users = {}
+
+
+# Credentials of every user, shared by every login in this process.
+_USER_CREDENTIALS = _UserCredentials()
+
+
 def login_menu() -> None:
     """
     Display the user login menu.
@@ -22,7 +78,7 @@ def login_menu() -> None:
     This function prompts the user for their ID (manager ID or provider ID) and password.
     """
     user_verified = False
-    user_id = None
+    user_type = None
 
     while user_verified is False:
         user_id = prompt_int("User ID")
@@ -31,7 +87,7 @@ def login_menu() -> None:
             return None
 
         try:
-            user_verified = secure_password_verification(
+            user_verified, user_type = authenticate_user(
                 user_id, getpass.getpass(prompt="Password: ")
             )
         except KeyboardInterrupt:
@@ -41,7 +97,7 @@ def login_menu() -> None:
             print("Password is incorrect. Try again.")
             continue
 
-    match user_type_authorization(user_id):
+    match user_type:
         case 0:
             manager_menu()
         case 1:
@@ -54,48 +110,87 @@ def generate_secure_password(password: str) -> (bytes, bytes):
     """
     Generates a secure user password.
 
-    This function is used to hash/salt the user password.
+    This function is used to hash/salt the user password, with the deployment's bcrypt cost
+    factor (see password_pool.set_bcrypt_rounds).
     It returns the hash/salt password and the salt.
 
     Returns the number of bytes and str of the secure password.
     """
-    password = password.encode()
-    salt = bcrypt.gensalt()
-    hashed_password = bcrypt.hashpw(password, salt)
-    return hashed_password, salt
+    return hash_password(password.encode())
 
 
-def secure_password_verification(user_id: int, password: str) -> bool:
+def authenticate_user(user_id: int, password: str) -> Tuple[bool, Optional[int]]:
     """
-    Verifies the password entered by the user.
+    Verifies the password entered by the user, and determines their user type.
 
-    Returns True or False if the password and user ID matches the database.
+    The user's credentials are looked up once, for both the verification and the user type.
+
+    Returns a tuple of True and the user type if the password and user ID match the database, or
+    False and None if they don't.
+    """
+    credentials = _lookup_credentials(user_id)
+    if credentials is None:
+        return False, None
+
+    user_type, password_hash = credentials
+    if not check_password(password.encode(), password_hash):
+        return False, None
+    return True, user_type
+
+
+async def authenticate_user_async(
+    user_id: int, password: str, pool: PasswordPool
+) -> Tuple[bool, Optional[int]]:
+    """
+    Verifies the password entered by the user in a worker process, and determines their type.
+
+    The same as authenticate_user, except that the password is checked by a PasswordPool, so
+    many logins can be verified at once without blocking the event loop.
+
+    Returns a tuple of True and the user type if the password and user ID match the database, or
+    False and None if they don't.
     """
+    credentials = _lookup_credentials(user_id)
+    if credentials is None:
+        return False, None
+
+    user_type, password_hash = credentials
+    if not await pool.verify(password.encode(), password_hash):
+        return False, None
+    return True, user_type
+
+
+def _lookup_credentials(user_id: int) -> Optional[Tuple[int, bytes]]:
+    """Look up a user's type and password hash, printing a warning if the database fails."""
     try:
-        pw = load_records_from_file(USER_INFO, eq_cols={"id": user_id})
-        if pw.empty:
-            return False
-        pw = pw["password_hash"].iloc[0]
+        return _USER_CREDENTIALS.lookup(user_id)
     except pa.ArrowIOError as err_io:
         PColor.pwarn(f"There was an issue accessing the database.\n\tError: {err_io}")
-        return False
+        return None
+
+
+def secure_password_verification(user_id: int, password: str) -> bool:
+    """
+    Verifies the password entered by the user.
 
-    return bcrypt.checkpw(password.encode(), pw)
+    Returns True or False if the password and user ID matches the database.
+    """
+    verified, _ = authenticate_user(user_id, password)
+    return verified
 
 
-def user_type_authorization(user_id: int) -> int:
+def user_type_authorization(user_id: int) -> Optional[int]:
     """
     Determines the user type.
 
     If the user type = 0, then the user has manager authorization.
     If the user type = 1, then the user has provider authorization.
 
-    Returns an integer of the user_type.
+    Returns an integer of the user_type, or None if the user doesn't exist or the database can't
+    be read. None is the only value returned for a user without a type, since False would
+    compare equal to the manager type 0.
     """
-    try:
-        user_type = load_records_from_file(USER_INFO, eq_cols={"id": user_id})["type"]
-    except pa.ArrowIOError as err_io:
-        PColor.pwarn(f"There was an issue accessing the database.\n\tError: {err_io}")
-        return False
-
-    return user_type.iloc[0]
+    credentials = _lookup_credentials(user_id)
+    if credentials is None:
+        return None
+    return credentials[0]
@@ -1,4 +1,17 @@
+import sys
+from .database_management import (
+    migrate_partitioned_tables,
+    migrate_provider_directory_prices,
+    recover_transactions,
+)
 from .login import login_menu
+from .schemas import RecordLimitError
 
 if __name__ == "__main__":
+    recover_transactions()
+    try:
+        migrate_provider_directory_prices()
+    except RecordLimitError as err_limit:
+        sys.exit(str(err_limit))
+    migrate_partitioned_tables()
     login_menu()
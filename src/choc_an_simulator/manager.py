@@ -3,6 +3,7 @@ Manager Sub-System.
 
 The manager sub-system allows managers to manage member, provider, and provider directory records.
 """
+from typing import Optional
 import pandas as pd
 from pyarrow import ArrowIOError
 from pandas.api.types import is_numeric_dtype
@@ -19,6 +20,7 @@ from .report import (
     generate_member_report,
     generate_summary_report,
     generate_provider_report,
+    generate_weekly_reports,
 )
 
 
@@ -140,10 +142,11 @@ def _prompt_report_options() -> None:
     Generate Member Report
     Generate Provider Report
     Generate Summary Report
+    Generate All Weekly Reports
     """
     user_exit = False
     message = "Reports Options"
-    choices = ["Member", "Provider", "Summary"]
+    choices = ["Member", "Provider", "Summary", "All Weekly"]
 
     while user_exit is False:
         match prompt_menu_options(message, choices):
@@ -153,6 +156,8 @@ def _prompt_report_options() -> None:
                 generate_provider_report()
             case (_, "Summary"):
                 generate_summary_report()
+            case (_, "All Weekly"):
+                generate_weekly_reports()
             case None:
                 user_exit = True
 
@@ -429,11 +434,31 @@ def remove_provider_record() -> None:
         print(f"Provider {provider_id} Not Found.")
 
 
+def _prompt_price() -> Optional[int]:
+    """
+    Prompt the manager for a service price, as dollars and then cents.
+
+    Returns-
+        int: The price, in cents.
+        None: The manager aborted.
+    """
+    price_limit = PROVIDER_DIRECTORY_INFO.numeric_limits["price"]
+    dollars = prompt_int(
+        "Price (dollars)", numeric_limit=range(0, price_limit.stop // 100)
+    )
+    if dollars is None:
+        return None
+    cents = prompt_int("Price (cents)", numeric_limit=range(0, 99))
+    if cents is None:
+        return None
+    return dollars * 100 + cents
+
+
 def add_provider_directory_record() -> None:
     """
     Manager is prompted to enter service information.
 
-    This is the service information: service_id, service_name, price_dollars, and price_cents.
+    This is the service information: service_id, service_name, and price.
     """
     try:
         service_id = generate_unique_id(PROVIDER_DIRECTORY_INFO)
@@ -449,11 +474,7 @@ def add_provider_directory_record() -> None:
             "service_name": prompt_str(
                 "Service name", PROVIDER_DIRECTORY_INFO.character_limits["service_name"]
             ),
-            "price_dollars": prompt_int("Price (dollars)"),
-            "price_cents": prompt_int(
-                "Price (cents)",
-                numeric_limit=PROVIDER_DIRECTORY_INFO.numeric_limits["price_cents"],
-            ),
+            "price": _prompt_price(),
         },
         index=[0],
     )
@@ -496,11 +517,8 @@ def update_provider_directory_record() -> None:
     if selection is None:
         return
     field_to_update = selection[1]
-    if field_to_update == "price_dollars" or field_to_update == "price_cents":
-        new_value = prompt_int(
-            f"New value for {field_to_update}",
-            numeric_limit=PROVIDER_DIRECTORY_INFO.numeric_limits["price_cents"],
-        )
+    if field_to_update == "price":
+        new_value = _prompt_price()
     else:
         new_value = prompt_str(
             f"New value for {field_to_update}",
@@ -0,0 +1,163 @@
+"""
+Password hashing and verification in a pool of worker processes.
+
+bcrypt is deliberately slow and CPU-bound, so checking many passwords at once (e.g. scripted
+sessions for several provider kiosks) blocks the caller for the sum of every check. A
+PasswordPool runs the checks in worker processes instead, one per core by default, and has an
+asyncio-friendly API so many logins can wait on it concurrently.
+
+The bcrypt cost factor (log2 of the number of rounds) used for new password hashes is
+configurable per deployment, with the CHOC_AN_BCRYPT_ROUNDS environment variable or
+set_bcrypt_rounds. Existing hashes keep the cost factor they were created with.
+
+Examples-
+    # Verify a batch of passwords across every core
+    with PasswordPool() as pool:
+        results = pool.verify_many([(b"password1", hash_1), (b"password2", hash_2)])
+
+    # Verify passwords from asyncio code
+    async def check(pool, password, password_hash):
+        return await pool.verify(password, password_hash)
+"""
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+import bcrypt
+
+# Range of bcrypt cost factors accepted by bcrypt.gensalt
+_MIN_BCRYPT_ROUNDS = 4
+_MAX_BCRYPT_ROUNDS = 31
+
+
+def _check_rounds(rounds: int) -> int:
+    """Check that a cost factor is one bcrypt accepts."""
+    if not _MIN_BCRYPT_ROUNDS <= rounds <= _MAX_BCRYPT_ROUNDS:
+        raise ValueError(
+            f"bcrypt cost factor must be from {_MIN_BCRYPT_ROUNDS} to {_MAX_BCRYPT_ROUNDS}, "
+            f"not {rounds}."
+        )
+    return rounds
+
+
+# Cost factor of new password hashes. Defaults to bcrypt's own default of 12.
+_bcrypt_rounds = _check_rounds(int(os.environ.get("CHOC_AN_BCRYPT_ROUNDS", 12)))
+
+
+def bcrypt_rounds() -> int:
+    """The bcrypt cost factor used for new password hashes."""
+    return _bcrypt_rounds
+
+
+def set_bcrypt_rounds(rounds: int) -> None:
+    """
+    Set the bcrypt cost factor used for new password hashes.
+
+    Each increase of 1 doubles the time taken to hash or verify a password.
+
+    Args-
+        rounds (int): Cost factor, from 4 to 31.
+
+    Raises-
+        ValueError: The cost factor is out of range.
+    """
+    global _bcrypt_rounds
+    _bcrypt_rounds = _check_rounds(rounds)
+
+
+def hash_password(password: bytes, rounds: Optional[int] = None) -> Tuple[bytes, bytes]:
+    """
+    Hash a password with a new salt.
+
+    Args-
+        password (bytes): Password to hash.
+        rounds (int): bcrypt cost factor. Defaults to bcrypt_rounds().
+
+    Returns-
+        Tuple[bytes, bytes]: The hashed password, and its salt.
+    """
+    salt = bcrypt.gensalt(rounds=rounds if rounds is not None else bcrypt_rounds())
+    return bcrypt.hashpw(password, salt), salt
+
+
+def check_password(password: bytes, password_hash: bytes) -> bool:
+    """Check a password against a bcrypt hash."""
+    return bcrypt.checkpw(password, password_hash)
+
+
+class PasswordPool:
+    """Pool of worker processes for hashing and verifying passwords with bcrypt."""
+
+    def __init__(self, max_workers: Optional[int] = None, rounds: Optional[int] = None):
+        """
+        Start a pool of worker processes.
+
+        Args-
+            max_workers (int): Number of worker processes. Defaults to the number of cores.
+            rounds (int): bcrypt cost factor of new hashes. Defaults to bcrypt_rounds().
+
+        Raises-
+            ValueError: max_workers is less than 1, or the cost factor is out of range.
+        """
+        self.rounds = _check_rounds(rounds if rounds is not None else bcrypt_rounds())
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    async def verify(self, password: bytes, password_hash: bytes) -> bool:
+        """
+        Check a password against a bcrypt hash in a worker process.
+
+        Args-
+            password (bytes): Password entered by the user.
+            password_hash (bytes): Stored hash of the user's password.
+
+        Returns-
+            bool: True if the password matches the hash.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, check_password, password, password_hash
+        )
+
+    async def hash_password(self, password: bytes) -> Tuple[bytes, bytes]:
+        """
+        Hash a password with a new salt in a worker process.
+
+        Args-
+            password (bytes): Password to hash.
+
+        Returns-
+            Tuple[bytes, bytes]: The hashed password, and its salt.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, hash_password, password, self.rounds
+        )
+
+    def verify_many(self, credentials: Iterable[Tuple[bytes, bytes]]) -> List[bool]:
+        """
+        Check many passwords against their hashes, spread across the worker processes.
+
+        Args-
+            credentials (Iterable[Tuple[bytes, bytes]]): Each password and the hash to check
+                it against.
+
+        Returns-
+            List[bool]: Whether each password matches its hash, in the order given.
+        """
+        credentials = list(credentials)
+        if not credentials:
+            return []
+        passwords, password_hashes = zip(*credentials)
+        return list(self._executor.map(check_password, passwords, password_hashes))
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, waiting for any checks in progress."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "PasswordPool":
+        """Use the pool as a context manager, which shuts it down on exit."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Shut down the pool."""
+        self.shutdown()
@@ -8,7 +8,10 @@ billing, service verification, and data retrieval processes in the ChocAn system
 """
 from pyarrow import ArrowIOError
 from .database_management import (
+    contains_key,
+    load_record_by_key,
     load_records_from_file,
+    lookup_member_eligibility,
     save_report,
     add_records_to_file,
 )
@@ -53,13 +56,11 @@ def check_in_member() -> None:
         "Please enter Member ID", char_limit=MEMBER_INFO.character_limits["member_id"]
     )
 
-    query_response = load_records_from_file(
-        table_info=MEMBER_INFO, eq_cols={"member_id": member_id}
-    )
+    eligible = lookup_member_eligibility(member_id)
 
-    if query_response.empty:
+    if eligible is None:
         PColor.pfail("Invalid")
-    elif query_response["suspended"].iloc[0]:
+    elif not eligible:
         PColor.pwarn("Suspended")
     else:
         PColor.pok("Valid")
@@ -84,29 +85,22 @@ def record_service_billing_entry() -> None:
 
     In this function, the provider enters details of the service rendered. It involves
     validating the member's status, collecting service details, and saving the information
-    in the service logs.
+    in the service logs. IDs are checked with keyed lookups, so the member, provider and
+    service tables are never loaded in full.
     """
-    try:
-        members_df = load_records_from_file(MEMBER_INFO)
-    except ArrowIOError as e:
-        PColor.pfail("Failed to load member information from the file")
-        PColor.pfail(f"An error occurred: {e}")
-        return None
-
-    try:
-        providers_df = load_records_from_file(USER_INFO)
-    except ArrowIOError as e:
-        PColor.pfail("Failed to load user information from the file")
-        PColor.pfail(f"An error occurred: {e}")
-        return None
-
     # Prompt for member ID and validate
     member_id = prompt_int(
         "Enter member ID", char_limit=MEMBER_INFO.character_limits["member_id"]
     )
     if member_id is None:
         return None
-    if member_id not in members_df["member_id"].values:
+    try:
+        member_eligible = lookup_member_eligibility(member_id)
+    except ArrowIOError as e:
+        PColor.pfail("Failed to load member information from the file")
+        PColor.pfail(f"An error occurred: {e}")
+        return None
+    if not member_eligible:
         PColor.pfail("Invalid Member ID or Member Suspended")
         return None
 
@@ -116,7 +110,13 @@ def record_service_billing_entry() -> None:
     )
     if provider_id is None:
         return None
-    if provider_id not in providers_df["id"].values:
+    try:
+        provider_exists = contains_key(USER_INFO, provider_id)
+    except ArrowIOError as e:
+        PColor.pfail("Failed to load user information from the file")
+        PColor.pfail(f"An error occurred: {e}")
+        return None
+    if not provider_exists:
         PColor.pfail("Invalid Provider ID")
         return None
 
@@ -134,21 +134,18 @@ def record_service_billing_entry() -> None:
         return None
 
     try:
-        services_df = load_records_from_file(PROVIDER_DIRECTORY_INFO)
+        service = load_record_by_key(PROVIDER_DIRECTORY_INFO, service_code)
     except ArrowIOError as e:
         PColor.pfail("Failed to load provider directory information from the file")
         PColor.pfail(f"An error occurred: {e}")
         return None
 
-    if service_code not in services_df["service_id"].values:
+    if service is None:
         PColor.pfail("Invalid Service Code")
         return None
 
     # Display the service name and confirm
-    service_name = services_df[services_df["service_id"] == service_code][
-        "service_name"
-    ].iloc[0]
-    PColor.pok(f"Service name: {service_name}")
+    PColor.pok(f"Service name: {service['service_name']}")
     confirmation = prompt_str("Confirm service (yes/no)", char_limit=range(1, 3))
     if confirmation and confirmation.lower() in ["y", "yes"]:
         PColor.pok("Service Confirmed")
@@ -177,12 +174,9 @@ def record_service_billing_entry() -> None:
     )
 
     # Display Fee and Save to files
-    fee = services_df[services_df["service_id"] == service_code][
-        ["price_dollars", "price_cents"]
-    ]
-    PColor.pok(
-        f"Service Fee: ${fee['price_dollars'].iloc[0]}.{fee['price_cents'].iloc[0]:02d}"
-    )
+    # Prices are stored in cents
+    fee = service["price"]
+    PColor.pok(f"Service Fee: ${fee // 100}.{fee % 100:02d}")
     try:
         add_records_to_file(record, SERVICE_LOG_INFO)
         PColor.pok("Service Billing Entry Recorded Successfully")
@@ -200,7 +194,7 @@ def request_provider_directory() -> None:
         return
     try:
         provider_directory_report = save_report(
-            provider_directory_df, "provider_directory"
+            provider_directory_df, "provider_directory", money_cols=["price"]
         )
     except IOError:
         PColor.pfail("There was an error saving the provider directory report.")
@@ -8,15 +8,21 @@ Provider reports are generated for each provider who has provided services to
 ChocAn members within the last 7 days.
 
 Summary reports are generated for all accounts payable this week
+
+All three kinds of report can be generated together by generate_weekly_reports, which loads and
+joins the week's services only once. The week's services are loaded, joined and aggregated as
+Arrow tables, and only each finished report is converted to pandas to be saved.
 """
 
 from datetime import datetime, timedelta
+from typing import Optional
 
-import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 
-from choc_an_simulator.database_management.load_records import load_records_from_file
-from choc_an_simulator.database_management.reports import save_report
+from choc_an_simulator.database_management.load_records import load_table
+from choc_an_simulator.database_management.queries import aggregate_table, join_tables
+from choc_an_simulator.database_management.reports import save_report, save_reports
 from choc_an_simulator.schemas import (
     MEMBER_INFO,
     PROVIDER_DIRECTORY_INFO,
@@ -25,8 +31,35 @@ from choc_an_simulator.schemas import (
 )
 from choc_an_simulator.user_io import PColor
 
+# Caps on each provider's weekly totals. Fees are in cents.
+_MAX_WEEKLY_FEE = 9999999
+_MAX_WEEKLY_CONSULTATIONS = 999
+# Report columns holding money in cents, which are formatted as dollars & cents when saved
+_PROVIDER_REPORT_MONEY_COLS = ["Fee to be paid", "Total fee for the week"]
+_SUMMARY_REPORT_MONEY_COLS = ["Total fee for the week"]
+
+
+def generate_weekly_reports(max_workers: Optional[int] = None) -> None:
+    """
+    Generates every member report, every provider report, and the summary report for the week.
+
+    The last 7 days of services are loaded and joined with the provider directory, providers and
+    members once, and all three kinds of report are produced from that one dataset. This is the
+    end-of-week batch run, and is cheaper than generating each kind of report on its own.
+
+    Args-
+        max_workers (int): Number of member or provider report files to write at once.
+            Defaults to the default of save_reports.
+    """
+    week = _load_week_services(include_members=True)
+    if week is None:
+        return
+    _save_member_reports(week, max_workers)
+    _save_provider_reports(week, max_workers)
+    _save_summary_report(week)
+
 
-def generate_member_report() -> None:
+def generate_member_report(max_workers: Optional[int] = None) -> None:
     """
     Generates a report of services for a member over the last 7 days.
 
@@ -35,90 +68,18 @@ def generate_member_report() -> None:
     had services provided to them in the last 7 days.The members are listed in
     the order of the service date. After a report is generated, the path to it
     is printed to the console.
-    """
-    gt_cols = {"service_date_utc": (datetime.now() - timedelta(days=7)).date()}
-    service_log = None
-    provider_directory = None
-    member_info = None
-    user_info = None
-    service_log_cols = ["service_date_utc", "member_id", "provider_id", "service_id"]
-    member_cols = ["member_id", "name", "address", "city", "state", "zipcode"]
-    user_cols = ["name", "id"]
-    provider_directory_cols = ["service_id", "service_name"]
 
-    try:
-        service_log = load_records_from_file(SERVICE_LOG_INFO, gt_cols=gt_cols)
-        if service_log.empty:
-            print("No records found within the last 7 days.")
-            return
-        service_log = service_log[service_log_cols]
-        member_info = load_records_from_file(MEMBER_INFO)[member_cols]
-        user_info = load_records_from_file(USER_INFO)[user_cols]
-        provider_directory = load_records_from_file(PROVIDER_DIRECTORY_INFO)[
-            provider_directory_cols
-        ]
-    except pa.ArrowIOError as err_io:
-        PColor.pwarn(f"There was an issue accessing the database.\n\tError: {err_io}")
+    Args-
+        max_workers (int): Number of report files to write at once. Defaults to the default of
+            save_reports.
+    """
+    week = _load_week_services(include_members=True)
+    if week is None:
         return
+    _save_member_reports(week, max_workers)
 
-    merged_dfs = pd.merge(service_log, provider_directory, on="service_id")
-    merged_dfs = pd.merge(merged_dfs, user_info, left_on="provider_id", right_on="id")
-    merged_dfs = pd.merge(merged_dfs, member_info, on="member_id")
-    merged_dfs = merged_dfs.drop(columns="id")
-
-    # Create a new column storing a list of tuples containing the service date, service name, and
-    # provider name
-    merged_dfs["Services"] = list(
-        zip(
-            merged_dfs["service_date_utc"],
-            merged_dfs["service_name"],
-            merged_dfs["name_x"],
-        )
-    )
-    agg_dict = {"Services": list}
-    # Group by member_id and aggregate the services column into a list
-    records = merged_dfs.groupby("member_id").agg(agg_dict).reset_index()
-    # Merge the original dataframe with the aggregated dataframe resulting in a new dataframe
-    # replaced the 3 service columns with the aggregated services column and is grouped by member_id
-    records = records.merge(
-        merged_dfs[
-            ["member_id", "name_y", "address", "city", "state", "zipcode"]
-        ].drop_duplicates(),
-        on="member_id",
-        how="left",
-    )
-    records = records.rename(
-        columns={
-            "name_y": "Name",
-            "member_id": "Member Number",
-            "name_x": "Provider Name",
-            "service_date_utc": "Service Date",
-        }
-    )
-    records = records[
-        ["Name", "Member Number", "address", "city", "state", "zipcode", "Services"]
-    ]
 
-    # For each member, sort the services by date and then save the report and print the path to
-    # the console
-    for member_id in records["Member Number"]:
-        member_record = records[records["Member Number"] == member_id]
-        # member_record["Services"] = member_record["Services"].apply(lambda x: sorted(x))
-        member_record.loc[:, "Services"] = member_record.loc[:, "Services"].apply(
-            lambda x: sorted(
-                [
-                    (date, service_name, provider_name)
-                    for date, service_name, provider_name, in x
-                ]
-            )
-        )
-        file_path = save_report(
-            member_record, f"{member_record['Name'].iloc[0]}_{_current_date()}"
-        )
-        print(f"Member Report saved to {file_path}")
-
-
-def generate_provider_report() -> None:
+def generate_provider_report(max_workers: Optional[int] = None) -> None:
     """
     Generates a report of services rendered by a provider over the last 7 days.
 
@@ -127,207 +88,332 @@ def generate_provider_report() -> None:
     in the last 7 days. Additionally, if the number of consultations is greater than 999, it will
     be set to 999. If the total fee is greater than 99999.99, it will be set to 99999.99. After a
     report is generated, the path to it is printed to the console.
+
+    Args-
+        max_workers (int): Number of report files to write at once. Defaults to the default of
+            save_reports.
+    """
+    week = _load_week_services(include_members=True)
+    if week is None:
+        return
+    _save_provider_reports(week, max_workers)
+
+
+def generate_summary_report() -> None:
+    """
+    A summary report is given to the manager for accounts payable.
+
+    The report lists every provider to be paid that week, the number of consultations each had, and
+    his or her total fee for that week. Finally the total number of providers who
+    provided services, the total number of consultations, and the overall fee total are
+    printed.
+    """
+    week = _load_week_services(include_members=False)
+    if week is None:
+        return
+    _save_summary_report(week)
+
+
+def _load_week_services(include_members: bool) -> Optional[pa.Table]:
+    """
+    Load the last 7 days of services, joined with everything the weekly reports need.
+
+    Each service is joined with its entry in the provider directory and the provider who
+    rendered it. Provider columns are prefixed with "provider_", and member columns (if included)
+    with "member_". A "fee" column holds the price of each service in cents.
+
+    Args-
+        include_members (bool):
+            Also join the member each service was rendered to. Services are kept even if their
+            member no longer exists, with empty member columns.
+
+    Returns-
+        pa.Table: The joined services, in the order they were logged.
+        None: There were no services, or the database couldn't be accessed. A message is printed.
     """
     gt_cols = {"service_date_utc": (datetime.now() - timedelta(days=7)).date()}
-    service_log = None
-    provider_directory = None
-    member_info = None
-    user_info = None
     service_log_cols = [
         "service_date_utc",
+        "entry_datetime_utc",
         "member_id",
         "provider_id",
         "service_id",
-        "entry_datetime_utc",
     ]
-    member_cols = ["member_id", "name"]
-    user_cols = ["name", "id", "address", "city", "state", "zipcode"]
-    provider_directory_cols = ["service_id", "price_cents", "price_dollars"]
+    user_cols = ["id", "name", "address", "city", "state", "zipcode"]
+    member_cols = ["member_id", "name", "address", "city", "state", "zipcode"]
+    provider_directory_cols = [
+        "service_id",
+        "service_name",
+        "price",
+    ]
 
     try:
-        service_log = load_records_from_file(SERVICE_LOG_INFO, gt_cols=gt_cols)
-        if service_log.empty:
+        service_log = load_table(
+            SERVICE_LOG_INFO, gt_cols=gt_cols, columns=service_log_cols
+        )
+        if service_log.num_rows == 0:
             print("No records found within the last 7 days.")
-            return
-        service_log = service_log[service_log_cols]
-        member_info = load_records_from_file(MEMBER_INFO)[member_cols]
-        user_info = load_records_from_file(USER_INFO)[user_cols]
-        provider_directory = load_records_from_file(PROVIDER_DIRECTORY_INFO)[
-            provider_directory_cols
-        ]
+            return None
+        user_info = load_table(USER_INFO, columns=user_cols)
+        provider_directory = load_table(
+            PROVIDER_DIRECTORY_INFO, columns=provider_directory_cols
+        )
+        member_info = None
+        if include_members:
+            member_info = load_table(MEMBER_INFO, columns=member_cols)
     except pa.ArrowIOError as err_io:
         PColor.pwarn(f"There was an issue accessing the database.\n\tError: {err_io}")
-        return
+        return None
 
-    records = pd.merge(service_log, provider_directory, on="service_id")
-    records = pd.merge(records, user_info, left_on="provider_id", right_on="id")
-    records = pd.merge(records, member_info, on="member_id")
-    records["Fee to be paid"] = records["price_dollars"] + records["price_cents"] / 100
-    records = records.drop(columns=["id", "price_dollars", "price_cents"])
-
-    for provider_id in records["provider_id"].unique():
-        provider_record = records[records["provider_id"] == provider_id]
-        current_provider = records["provider_id"] == provider_id
-        # calculate_total_fee is broken out into a function to make it easier to mock for testing
-        total_fee = calculate_total_fee(provider_record["Fee to be paid"])
-        if total_fee < 99999.99:
-            records.loc[current_provider, "Total fee for the week"] = total_fee
-        else:
-            records.loc[current_provider, "Total fee for the week"] = 99999.99
-
-        # calculate_length_of_consultations is broken out into a function to make it easier to mock
-        # for testing
-        total_consultations = calculate_num_of_consultations(provider_record)
-        if total_consultations < 999:
-            records.loc[
-                current_provider, "Total number of consultations with members"
-            ] = total_consultations
-        else:
-            records.loc[
-                current_provider, "Total number of consultations with members"
-            ] = 999
-
-    records = records.rename(
-        columns={
-            "name_x": "Provider Name",
-            "provider_id": "Provider Number",
-            "name_y": "Member Name",
-            "member_id": "Member Number",
-            "service_date_utc": "Date of Service",
-            "entry_datetime_utc": "Date and Time Data Were Received by the Computer",
-            "service_id": "Service Code",
-        }
+    user_info = user_info.rename_columns(
+        ["id"] + [f"provider_{col}" for col in user_cols[1:]]
+    )
+    provider_directory = provider_directory.rename_columns(
+        ["service_id", "service_name", "fee"]
     )
+    week = join_tables(service_log, provider_directory, "service_id")
+    week = join_tables(week, user_info, "provider_id", right_keys="id")
+    if member_info is not None:
+        member_info = member_info.rename_columns(
+            ["member_id"] + [f"member_{col}" for col in member_cols[1:]]
+        )
+        week = join_tables(week, member_info, "member_id", join_type="left outer")
+    return week
+
+
+def _services_to_members(week: pa.Table) -> pa.Table:
+    """Services from the week's dataset whose member still exists."""
+    return week.filter(pc.is_valid(week.column("member_name")))
+
+
+def _save_member_reports(week: pa.Table, max_workers: Optional[int] = None) -> None:
+    """
+    Save a report for each member who received services this week, and print each path.
 
-    records = records[
+    Args-
+        week (pa.Table): The week's services, joined with members.
+        max_workers (int): Number of report files to write at once.
+    """
+    # Sort each member's services by date, then name of the service & provider, and collect
+    # them into one row per member, along with the member's details
+    records = _services_to_members(week).sort_by(
         [
-            "Provider Name",
-            "Provider Number",
-            "address",
-            "city",
-            "state",
-            "zipcode",
-            "Date of Service",
-            "Date and Time Data Were Received by the Computer",
-            "Member Name",
-            "Member Number",
-            "Service Code",
-            "Fee to be paid",
-            "Total number of consultations with members",
-            "Total fee for the week",
+            ("member_id", "ascending"),
+            ("service_date_utc", "ascending"),
+            ("service_name", "ascending"),
+            ("provider_name", "ascending"),
         ]
+    )
+    member_cols = [f"member_{col}" for col in ["name", "address", "city", "state"]]
+    member_cols.append("member_zipcode")
+    service_cols = ["service_date_utc", "service_name", "provider_name"]
+    members = aggregate_table(
+        records,
+        ["member_id"],
+        [(col, "first") for col in member_cols]
+        + [(col, "list") for col in service_cols],
+    )
+
+    report = members.select(
+        [f"{member_cols[0]}_first", "member_id"]
+        + [f"{col}_first" for col in member_cols[1:]]
+    ).rename_columns(["Name", "Member Number", "address", "city", "state", "zipcode"])
+    report = report.to_pandas()
+    # A list of (service date, service name, provider name) tuples for each member
+    report["Services"] = [
+        list(zip(*services))
+        for services in zip(
+            *(members.column(f"{col}_list").to_pylist() for col in service_cols)
+        )
     ]
 
-    # For each provider save the report and print the path to the console
-    for provider_id in records["Provider Number"].unique():
-        provider_record = records[records["Provider Number"] == provider_id]
-        file_path = save_report(
+    # Split the records by member in one pass, save the reports concurrently, and print each path
+    # to the console as it's saved. Members can share a name, so each file is named with the
+    # member's number too, or reports saved at once could replace each other.
+    member_reports = (
+        (member_record, _report_name(member_record["Name"].iloc[0], member_id))
+        for member_id, member_record in report.groupby("Member Number", sort=False)
+    )
+    for file_path in save_reports(member_reports, max_workers):
+        print(f"Member Report saved to {file_path}")
+
+
+def _save_provider_reports(week: pa.Table, max_workers: Optional[int] = None) -> None:
+    """
+    Save a report for each provider who rendered services this week, and print each path.
+
+    Providers are reported in the order of their first service this week. Each provider's
+    services are listed by date of service, then member number.
+
+    Args-
+        week (pa.Table): The week's services, joined with members.
+        max_workers (int): Number of report files to write at once.
+    """
+    records = _add_provider_totals(_services_to_members(week))
+    provider_order = pc.unique(records.column("provider_id")).to_pylist()
+    # Arrow's sorts are stable, so services on the same date keep their logged order
+    records = records.sort_by(
+        [("service_date_utc", "ascending"), ("member_id", "ascending")]
+    )
+
+    report_cols = {
+        "provider_name": "Provider Name",
+        "provider_id": "Provider Number",
+        "provider_address": "address",
+        "provider_city": "city",
+        "provider_state": "state",
+        "provider_zipcode": "zipcode",
+        "service_date_utc": "Date of Service",
+        "entry_datetime_utc": "Date and Time Data Were Received by the Computer",
+        "member_name": "Member Name",
+        "member_id": "Member Number",
+        "service_id": "Service Code",
+        "fee": "Fee to be paid",
+        "Total number of consultations with members": (
+            "Total number of consultations with members"
+        ),
+        "Total fee for the week": "Total fee for the week",
+    }
+    report = records.select(list(report_cols)).rename_columns(
+        list(report_cols.values())
+    )
+    report = report.to_pandas()
+
+    # Split the records by provider in one pass, save the reports concurrently, and print each
+    # path to the console as it's saved. Each file is named with the provider's number too.
+    providers = report.groupby("Provider Number", sort=False)
+    provider_reports = (
+        (
             provider_record,
-            f"{provider_record['Provider Name'].iloc[0]}_{_current_date()}",
+            _report_name(provider_record["Provider Name"].iloc[0], provider_id),
         )
+        for provider_id, provider_record in zip(
+            provider_order, map(providers.get_group, provider_order)
+        )
+    )
+    for file_path in save_reports(
+        provider_reports, max_workers, money_cols=_PROVIDER_REPORT_MONEY_COLS
+    ):
         print(f"Provider Report saved to {file_path}")
 
 
-def generate_summary_report() -> None:
+def _save_summary_report(week: pa.Table) -> None:
     """
-    A summary report is given to the manager for accounts payable.
+    Save the summary report of accounts payable for the week, and print its path.
 
-    The report lists every provider to be paid that week, the number of consultations each had, and
-    his or her total fee for that week. Finally the total number of providers who
-    provided services, the total number of consultations, and the overall fee total are
-    printed.
+    Args-
+        week (pa.Table): The week's services.
     """
-    gt_cols = gt_cols = {"service_date_utc": (datetime.now() - timedelta(days=7)).date()}
-    service_log = None
-    provider_directory = None
-    user_info = None
-    service_log_cols = ["provider_id", "service_id"]
-    user_cols = ["name", "id"]
-    provider_directory_cols = ["service_id", "price_cents", "price_dollars"]
-    try:
-        service_log = load_records_from_file(SERVICE_LOG_INFO, gt_cols=gt_cols)
-        if service_log.empty:
-            print("No records found within the last 7 days.")
-            return
-        service_log = service_log[service_log_cols]
-        user_info = load_records_from_file(USER_INFO)[user_cols]
-        provider_directory = load_records_from_file(PROVIDER_DIRECTORY_INFO)[
-            provider_directory_cols
+    totals = _provider_totals(week)
+    records = totals.select(
+        [
+            "provider_name",
+            "Total fee for the week",
+            "Total number of consultations with members",
         ]
-    except pa.ArrowIOError as err_io:
-        PColor.pwarn(f"There was an issue accessing the database.\n\tError: {err_io}")
-        return
-
-    records = pd.merge(service_log, provider_directory, on="service_id")
-    records = pd.merge(records, user_info, left_on="provider_id", right_on="id")
-    records["Fee to be paid"] = records["price_dollars"] + records["price_cents"] / 100
-
-    for provider_id in records["provider_id"].unique():
-        provider_record = records[records["provider_id"] == provider_id]
-        current_provider = records["provider_id"] == provider_id
-        # calculate_total_fee is broken out into a function to make it easier to mock for testing
-        total_fee = calculate_total_fee(provider_record["Fee to be paid"])
-        if total_fee < 99999.99:
-            records.loc[current_provider, "Total fee for the week"] = total_fee
-        else:
-            records.loc[current_provider, "Total fee for the week"] = 99999.99
-
-        # calculate_length_of_consultations and calculate_total_fee are broken out into a functions
-        # to make it easier to mock for testing
-        total_consultations = calculate_num_of_consultations(provider_record)
-        if total_consultations < 999:
-            records.loc[
-                current_provider, "Total number of consultations with members"
-            ] = total_consultations
-        else:
-            records.loc[
-                current_provider, "Total number of consultations with members"
-            ] = 999
-
-    records = records.drop_duplicates(subset=["provider_id"])
-    records = records.drop(
-        columns=[
-            "provider_id",
-            "service_id",
-            "price_cents",
-            "price_dollars",
-            "id",
-            "Fee to be paid",
+    ).rename_columns(
+        [
+            "Provider Name",
+            "Total fee for the week",
+            "Total number of consultations with members",
         ]
-    ).reset_index(drop=True)
-
-    records = records.rename(
-        columns={
-            "name": "Provider Name",
-        }
     )
 
-    total_num_providers = records["Provider Name"].nunique()
-    total_num_consultations = records[
-        "Total number of consultations with members"
-    ].sum()
-    total_fee = records["Total fee for the week"].sum()
+    total_num_providers = pc.count_distinct(records.column("Provider Name")).as_py()
+    total_num_consultations = pc.sum(
+        records.column("Total number of consultations with members")
+    ).as_py()
+    total_fee = pc.sum(records.column("Total fee for the week")).as_py()
 
     # write out the summary row to the dataframe
+    records = records.to_pandas()
     records.loc["Total"] = [total_num_providers, total_fee, total_num_consultations]
 
     file_path = save_report(
         records,
         f"Summary_Report_{_current_date()}",
+        money_cols=_SUMMARY_REPORT_MONEY_COLS,
     )
     print(f"Summary Report saved to {file_path}")
 
 
+def _provider_totals(records: pa.Table) -> pa.Table:
+    """
+    Compute each provider's total fee & number of consultations for the week.
+
+    The services are grouped by provider in one aggregation, and the totals are capped. The total
+    fee is in cents, and is capped at $99999.99. The number of consultations is capped at 999.
+
+    Args-
+        records (pa.Table): The week's services.
+
+    Returns-
+        pa.Table: One row per provider, in the order of their first service, with "provider_id",
+            "provider_name", "Total fee for the week" and
+            "Total number of consultations with members" columns.
+    """
+    providers = aggregate_table(
+        records,
+        ["provider_id"],
+        [("provider_name", "first"), ("fee", "sum"), ("fee", "count")],
+    )
+    # calculate_total_fee and calculate_num_of_consultations turn the aggregates of every
+    # provider into their totals at once. They're broken out into functions to make them easy
+    # to replace or mock for testing.
+    total_fees = pc.min_element_wise(
+        calculate_total_fee(providers.column("fee_sum")), _MAX_WEEKLY_FEE
+    )
+    consultations = pc.min_element_wise(
+        calculate_num_of_consultations(providers.column("fee_count")),
+        _MAX_WEEKLY_CONSULTATIONS,
+    )
+    return pa.table(
+        {
+            "provider_id": providers.column("provider_id"),
+            "provider_name": providers.column("provider_name_first"),
+            "Total fee for the week": pc.cast(total_fees, pa.int64()),
+            "Total number of consultations with members": pc.cast(
+                consultations, pa.float64()
+            ),
+        }
+    )
+
+
+def _add_provider_totals(records: pa.Table) -> pa.Table:
+    """
+    Add each provider's total fee & number of consultations for the week to their services.
+
+    The totals are computed once per provider by _provider_totals, then joined back to every
+    service of each provider.
+
+    Args-
+        records (pa.Table): The week's services.
+
+    Returns-
+        pa.Table: The services, with "Total fee for the week" and
+            "Total number of consultations with members" columns.
+    """
+    totals = _provider_totals(records).drop_columns(["provider_name"])
+    return join_tables(records, totals, "provider_id", join_type="left outer")
+
+
+def _report_name(name: str, number: int) -> str:
+    """Returns the file name of a member or provider's report, unique to their number."""
+    return f"{name}_{number}_{_current_date()}"
+
+
 def _current_date() -> str:
     """Returns the current date in the format MM-DD-YYYY."""
     return datetime.now().strftime("%m-%d-%Y")
 
 
-def calculate_total_fee(providers_fees_df: pd.DataFrame) -> float:
-    """Calculates the total fee for a provider."""
-    return providers_fees_df.sum()
+def calculate_total_fee(providers_fees: pa.ChunkedArray) -> pa.ChunkedArray:
+    """Calculates each provider's total fee in cents, from the sum of their services' fees."""
+    return pc.fill_null(providers_fees, 0)
 
 
-def calculate_num_of_consultations(providers_consultations_df: pd.DataFrame) -> int:
-    """Calculates the total number of consultations for a provider."""
-    return len(providers_consultations_df)
+def calculate_num_of_consultations(
+    providers_consultations: pa.ChunkedArray,
+) -> pa.ChunkedArray:
+    """Calculates each provider's number of consultations, from their number of services."""
+    return providers_consultations
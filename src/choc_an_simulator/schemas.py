@@ -12,10 +12,115 @@ Examples-
     def get_full_member_list():
         members = load_records_from_file(MEMBER_INFO)
 """
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 import pyarrow as pa
+import pyarrow.compute as pc
 import pandas as pd
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
+
+# Type of columns holding money: a whole number of cents, so sums of money are exact. Money is
+# only formatted as dollars & cents when it's displayed or saved in a report.
+MONEY_TYPE = pa.int64()
+
+
+class RecordValidationError(Exception):
+    """
+    Raised when one or more records in a DataFrame fail validation against a TableInfo.
+
+    Every offending row is reported at once, rather than stopping at the first bad cell.
+
+    Attributes-
+        table_name (str): Name of the table the records were validated against.
+        violations (Dict[str, List[Any]]): Column name -> index labels of the offending rows.
+    """
+
+    def __init__(self, table_name: str, reason: str, violations: Dict[str, List[Any]]):
+        """Build a message listing every offending row for each column."""
+        self.table_name = table_name
+        self.violations = violations
+        details = "\n".join(
+            f"\t{col_name}: rows {rows}" for col_name, rows in violations.items()
+        )
+        super().__init__(f"Records for {table_name} {reason}:\n{details}")
+
+    @property
+    def rows(self) -> List[Any]:
+        """Index labels of every offending row, without duplicates, in order of appearance."""
+        return list(
+            dict.fromkeys(row for rows in self.violations.values() for row in rows)
+        )
+
+
+class RecordTypeError(RecordValidationError, TypeError):
+    """One or more values have a type that is incompatible with the schema."""
+
+
+class RecordLimitError(RecordValidationError, ArithmeticError):
+    """One or more values violate a character or numeric limit."""
+
+
+class RecordNullError(RecordValidationError, TypeError):
+    """One or more values are missing (None or NaN) in columns that aren't nullable."""
+
+
+@dataclass(frozen=True)
+class ParquetOptions:
+    """How a table's records are laid out in its Parquet files."""
+
+    # Columns to sort records by before they're written, so each row group covers a narrow
+    # range of them, and filters on them can skip most row groups by their statistics
+    sort_keys: Tuple[str, ...] = ()
+    # Most records in each row group, or None for the Parquet writer's default
+    row_group_size: Optional[int] = None
+    # Compression codec, e.g. "snappy", "zstd" or "none", and its level, if it has levels
+    compression: str = "snappy"
+    compression_level: Optional[int] = None
+    # Columns to dictionary encode, like ones with few distinct values, or None for every column
+    dictionary_cols: Optional[Tuple[str, ...]] = None
+    # Whether to write a page index, with the statistics of every page in one place
+    page_index: bool = False
+    # Columns to write bloom filters for, so lookups of one value can skip row groups
+    bloom_filter_cols: Tuple[str, ...] = ()
+
+    def columns(self) -> List[str]:
+        """
+        Names of every column the options refer to.
+
+        Returns-
+            The sort key, dictionary and bloom filter columns, without duplicates.
+        """
+        return list(
+            dict.fromkeys(
+                self.sort_keys + (self.dictionary_cols or ()) + self.bloom_filter_cols
+            )
+        )
+
+    def select(self, columns: List[str]) -> "ParquetOptions":
+        """
+        Get the options for a subset of a table's columns.
+
+        Args-
+            columns (List[str]): Columns to keep.
+
+        Returns-
+            The same options, referring only to the given columns. Sorting is dropped unless
+            every sort key is kept, since sorting by some of the keys would be a different order.
+        """
+        return replace(
+            self,
+            sort_keys=(
+                self.sort_keys if all(col in columns for col in self.sort_keys) else ()
+            ),
+            dictionary_cols=(
+                None
+                if self.dictionary_cols is None
+                else tuple(col for col in self.dictionary_cols if col in columns)
+            ),
+            bloom_filter_cols=tuple(
+                col for col in self.bloom_filter_cols if col in columns
+            ),
+        )
 
 
 @dataclass(frozen=True)
@@ -28,6 +133,18 @@ class TableInfo:
     character_limits: dict[str, range] = field(default_factory=lambda: {})
     # Limits on numeric length (e.g. only numbers between 0 and 99)
     numeric_limits: dict[str, range] = field(default_factory=lambda: {})
+    # Whether values in the index (first) column must be unique
+    unique_index: bool = True
+    # Whether added records go to a write-ahead log, rather than a new Parquet fragment each
+    write_ahead_log: bool = False
+    # Date column to store the table's records in a partition per period of, if any
+    partition_col: Optional[str] = None
+    # Period each partition covers: "month", or "week" for ISO weeks
+    partition_period: str = "month"
+    # Whether to keep a memory-mapped Arrow copy of the table, for tables that are read often
+    ipc_mirror: bool = False
+    # How the table's records are laid out in its Parquet files
+    parquet_options: ParquetOptions = field(default_factory=ParquetOptions)
 
     def __post_init__(self):
         """
@@ -46,6 +163,13 @@ class TableInfo:
                 raise KeyError(
                     f"Numeric limit column {col_name} could not be found in schema {self.name}"
                 )
+        for col_name in self.parquet_options.columns():
+            if col_name not in self.schema.names:
+                raise KeyError(
+                    f"Parquet option column {col_name} could not be found in schema {self.name}"
+                )
+        if self.partition_period not in ("month", "week"):
+            raise ValueError(f"Unknown partition period {self.partition_period}")
 
     def index_col(self) -> str:
         """
@@ -68,6 +192,42 @@ class TableInfo:
         """
         return all(col in self.schema.names for col in columns)
 
+    def select(self, columns: List[str]) -> "TableInfo":
+        """
+        Get the TableInfo for a subset of this table's columns.
+
+        Args-
+            columns (List[str]): Columns to keep, in the order they should appear.
+
+        Returns-
+            A TableInfo with the same name, containing only the given columns and their limits.
+
+        Raises-
+            KeyError: A column isn't in the schema.
+        """
+        for col_name in columns:
+            self._check_field_exists(col_name)
+        return TableInfo(
+            name=self.name,
+            schema=pa.schema([self.schema.field(col_name) for col_name in columns]),
+            character_limits={
+                col_name: limit
+                for col_name, limit in self.character_limits.items()
+                if col_name in columns
+            },
+            numeric_limits={
+                col_name: limit
+                for col_name, limit in self.numeric_limits.items()
+                if col_name in columns
+            },
+            unique_index=self.unique_index,
+            write_ahead_log=self.write_ahead_log,
+            partition_col=self.partition_col,
+            partition_period=self.partition_period,
+            ipc_mirror=self.ipc_mirror,
+            parquet_options=self.parquet_options.select(columns),
+        )
+
     def check_columns(self, columns: List[str]) -> None:
         """
         Ensures that the given columns match the schema's columns.
@@ -85,15 +245,83 @@ class TableInfo:
         """
         Validates a DataFrame against the table's schema.
 
+        Validation is columnar: each column is converted to its schema type in one pass, and the
+        character and numeric limits are checked with vectorized masks over the whole column.
+
         Args-
             data (pd.DataFrame): The DataFrame to validate.
 
         Raises-
             KeyError: If columns in the DataFrame don't match the schema.
-            TypeError: If a value's type is incompatible with the schema.
-            ArithmeticError: If a value violates character or numeric limits.
+            RecordTypeError (TypeError): If any values' types are incompatible with the schema.
+            RecordNullError (TypeError): If non-nullable columns have missing values.
+            RecordLimitError (ArithmeticError): If any values violate character or numeric limits.
+        """
+        self.check_columns(list(data.columns))
+        columns = self._convert_columns(data)
+
+        violations: Dict[str, List[Any]] = {}
+        for col_name, values in columns.items():
+            mask = self._limit_violation_mask(col_name, values, data[col_name])
+            if mask.any():
+                violations[col_name] = list(data.index[mask])
+        if violations:
+            raise RecordLimitError(
+                self.name, "are outside their character or numeric limits", violations
+            )
+
+    def _convert_columns(self, data: pd.DataFrame) -> Dict[str, pa.Array]:
+        """
+        Convert each column of a DataFrame to an Arrow array of its schema type.
+
+        Raises-
+            RecordTypeError: One or more columns could not be converted.
+            RecordNullError: A non-nullable column has missing values (None or NaN).
         """
-        data.apply(lambda row: self.check_series(row), axis=1)  # type: ignore
+        columns: Dict[str, pa.Array] = {}
+        violations: Dict[str, List[Any]] = {}
+        for schema_field in self.schema:
+            series = data[schema_field.name]
+            try:
+                columns[schema_field.name] = pa.array(
+                    series, type=schema_field.type, from_pandas=True
+                )
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                # Only a failed column is re-checked row by row, to find the offending rows.
+                violations[schema_field.name] = [
+                    index
+                    for pos, index in enumerate(series.index)
+                    if not _converts(series.iloc[[pos]], schema_field.type)
+                ] or list(series.index)
+        if violations:
+            raise RecordTypeError(
+                self.name, "have values of the wrong type for their columns", violations
+            )
+
+        for schema_field in self.schema:
+            values = columns[schema_field.name]
+            if not schema_field.nullable and values.null_count > 0:
+                mask = values.is_null().to_numpy(zero_copy_only=False)
+                violations[schema_field.name] = list(data.index[mask])
+        if violations:
+            raise RecordNullError(
+                self.name, "are missing values in non-nullable columns", violations
+            )
+        return columns
+
+    def _limit_violation_mask(
+        self, field_name: str, values: pa.Array, series: pd.Series
+    ) -> np.ndarray:
+        """Boolean mask of the values that violate a field's character or numeric limit."""
+        mask = np.zeros(len(values), dtype=bool)
+        if field_name in self.character_limits:
+            limit_range = self.character_limits[field_name]
+            lengths = _str_lengths(values, series)
+            mask |= _outside(lengths, limit_range)
+        if field_name in self.numeric_limits:
+            limit_range = self.numeric_limits[field_name]
+            mask |= _outside(values, limit_range)
+        return mask
 
     def check_series(self, data: pd.Series) -> None:
         """
@@ -172,19 +400,50 @@ class TableInfo:
             )
 
 
-"""All services offered by ChocAn, and their codes."""
+def _converts(series: pd.Series, arrow_type: pa.DataType) -> bool:
+    """Check whether a series can be converted to an Arrow type."""
+    try:
+        pa.array(series, type=arrow_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return False
+    return True
+
+
+def _str_lengths(values: pa.Array, series: pd.Series) -> pa.Array:
+    """
+    Length of each value's string representation (e.g. 123456 -> 6).
+
+    Floats are measured through pandas, since Arrow formats them differently from str().
+    """
+    if pa.types.is_floating(values.type):
+        return pa.array(series.astype(str).str.len().to_numpy())
+    if pa.types.is_binary(values.type) or pa.types.is_large_binary(values.type):
+        return pc.binary_length(values)
+    return pc.utf8_length(pc.cast(values, pa.string()))
+
+
+def _outside(values: pa.Array, limit_range: range) -> np.ndarray:
+    """Boolean mask of the values below the start or above the stop of a range. Nulls pass."""
+    outside = pc.or_(
+        pc.less(values, limit_range.start), pc.greater(values, limit_range.stop)
+    )
+    return pc.fill_null(outside, False).to_numpy(zero_copy_only=False)
+
+
+"""All services offered by ChocAn, their codes, and their prices in cents."""
 PROVIDER_DIRECTORY_INFO = TableInfo(
     name="provider_directory",
     schema=pa.schema(
         [
             pa.field("service_id", pa.int64(), nullable=False),
             pa.field("service_name", pa.string(), nullable=False),
-            pa.field("price_dollars", pa.int64(), nullable=False),
-            pa.field("price_cents", pa.int64(), nullable=False),
+            pa.field("price", MONEY_TYPE, nullable=False),
         ]
     ),
     character_limits={"service_id": range(6, 6), "service_name": range(1, 20)},
-    numeric_limits={"price_cents": range(1, 99)},
+    numeric_limits={"price": range(0, 99999)},
+    # Read for every service recorded, so it's mirrored for zero-copy loads.
+    ipc_mirror=True,
 )
 
 """All current ChocAn members."""
@@ -209,6 +468,15 @@ MEMBER_INFO = TableInfo(
         "state": range(2, 2),
         "zipcode": range(5, 5),
     },
+    # Read for every member check-in, so it's mirrored for zero-copy loads.
+    ipc_mirror=True,
+    # Members come from few cities & states, and are looked up by ID.
+    parquet_options=ParquetOptions(
+        compression="zstd",
+        dictionary_cols=("city", "state"),
+        page_index=True,
+        bloom_filter_cols=("member_id",),
+    ),
 )
 
 """All current ChocAn providers & managers."""
@@ -235,6 +503,15 @@ USER_INFO = TableInfo(
         "zipcode": range(5, 5),
     },
     numeric_limits={"type": range(0, 1)},
+    # Read for every login, so it's mirrored for zero-copy loads.
+    ipc_mirror=True,
+    # Users come from few cities & states, and are looked up by ID.
+    parquet_options=ParquetOptions(
+        compression="zstd",
+        dictionary_cols=("city", "state"),
+        page_index=True,
+        bloom_filter_cols=("id",),
+    ),
 )
 
 """Record of all services logged"""
@@ -256,4 +533,20 @@ SERVICE_LOG_INFO = TableInfo(
         "service_id": PROVIDER_DIRECTORY_INFO.character_limits["service_id"],
         "comments": range(1, 100),
     },
+    # Entries are indexed by the day they were received, so many can share an index value.
+    unique_index=False,
+    # Entries are added one at a time, so they're logged and folded into Parquet in batches.
+    write_ahead_log=True,
+    # Reports cover recent services, so only the latest months' files need to be read.
+    partition_col="service_date_utc",
+    # Reports filter on service dates and group by provider, so sorted row groups can be
+    # skipped by their date statistics, and members & providers are looked up by ID.
+    parquet_options=ParquetOptions(
+        sort_keys=("service_date_utc", "provider_id"),
+        row_group_size=16384,
+        compression="zstd",
+        compression_level=3,
+        page_index=True,
+        bloom_filter_cols=("provider_id", "member_id"),
+    ),
 )
@@ -0,0 +1,154 @@
+"""
+A developer-side benchmark of the Parquet layouts a table's files can be written with.
+
+Writes the same service log entries with each configuration of ParquetOptions, then times the
+write, loading a week of services for the weekly reports, and loading one member's services.
+Also prints each file's size, and how many of its row groups the week's date statistics can't
+rule out. Sorting by service date keeps each week in a few row groups, so filtered loads skip
+the rest, while stronger compression trades write time for smaller files.
+
+example usage:
+# Benchmark every configuration with the default number of service log entries
+cd src/scripts
+python3 benchmark_parquet_options.py
+
+# Benchmark with 1,000,000 service log entries
+python3 benchmark_parquet_options.py --services 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from choc_an_simulator.database_management._write_records import (
+    _write_parquet_file_,
+)
+from choc_an_simulator.schemas import SERVICE_LOG_INFO, ParquetOptions
+
+# Date the simulated service log ends on.
+_LAST_SERVICE_DATE = date(2024, 6, 30)
+
+# Each configuration benchmarked, by name.
+_CONFIGURATIONS = {
+    "default": ParquetOptions(),
+    "sorted": ParquetOptions(
+        sort_keys=("service_date_utc", "provider_id"), row_group_size=16384
+    ),
+    "sorted zstd": ParquetOptions(
+        sort_keys=("service_date_utc", "provider_id"),
+        row_group_size=16384,
+        compression="zstd",
+        compression_level=3,
+    ),
+    "sorted zstd-9": ParquetOptions(
+        sort_keys=("service_date_utc", "provider_id"),
+        row_group_size=16384,
+        compression="zstd",
+        compression_level=9,
+    ),
+    "service_log": SERVICE_LOG_INFO.parquet_options,
+}
+
+
+def _services(count: int) -> pa.Table:
+    """Service log entries spread over the half year up to _LAST_SERVICE_DATE."""
+    rng = np.random.default_rng(0)
+    days = rng.integers(0, 182, count)
+    return pa.table(
+        {
+            "entry_datetime_utc": [
+                datetime(2024, 7, 1) + timedelta(milliseconds=i) for i in range(count)
+            ],
+            "service_date_utc": [
+                _LAST_SERVICE_DATE - timedelta(days=int(day)) for day in days
+            ],
+            "provider_id": rng.integers(100000000, 100000100, count),
+            "member_id": rng.integers(100000000, 100010000, count),
+            "service_id": rng.integers(100000, 100010, count),
+            "comments": pa.nulls(count, pa.string()),
+        },
+        schema=SERVICE_LOG_INFO.schema,
+    )
+
+
+def _time(operation, repeat: int) -> float:
+    """Average seconds of an operation, over a number of runs."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        operation(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def _row_groups_read(path: str, week_start: date) -> int:
+    """Number of row groups whose service date statistics may include the week."""
+    metadata = pq.ParquetFile(path).metadata
+    date_col = SERVICE_LOG_INFO.schema.get_field_index("service_date_utc")
+    return sum(
+        metadata.row_group(i).column(date_col).statistics.max >= week_start
+        for i in range(metadata.num_row_groups)
+    )
+
+
+def benchmark(name: str, options: ParquetOptions, services: pa.Table, repeat: int):
+    """
+    Print the cost of writing & reading the service log with one configuration.
+
+    Args-
+        name (str): Name of the configuration.
+        options (ParquetOptions): Options to write the service log with.
+        services (pa.Table): Service log entries to write.
+        repeat (int): Number of times to repeat each read.
+    """
+    table_info = replace(SERVICE_LOG_INFO, partition_col=None, parquet_options=options)
+    week_start = _LAST_SERVICE_DATE - timedelta(days=7)
+    with tempfile.TemporaryDirectory() as storage_dir:
+        path = os.path.join(storage_dir, "service_log.pkt")
+        write = _time(lambda i: _write_parquet_file_(services, path, table_info), 3)
+        weekly = _time(
+            lambda i: pq.read_table(
+                path, filters=[("service_date_utc", ">", week_start)]
+            ),
+            repeat,
+        )
+        member = _time(
+            lambda i: pq.read_table(
+                path, filters=[("member_id", "==", 100000000 + i * 7919 % 10000)]
+            ),
+            repeat,
+        )
+        size = os.path.getsize(path)
+        row_groups = _row_groups_read(path, week_start)
+        total_row_groups = pq.ParquetFile(path).metadata.num_row_groups
+
+    print(
+        f"{name:>14} {write * 1000:>10.1f} {weekly * 1000:>10.2f} "
+        f"{member * 1000:>10.2f} {size / 1024 / 1024:>8.2f} "
+        f"{row_groups:>6}/{total_row_groups:<6}"
+    )
+
+
+def main():
+    """Run the benchmark, based on command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--services", type=int, default=200000, help="service log entries stored"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="runs of each read")
+    args = parser.parse_args()
+
+    services = _services(args.services)
+    print(f"{args.services} service log entries")
+    print(
+        f"{'configuration':>14} {'write ms':>10} {'weekly ms':>10} {'member ms':>10} "
+        f"{'MiB':>8} {'groups read':>13}"
+    )
+    for name, options in _CONFIGURATIONS.items():
+        benchmark(name, options, services, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
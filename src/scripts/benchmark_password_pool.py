@@ -0,0 +1,68 @@
+"""
+A developer-side benchmark of password verification throughput against the number of cores.
+
+Verifies a batch of passwords with a PasswordPool of 1 worker, then 2, and so on up to the
+number of cores, and prints the verifications per second of each. Use it to pick a bcrypt cost
+factor for a deployment: each increase of 1 halves the throughput.
+
+example usage:
+# Benchmark 64 verifications at the default cost factor
+cd src/scripts
+python3 benchmark_password_pool.py
+
+# Benchmark 200 verifications at cost factor 10, with up to 4 workers
+python3 benchmark_password_pool.py --rounds 10 --count 200 --max-workers 4
+"""
+import argparse
+import os
+import time
+from choc_an_simulator.password_pool import PasswordPool, bcrypt_rounds, hash_password
+
+
+def benchmark(count: int, rounds: int, max_workers: int) -> None:
+    """
+    Print the verifications per second of password pools from 1 to max_workers workers.
+
+    Args-
+        count (int): Number of passwords to verify with each pool.
+        rounds (int): bcrypt cost factor of the password hashes.
+        max_workers (int): Largest number of workers to benchmark.
+    """
+    password = b"Th1s1sTh3m0stS3cur3!"
+    password_hash, _ = hash_password(password, rounds)
+    credentials = [(password, password_hash)] * count
+
+    print(f"{count} verifications, bcrypt cost factor {rounds}")
+    print(f"{'workers':>8} {'seconds':>9} {'verifications/s':>16} {'speedup':>8}")
+    single_rate = None
+    for workers in range(1, max_workers + 1):
+        with PasswordPool(max_workers=workers, rounds=rounds) as pool:
+            # Start every worker process before timing
+            pool.verify_many([(password, password_hash)] * workers)
+            start = time.perf_counter()
+            assert all(pool.verify_many(credentials))
+            seconds = time.perf_counter() - start
+        rate = count / seconds
+        single_rate = single_rate or rate
+        print(f"{workers:>8} {seconds:>9.2f} {rate:>16.1f} {rate / single_rate:>7.2f}x")
+
+
+def main():
+    """Run the benchmark, based on command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=64, help="verifications per run")
+    parser.add_argument(
+        "--rounds", type=int, default=bcrypt_rounds(), help="bcrypt cost factor"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="largest number of worker processes",
+    )
+    args = parser.parse_args()
+    benchmark(args.count, args.rounds, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+A developer-side benchmark of the storage engines the database can be kept in.
+
+Fills a fresh database in each engine with members and service log entries, then times point
+lookups of members, appends of single service log entries, and loading a week of the service
+log for the weekly reports. Parquet files suit whole-table reports, while SQLite's index makes
+point lookups and single-record edits cheap. DuckDB is only benchmarked if it's installed.
+
+example usage:
+# Benchmark every engine with the default table sizes
+cd src/scripts
+python3 benchmark_storage_engines.py
+
+# Benchmark with 50,000 members and 200,000 service log entries
+python3 benchmark_storage_engines.py --members 50000 --services 200000
+"""
+import argparse
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from choc_an_simulator.database_management import (
+    _parquet_utils,
+    add_records_to_file,
+    load_record_by_key,
+    load_records_from_file,
+    set_storage_engine,
+)
+from choc_an_simulator.database_management._write_records import (
+    _overwrite_records_to_file_,
+)
+from choc_an_simulator.database_management.storage_engines import duckdb
+from choc_an_simulator.schemas import MEMBER_INFO, SERVICE_LOG_INFO
+
+# Date the simulated service log ends on.
+_LAST_SERVICE_DATE = date(2024, 6, 30)
+
+
+def _members(count: int) -> pd.DataFrame:
+    """Members with IDs from 100000000 up."""
+    return pd.DataFrame(
+        {
+            "member_id": np.arange(100000000, 100000000 + count),
+            "name": "Member",
+            "address": "1234 Street",
+            "city": "Portland",
+            "state": "OR",
+            "zipcode": 97201,
+            "suspended": np.arange(count) % 10 == 0,
+        }
+    )
+
+
+def _services(count: int, members: int, first_id: int = 0) -> pd.DataFrame:
+    """Service log entries spread over the half year up to _LAST_SERVICE_DATE."""
+    rng = np.random.default_rng(first_id)
+    days = rng.integers(0, 182, count)
+    return pd.DataFrame(
+        {
+            "entry_datetime_utc": [
+                datetime(2024, 7, 1) + timedelta(milliseconds=int(i))
+                for i in range(first_id, first_id + count)
+            ],
+            "service_date_utc": [
+                _LAST_SERVICE_DATE - timedelta(days=int(day)) for day in days
+            ],
+            "provider_id": rng.integers(100000000, 100000100, count),
+            "member_id": rng.integers(100000000, 100000000 + members, count),
+            "service_id": rng.integers(100000, 100010, count),
+            "comments": None,
+        }
+    )
+
+
+def _time(operation, repeat: int) -> float:
+    """Average seconds of an operation, over a number of runs."""
+    start = time.perf_counter()
+    for i in range(repeat):
+        operation(i)
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmark(engine_name: str, members: int, services: int, repeat: int) -> None:
+    """
+    Print the time of each operation in one engine, with a fresh database.
+
+    Args-
+        engine_name (str): Name of the engine, as accepted by set_storage_engine.
+        members (int): Number of members to fill the database with.
+        services (int): Number of service log entries to fill the database with.
+        repeat (int): Number of times to repeat each operation.
+    """
+    with tempfile.TemporaryDirectory() as storage_dir:
+        _parquet_utils._PARQUET_DIR_ = storage_dir
+        set_storage_engine(engine_name)
+        _overwrite_records_to_file_(_members(members), MEMBER_INFO)
+        _overwrite_records_to_file_(_services(services, members), SERVICE_LOG_INFO)
+
+        lookup = _time(
+            lambda i: load_record_by_key(MEMBER_INFO, 100000000 + i * 7919 % members),
+            repeat,
+        )
+        append = _time(
+            lambda i: add_records_to_file(
+                _services(1, members, services + i), SERVICE_LOG_INFO
+            ),
+            repeat,
+        )
+        week_start = _LAST_SERVICE_DATE - timedelta(days=7)
+        weekly = _time(
+            lambda i: load_records_from_file(
+                SERVICE_LOG_INFO, gt_cols={"service_date_utc": week_start}
+            ),
+            max(1, repeat // 10),
+        )
+        set_storage_engine("parquet")
+
+    print(
+        f"{engine_name:>8} {lookup * 1000:>10.2f} {append * 1000:>10.2f} "
+        f"{weekly * 1000:>10.2f}"
+    )
+
+
+def main():
+    """Run the benchmark, based on command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=10000, help="members stored")
+    parser.add_argument(
+        "--services", type=int, default=50000, help="service log entries stored"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=100, help="runs of each operation"
+    )
+    args = parser.parse_args()
+
+    engines = ["parquet", "sqlite"] + (["duckdb"] if duckdb is not None else [])
+    print(f"{args.members} members, {args.services} service log entries")
+    print(f"{'engine':>8} {'lookup ms':>10} {'append ms':>10} {'weekly ms':>10}")
+    for engine_name in engines:
+        benchmark(engine_name, args.members, args.services, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+A utility for recording a clinic's batch of service billing entries.
+
+Reads a CSV, Parquet or JSON lines file of service entries, records the valid entries in the
+service log in one write, and saves the rejected entries, with the reason each was rejected,
+to a CSV file.
+
+example usage:
+# Record a day's services, saving rejects to clinic_2024-01-31_rejects.csv
+cd src/scripts
+python3 import_service_billing.py clinic_2024-01-31.csv
+
+# Record services from JSON lines, saving rejects to a chosen file
+python3 import_service_billing.py clinic.jsonl --rejects rejected_services.csv
+"""
+import argparse
+import os
+import sys
+from choc_an_simulator.billing import (
+    read_service_billing_batch,
+    record_service_billing_batch,
+)
+
+
+def import_service_billing(batch_path: str, rejects_path: str) -> int:
+    """
+    Record a batch of service billing entries, and save any rejected entries.
+
+    Args-
+        batch_path (str): Path of the batch file.
+        rejects_path (str): Path of the CSV file to save rejected entries to.
+
+    Returns-
+        int: Number of rejected entries.
+    """
+    entries = read_service_billing_batch(batch_path)
+    num_recorded, rejects = record_service_billing_batch(entries)
+    print(f"{num_recorded} of {len(entries)} service entries recorded")
+    if not rejects.empty:
+        rejects.to_csv(rejects_path, index_label="row")
+        print(
+            f"{len(rejects)} rejected entries saved to {rejects_path}", file=sys.stderr
+        )
+    return len(rejects)
+
+
+def main():
+    """Record a billing batch, based on command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("batch_path", help="CSV, Parquet or JSON lines file of entries")
+    parser.add_argument(
+        "--rejects",
+        help="CSV file for rejected entries (default: <batch>_rejects.csv)",
+    )
+    args = parser.parse_args()
+    rejects_path = args.rejects or (
+        os.path.splitext(args.batch_path)[0] + "_rejects.csv"
+    )
+    num_rejected = import_service_billing(args.batch_path, rejects_path)
+    sys.exit(1 if num_rejected else 0)
+
+
+if __name__ == "__main__":
+    main()
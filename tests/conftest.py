@@ -205,8 +205,7 @@ def save_example_provider_directory_info():
                 "S 3",
                 "S 4",
             ],
-            "price_dollars": [50, 30, 60, 25],
-            "price_cents": [45, 44, 75, 30],
+            "price": [5045, 3044, 6075, 2530],
         }
     )
     with contextlib.suppress(ValueError):  # Avoid adding duplicate values
@@ -272,10 +271,7 @@ def mock_provider_password_auth(mocker):
     mocker.patch(
         "choc_an_simulator.login.generate_secure_password", return_value=[None, None]
     )
-    mocker.patch(
-        "choc_an_simulator.login.secure_password_verification", return_value=True
-    )
-    mocker.patch("choc_an_simulator.login.user_type_authorization", return_value=1)
+    mocker.patch("choc_an_simulator.login.authenticate_user", return_value=(True, 1))
     yield
 
 
@@ -286,8 +282,5 @@ def mock_manager_password_auth(mocker):
     mocker.patch(
         "choc_an_simulator.login.generate_secure_password", return_value=[None, None]
     )
-    mocker.patch(
-        "choc_an_simulator.login.secure_password_verification", return_value=True
-    )
-    mocker.patch("choc_an_simulator.login.user_type_authorization", return_value=0)
+    mocker.patch("choc_an_simulator.login.authenticate_user", return_value=(True, 0))
     yield
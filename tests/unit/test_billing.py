@@ -0,0 +1,177 @@
+"""Tests of functions in the billing module."""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from choc_an_simulator.billing import (
+    REJECT_REASON_COL,
+    read_service_billing_batch,
+    record_service_billing_batch,
+)
+from choc_an_simulator.database_management import (
+    _eligibility,
+    _parquet_utils,
+    add_records_to_file,
+    load_records_from_file,
+)
+from choc_an_simulator.schemas import (
+    MEMBER_INFO,
+    PROVIDER_DIRECTORY_INFO,
+    SERVICE_LOG_INFO,
+    USER_INFO,
+)
+
+
+@pytest.fixture()
+def billing_tables(monkeypatch, tmp_path):
+    """Storage directory with two members (one suspended), a provider and a service."""
+    monkeypatch.setattr(_parquet_utils, "_PARQUET_DIR_", str(tmp_path))
+    monkeypatch.setattr(_eligibility, "_current_eligibility", None)
+    address = {"address": "Street", "city": "Portland", "state": "OR", "zipcode": 97211}
+    add_records_to_file(
+        pd.DataFrame(
+            {
+                "member_id": [100000001, 100000002],
+                "name": "Name",
+                **address,
+                "suspended": [False, True],
+            }
+        ),
+        MEMBER_INFO,
+    )
+    add_records_to_file(
+        pd.DataFrame(
+            {
+                "id": [200000001],
+                "name": "Name",
+                **address,
+                "type": 1,
+                "password_hash": [b"hash"],
+            }
+        ),
+        USER_INFO,
+    )
+    add_records_to_file(
+        pd.DataFrame({"service_id": [100001], "service_name": ["S"], "price": [500]}),
+        PROVIDER_DIRECTORY_INFO,
+    )
+    return tmp_path
+
+
+@pytest.fixture()
+def billing_batch() -> pd.DataFrame:
+    """Batch of five entries, of which the first and last are valid."""
+    return pd.DataFrame(
+        {
+            "service_date_utc": [
+                "2024-01-05",
+                "2024-01-06",
+                "not a date",
+                "2024-01-07",
+                "2024-01-08",
+            ],
+            "provider_id": [200000001, 200000001, 200000001, 299999999, 200000001],
+            "member_id": [100000001, 100000002, 100000009, 100000001, 100000001],
+            "service_id": [100001, 100001, 100002, 100001, 100001],
+            "comments": ["Comment", None, None, None, "c" * 200],
+        }
+    )
+
+
+def test_record_service_billing_batch(billing_tables, billing_batch):
+    """Test that valid entries are recorded and invalid ones rejected with reasons."""
+    billing_batch.loc[4, "comments"] = ""
+    entry_datetime = datetime(2024, 1, 31, 12)
+    num_recorded, rejects = record_service_billing_batch(billing_batch, entry_datetime)
+
+    assert num_recorded == 2
+    assert rejects.index.tolist() == [1, 2, 3]
+    assert rejects[REJECT_REASON_COL].tolist() == [
+        "member suspended",
+        "invalid service_date_utc; unknown member_id; unknown service_id",
+        "unknown provider_id",
+    ]
+    service_log = load_records_from_file(SERVICE_LOG_INFO)
+    assert service_log["service_date_utc"].tolist() == [
+        date(2024, 1, 5),
+        date(2024, 1, 8),
+    ]
+    assert service_log["comments"].tolist() == ["Comment", None]
+
+
+def test_record_service_billing_batch_schema_rejects(billing_tables, billing_batch):
+    """Test that entries breaking the service log's limits are rejected."""
+    num_recorded, rejects = record_service_billing_batch(billing_batch)
+    assert num_recorded == 1
+    assert rejects.loc[4, REJECT_REASON_COL] == "invalid comments"
+
+
+def test_record_service_billing_batch_invalid_ids(billing_tables):
+    """Test that IDs that are missing or aren't integers are rejected."""
+    batch = pd.DataFrame(
+        {
+            "service_date_utc": ["2024-01-05"] * 3,
+            "provider_id": ["200000001", "abc", None],
+            "member_id": [100000001.5, 100000001, 100000001],
+            "service_id": [100001] * 3,
+        }
+    )
+    num_recorded, rejects = record_service_billing_batch(batch)
+    assert num_recorded == 0
+    assert rejects[REJECT_REASON_COL].tolist() == [
+        "invalid member_id",
+        "invalid provider_id",
+        "invalid provider_id",
+    ]
+    assert load_records_from_file(SERVICE_LOG_INFO).empty
+
+
+def test_record_service_billing_batch_oversize_ids(billing_tables):
+    """Test that IDs too large for the service log reject only their own entries."""
+    batch = pd.DataFrame(
+        {
+            "service_date_utc": ["2024-01-05"] * 3,
+            "provider_id": [200000001] * 3,
+            "member_id": ["99999999999999999999", "100000001", 2**53 + 100000001],
+            "service_id": [100001] * 3,
+        }
+    )
+    num_recorded, rejects = record_service_billing_batch(batch)
+    assert num_recorded == 1
+    assert rejects.index.tolist() == [0, 2]
+    assert rejects[REJECT_REASON_COL].tolist() == [
+        "invalid member_id",
+        "unknown member_id",
+    ]
+    assert load_records_from_file(SERVICE_LOG_INFO)["member_id"].tolist() == [100000001]
+
+
+def test_record_service_billing_batch_missing_column(billing_batch):
+    """Test that a batch without a required column is refused."""
+    with pytest.raises(KeyError):
+        record_service_billing_batch(billing_batch.drop(columns=["member_id"]))
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".jsonl"])
+def test_read_service_billing_batch(tmp_path, billing_batch, extension):
+    """Test reading a batch in each supported format."""
+    path = str(tmp_path / f"batch{extension}")
+    match extension:
+        case ".csv":
+            billing_batch.to_csv(path, index=False)
+        case ".parquet":
+            billing_batch.to_parquet(path)
+        case ".jsonl":
+            billing_batch.to_json(path, orient="records", lines=True)
+
+    batch = read_service_billing_batch(path)
+    assert batch["member_id"].tolist() == billing_batch["member_id"].tolist()
+    assert batch["comments"].iloc[0] == "Comment"
+    assert pd.isna(batch["comments"].iloc[1])
+
+
+def test_read_service_billing_batch_unsupported(tmp_path):
+    """Test that files in unsupported formats are refused."""
+    with pytest.raises(ValueError):
+        read_service_billing_batch(str(tmp_path / "batch.xlsx"))
@@ -1,16 +1,62 @@
 """Tests of the database_management module."""
+from dataclasses import replace
 from datetime import datetime, date, timezone
+import io
+import json
 import os
+import shutil
+import threading
+import time
 import pytest
 import pandas as pd
 import pyarrow as pa
-from choc_an_simulator.schemas import TableInfo
+import pyarrow.parquet as pq
+from choc_an_simulator.schemas import (
+    MEMBER_INFO,
+    PROVIDER_DIRECTORY_INFO,
+    SERVICE_LOG_INFO,
+    ParquetOptions,
+    RecordLimitError,
+    TableInfo,
+)
 from choc_an_simulator.database_management import (
     add_records_to_file,
+    aggregate_table,
+    filter_table,
+    join_tables,
+    load_table,
     load_records_from_file,
     update_record,
+    update_records,
     remove_record,
+    remove_records,
     save_report,
+    save_report_batches,
+    save_reports,
+    set_table_cache_budget,
+    lookup_member_eligibility,
+    lookup_members_eligibility,
+    contains_key,
+    contains_keys,
+    load_record_by_key,
+    migrate_partitioned_tables,
+    migrate_provider_directory_prices,
+    recover_transactions,
+    set_storage_engine,
+    DuckDBEngine,
+    SQLiteEngine,
+    StorageEngine,
+    table_version,
+    Transaction,
+)
+from choc_an_simulator.database_management import (
+    edit_records,
+    _eligibility,
+    _parquet_utils,
+    _write_records,
+    _table_cache,
+    reports,
+    transactions,
 )
 from choc_an_simulator.database_management._write_records import (
     _overwrite_records_to_file_,
@@ -20,8 +66,17 @@ from choc_an_simulator.database_management.load_records import (
 )
 from choc_an_simulator.database_management._parquet_utils import (
     _convert_parquet_name_to_path_,
+    _convert_parquet_name_to_append_dir_,
+    _convert_segment_path_to_index_path_,
+    _list_append_fragments_,
+    _list_write_ahead_logs_,
     _PARQUET_DIR_,
 )
+from choc_an_simulator.database_management._key_index import (
+    _find_key_positions_,
+    _read_row_by_key_,
+)
+from choc_an_simulator.database_management._write_ahead_log import _write_ahead_log_
 
 
 @pytest.fixture()
@@ -87,6 +142,20 @@ def test_file(test_records, test_table_info):
     test_path = os.path.join(_PARQUET_DIR_, f"{test_table_info.name}.pkt")
     if os.path.exists(test_path):
         os.remove(test_path)
+    test_index_path = _convert_segment_path_to_index_path_(test_path)
+    if os.path.exists(test_index_path):
+        os.remove(test_index_path)
+    shutil.rmtree(
+        _convert_parquet_name_to_append_dir_(test_table_info.name), ignore_errors=True
+    )
+
+
+@pytest.fixture()
+def no_table_cache():
+    """Fixture to disable the table cache, so that every load reads from the file."""
+    set_table_cache_budget(0)
+    yield None
+    set_table_cache_budget(_table_cache._DEFAULT_CACHE_BUDGET_BYTES_)
 
 
 @pytest.fixture()
@@ -118,6 +187,39 @@ class TestAddRecordsToFile:
             expected_records
         ), f"\n{expected_records}\n{updated_records}"
 
+    def test_add_records_to_file_appends_without_rewrite(
+        self,
+        test_table_info,
+        test_records,
+        test_records_additional,
+        test_file,
+    ):
+        """Test that adding records leaves the existing file untouched."""
+        path = _convert_parquet_name_to_path_(test_table_info.name)
+        modified_before = os.stat(path).st_mtime_ns
+        add_records_to_file(test_records_additional, test_table_info)
+        assert os.stat(path).st_mtime_ns == modified_before
+        assert len(_list_append_fragments_(test_table_info.name)) == 1
+        assert len(load_records_from_file(test_table_info)) == 3
+
+    def test_add_records_to_file_compacts_fragments(
+        self, test_table_info, test_records, test_file, monkeypatch
+    ):
+        """Test that append fragments are folded into the file once enough accumulate."""
+        monkeypatch.setattr(_write_records, "_MAX_APPEND_FRAGMENTS_", 3)
+        for record_id in range(3, 6):
+            add_records_to_file(
+                pd.DataFrame({"ID": [record_id], "value": [1.0]}), test_table_info
+            )
+        assert _list_append_fragments_(test_table_info.name) == []
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [
+            1,
+            2,
+            3,
+            4,
+            5,
+        ]
+
     @pytest.mark.parametrize(
         "records,info,error_type",
         [
@@ -172,6 +274,9 @@ class TestAddRecordsToFile:
         self, test_table_info, test_records_additional, test_file, mocker
     ):
         """Test adding records to an unreadable file."""
+        # Remove the key index, so that it must be rebuilt by reading the file
+        test_path = _convert_parquet_name_to_path_(test_table_info.name)
+        os.remove(_convert_segment_path_to_index_path_(test_path))
         mocker.patch("pyarrow.parquet.read_table", side_effect=pa.ArrowIOError)
         with pytest.raises(pa.ArrowIOError):
             add_records_to_file(test_records_additional, test_table_info)
@@ -185,6 +290,34 @@ class TestAddRecordsToFile:
             add_records_to_file(test_records_additional, test_table_info)
 
 
+class TestKeyIndex:
+    """Validate functionality of the primary-key index kept next to each file."""
+
+    def test_key_index_tracks_appends(
+        self, test_table_info, test_records_additional, test_file
+    ):
+        """Test that keys of appended records are found at their position in the table."""
+        add_records_to_file(test_records_additional, test_table_info)
+        assert _find_key_positions_(test_table_info, 3) == [2]
+        assert _find_key_positions_(test_table_info, 4) == []
+        assert _read_row_by_key_(test_table_info, 3)["value"] == 3.0
+        assert _read_row_by_key_(test_table_info, 4) is None
+
+    def test_key_index_rebuilt_when_stale(self, test_table_info, test_file):
+        """Test that an index is rebuilt if its file is changed without it."""
+        test_path = _convert_parquet_name_to_path_(test_table_info.name)
+        pd.DataFrame({"ID": [7], "value": [1.0]}).to_parquet(test_path)
+        assert _find_key_positions_(test_table_info, 7) == [0]
+        assert _find_key_positions_(test_table_info, 1) == []
+
+    def test_key_index_missing(self, test_table_info, test_file):
+        """Test that a missing index is rebuilt from the file."""
+        test_path = _convert_parquet_name_to_path_(test_table_info.name)
+        os.remove(_convert_segment_path_to_index_path_(test_path))
+        assert _find_key_positions_(test_table_info, 2) == [1]
+        assert os.path.exists(_convert_segment_path_to_index_path_(test_path))
+
+
 class TestLoadRecordsFromFile:
     """Validate functionality and error handling of the load_records_from_file function."""
 
@@ -212,15 +345,52 @@ class TestLoadRecordsFromFile:
         self, test_table_info, test_records, test_file
     ):
         """Test loading with valid filters"""
+
+        def expected(mask: pd.Series) -> pd.DataFrame:
+            """Filtered records are renumbered from 0, since they're filtered while read."""
+            return test_records[mask].reset_index(drop=True)
+
         # Test 1: Equality filter
         eq_records = load_records_from_file(test_table_info, eq_cols={"ID": 1})
-        assert test_records[test_records["ID"] == 1].equals(eq_records)
+        assert expected(test_records["ID"] == 1).equals(eq_records)
         # Test 2: Less-than filter
         lt_records = load_records_from_file(test_table_info, lt_cols={"value": 2.0})
-        assert test_records[test_records["value"] < 2.0].equals(lt_records)
+        assert expected(test_records["value"] < 2.0).equals(lt_records)
         # Test 3: Greater-than filter
         lt_records = load_records_from_file(test_table_info, gt_cols={"value": 2.0})
-        assert test_records[test_records["value"] > 2.0].equals(lt_records)
+        assert expected(test_records["value"] > 2.0).equals(lt_records)
+        # Test 4: Combined filters
+        both_records = load_records_from_file(
+            test_table_info, eq_cols={"ID": 2}, gt_cols={"value": 2.0}
+        )
+        assert expected(test_records["ID"] == 2).equals(both_records)
+
+    def test_load_records_from_file_pushes_down_filters(
+        self, test_table_info, test_file, no_table_cache, mocker
+    ):
+        """Test that filters are pushed down to the Parquet reader."""
+        records = pd.DataFrame({"ID": range(100), "value": [1.0] * 100})
+        _overwrite_records_to_file_(records, test_table_info)
+        read_table = mocker.spy(pq, "read_table")
+        filtered = load_records_from_file(test_table_info, gt_cols={"ID": 97})
+        assert filtered["ID"].tolist() == [98, 99]
+        assert read_table.call_args.kwargs["filters"] is not None
+
+    def test_load_records_from_file_columns(
+        self, test_table_info, test_records, test_file, no_table_cache, mocker
+    ):
+        """Test loading a subset of columns, including filtering on an unloaded column."""
+        read_table = mocker.spy(pq, "read_table")
+        values = load_records_from_file(
+            test_table_info, eq_cols={"ID": 2}, columns=["value"]
+        )
+        assert values.equals(pd.DataFrame({"value": [2.2]}))
+        assert read_table.call_args.kwargs["columns"] == ["value"]
+
+    def test_load_records_from_file_invalid_columns(self, test_table_info, test_file):
+        """Test loading a column that isn't in the schema."""
+        with pytest.raises(KeyError):
+            load_records_from_file(test_table_info, columns=["invalid"])
 
     def test_load_records_from_file_invalid_equality(self, test_table_info, test_file):
         """Test loading records with an unsupported equality filter."""
@@ -272,6 +442,121 @@ class TestLoadRecordsFromFile:
             load_records_from_file(test_table_info_wrong_columns)
 
 
+class TestArrowQueries:
+    """Validate loading and querying records as Arrow tables."""
+
+    def test_load_table(self, test_file, test_table_info):
+        """Test loading records as an Arrow table, with filters and columns"""
+        table = load_table(test_table_info)
+        assert isinstance(table, pa.Table)
+        assert table.column("ID").to_pylist() == [1, 2]
+        table = load_table(test_table_info, gt_cols={"value": 1.5}, columns=["ID"])
+        assert table.to_pydict() == {"ID": [2]}
+
+    def test_load_table_empty(self, members_dir, test_table_info):
+        """Test that a table with no file loads as an empty table of its schema"""
+        table = load_table(test_table_info)
+        assert table.num_rows == 0
+        assert table.schema.equals(test_table_info.schema)
+
+    def test_filter_table(self):
+        """Test filtering an Arrow table in memory"""
+        table = pa.table({"ID": [1, 2, 3], "value": [0.5, 1.5, 2.5]})
+        assert filter_table(table).equals(table)
+        filtered = filter_table(table, lt_cols={"value": 2.0}, gt_cols={"ID": 1})
+        assert filtered.column("ID").to_pylist() == [2]
+        with pytest.raises(KeyError):
+            filter_table(table, eq_cols={"missing": 1})
+        with pytest.raises(TypeError):
+            filter_table(table, lt_cols={"value": "a"})
+
+    def test_join_tables(self):
+        """Test that joins keep the records in the order of the left table"""
+        services = pa.table(
+            {"service_id": [3, 1, 2, 1, 4], "member_id": [5, 6, 7, 8, 9]}
+        )
+        directory = pa.table({"id": [1, 2, 3], "service_name": ["a", "b", "c"]})
+        joined = join_tables(services, directory, "service_id", right_keys="id")
+        assert joined.column_names == ["service_id", "member_id", "service_name"]
+        assert joined.column("member_id").to_pylist() == [5, 6, 7, 8]
+        assert joined.column("service_name").to_pylist() == ["c", "a", "b", "a"]
+        left = join_tables(
+            services, directory, "service_id", right_keys="id", join_type="left outer"
+        )
+        assert left.column("service_name").to_pylist() == ["c", "a", "b", "a", None]
+
+    def test_aggregate_table(self):
+        """Test that groups are aggregated in the order of their first record"""
+        services = pa.table({"provider_id": [2, 1, 2], "fee": [100, 200, 300]})
+        totals = aggregate_table(
+            services, ["provider_id"], [("fee", "sum"), ("fee", "list")]
+        )
+        assert totals.to_pydict() == {
+            "provider_id": [2, 1],
+            "fee_sum": [400, 200],
+            "fee_list": [[100, 300], [200]],
+        }
+        with pytest.raises(KeyError):
+            aggregate_table(services, ["missing"], [("fee", "sum")])
+
+
+class TestTableCache:
+    """Validate functionality of the in-process table cache."""
+
+    def test_table_cache_hit(self, test_table_info, test_records, test_file, mocker):
+        """Test that a table is only read from its file once while it's unchanged."""
+        read_table = mocker.spy(pq, "read_table")
+        load_records_from_file(test_table_info)
+        filtered = load_records_from_file(test_table_info, eq_cols={"ID": 2})
+        assert read_table.call_count == 1
+        assert filtered["value"].tolist() == [2.2]
+
+    def test_table_cache_miss_pushes_down_filters(
+        self, test_table_info, test_file, mocker
+    ):
+        """Test that a filtered read of an uncached table uses the dataset filter."""
+        _table_cache._TABLE_CACHE_.clear()
+        read_table = mocker.spy(pq, "read_table")
+        filtered = load_records_from_file(test_table_info, eq_cols={"ID": 2})
+        assert filtered["value"].tolist() == [2.2]
+        assert read_table.call_args.kwargs["filters"] is not None
+        signature = _table_cache._table_signature_(test_table_info.name)
+        assert _table_cache._TABLE_CACHE_.get(test_table_info.name, signature) is None
+
+        load_records_from_file(test_table_info)
+        assert read_table.call_args.kwargs["filters"] is None
+        load_records_from_file(test_table_info, eq_cols={"ID": 2})
+        assert read_table.call_count == 2
+
+    def test_table_cache_invalidated_by_write(
+        self, test_table_info, test_records_additional, test_file
+    ):
+        """Test that writing to a table invalidates its cached copy."""
+        load_records_from_file(test_table_info)
+        add_records_to_file(test_records_additional, test_table_info)
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1, 2, 3]
+
+    def test_table_cache_invalidated_by_file_change(self, test_table_info, test_file):
+        """Test that changing a file outside of database_management invalidates the cache."""
+        load_records_from_file(test_table_info)
+        test_path = _convert_parquet_name_to_path_(test_table_info.name)
+        pd.DataFrame({"ID": [7], "value": [1.0]}).to_parquet(test_path)
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [7]
+
+    def test_table_cache_lru_eviction(self):
+        """Test that the least recently used tables are evicted to stay within budget."""
+        table = pa.table({"ID": list(range(10))})
+        cache = _table_cache._TableCache(max_bytes=table.nbytes * 2)
+        cache.put("a", 0, table)
+        cache.put("b", 0, table)
+        assert cache.get("a", 0) is table
+        cache.put("c", 0, table)
+        assert cache.get("b", 0) is None
+        assert cache.get("a", 0) is table
+        assert cache.get("c", 0) is table
+        assert cache.get("c", 1) is None
+
+
 class TestUpdateRecord:
     """Validate functionality and error handling of the update_record function."""
 
@@ -283,6 +568,33 @@ class TestUpdateRecord:
         ]
         assert (updated_record == loaded_record).all()
 
+    def test_update_record_keeps_other_records(self, test_table_info, test_file):
+        """Test that only the updated field of the matching record changes."""
+        updated_record = update_record(1, test_table_info, value=0.5)
+        assert updated_record.tolist() == [1, 0.5]
+        records = load_records_from_file(test_table_info)
+        assert records.values.tolist() == [[1, 0.5], [2, 2.2]]
+
+    def test_update_record_index(self, test_table_info, test_file):
+        """Test that a record's index can change, but not to another record's index."""
+        with pytest.raises(ValueError):
+            update_record(1, test_table_info, ID=2)
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1, 2]
+        assert update_record(1, test_table_info, ID=1)["ID"] == 1
+        assert update_record(1, test_table_info, ID=3)["ID"] == 3
+        assert contains_keys(test_table_info, [1, 3]).tolist() == [False, True]
+
+    def test_set_fields_shares_untouched_columns(self):
+        """Test that setting a field doesn't copy the other columns."""
+        table = pa.table({"ID": [1, 2, 3], "value": [1.0, 2.0, 3.0]})
+        updated = edit_records._set_fields(table, 1, {"value": 0.5})
+        assert updated.column("value").to_pylist() == [1.0, 0.5, 3.0]
+        assert table.column("value").to_pylist() == [1.0, 2.0, 3.0]
+        assert (
+            updated.column("ID").chunk(0).buffers()[1].address
+            == table.column("ID").chunk(0).buffers()[1].address
+        )
+
     @pytest.mark.parametrize(
         "index,kwargs,error_type",
         [
@@ -376,6 +688,62 @@ class TestRemoveRecord:
             remove_record(1, test_table_info_wrong_columns)
 
 
+class TestBulkEditRecords:
+    """Validate functionality and error handling of update_records and remove_records."""
+
+    def test_update_records_mapping(self, test_table_info, test_file, mocker):
+        """Test updating several records from a mapping, with a single write"""
+        spy = mocker.spy(edit_records, "_overwrite_table_to_file_")
+        revalidating_write = mocker.spy(_write_records, "_overwrite_records_to_file_")
+        outcomes = update_records(
+            {1: {"value": 0.5}, 2: {"value": 2.5}}, test_table_info
+        )
+        assert outcomes == {1: True, 2: True}
+        outcomes = update_records(
+            {2: {"value": 0.1}, 9: {"value": 1.0}}, test_table_info
+        )
+        assert outcomes == {2: True, 9: False}
+        assert load_records_from_file(test_table_info)["value"].tolist() == [0.5, 0.1]
+        assert spy.call_count == 2
+        # Only the changed records are validated, so the table isn't revalidated on write
+        assert revalidating_write.call_count == 0
+
+    def test_update_records_frame(self, test_table_info, test_file):
+        """Test updating several records from a DataFrame indexed by their IDs"""
+        updates = pd.DataFrame({"value": [1.5, 0.0]}, index=[2, 3])
+        assert update_records(updates, test_table_info) == {2: True, 3: False}
+        assert load_records_from_file(test_table_info)["value"].tolist() == [1.1, 1.5]
+
+    @pytest.mark.parametrize(
+        "updates,error_type",
+        [
+            ({1: {"bad_column_name": 1.0}}, KeyError),
+            ({1: {"value": 1.0}, 2: {"value": "hello"}}, TypeError),
+            ({1: {"value": 1.0}, 2: {"value": 5.0}}, ArithmeticError),
+            ({1: {"ID": 2}}, ValueError),
+        ],
+    )
+    def test_update_records_invalid(
+        self, updates, error_type, test_table_info, test_file
+    ):
+        """Test that no record is written if any update is invalid"""
+        records_before = load_records_from_file(test_table_info)
+        with pytest.raises(error_type):
+            update_records(updates, test_table_info)
+        assert load_records_from_file(test_table_info).equals(records_before)
+
+    def test_remove_records(self, test_table_info, test_file, mocker):
+        """Test removing several records, with a single write"""
+        spy = mocker.spy(edit_records, "_overwrite_table_to_file_")
+        revalidating_write = mocker.spy(_write_records, "_overwrite_records_to_file_")
+        assert remove_records([2, 3, 2], test_table_info) == {2: True, 3: False}
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1]
+        assert remove_records([3], test_table_info) == {3: False}
+        assert spy.call_count == 1
+        # No values change, so the remaining records aren't revalidated on write
+        assert revalidating_write.call_count == 0
+
+
 class TestOverwriteRecordsToFile:
     """Validate functionality and error handling of the _overwrite_records_to_file_ function."""
 
@@ -475,6 +843,912 @@ class TestSaveReport:
         with pytest.raises(IOError):
             save_report(self.report_input, "directory/test")
 
+    def test_save_report_does_not_modify_input(self):
+        """Test that saving a report leaves the caller's DataFrame unchanged"""
+        report_input = self.report_input.copy()
+        path = save_report(report_input, "test")
+        os.remove(path)
+        assert report_input.equals(self.report_input)
+
+    def test_save_report_in_batches(self, monkeypatch):
+        """Test saving a report a row at a time gives the same file"""
+        monkeypatch.setattr(reports, "_REPORT_BATCH_ROWS_", 1)
+        path = save_report(self.report_input, "test")
+        reloaded_from_file = pd.read_csv(path)
+        os.remove(path)
+        assert reloaded_from_file.equals(self.expected_output)
+
+    def test_save_report_batches(self):
+        """Test saving a report from a stream of record batches"""
+        table = pa.Table.from_pandas(self.report_input, preserve_index=False)
+        path = save_report_batches(table.to_batches(max_chunksize=1), "test")
+        reloaded_from_file = pd.read_csv(path)
+        os.remove(path)
+        assert reloaded_from_file.equals(self.expected_output)
+
+    def test_save_report_money(self):
+        """Test saving a report with money columns, given in cents"""
+        report_input = pd.DataFrame({"ID": [1, 2, 3], "fee": [12345, 5, 100000]})
+        path = save_report(report_input, "test", money_cols=["fee"])
+        try:
+            reloaded_from_file = pd.read_csv(path, dtype={"fee": str})
+            assert reloaded_from_file["fee"].tolist() == ["123.45", "0.05", "1000.00"]
+            assert report_input["fee"].tolist() == [12345, 5, 100000]
+        finally:
+            os.remove(path)
+
+    def test_save_report_format(self):
+        """Test that reports hold the values DataFrame.to_csv writes, with strings quoted"""
+        report_input = pd.DataFrame(
+            {
+                "name": ["Plain", "Comma, Inc.", 'Say "hi"', None],
+                "consultations": [2.0, 2.5, 1e20, None],
+                "fee": [200, 250, 12345, 5],
+                "date": [date(2021, 1, 1)] * 4,
+                "bool": [True, False, True, False],
+            }
+        )
+        path = save_report(report_input, "test", money_cols=["fee"])
+        try:
+            with open(path, newline="") as report:
+                written = report.read()
+        finally:
+            os.remove(path)
+        assert written.split(os.linesep) == [
+            '"name","consultations","fee","date","bool"',
+            '"Plain","2.0","2.00","01-01-2021","True"',
+            '"Comma, Inc.","2.5","2.50","01-01-2021","False"',
+            '"Say ""hi""","1e+20","123.45","01-01-2021","True"',
+            ',,"0.05","01-01-2021","False"',
+            "",
+        ]
+        expected = report_input.assign(fee=report_input["fee"] / 100)
+        expected["date"] = "01-01-2021"
+        assert pd.read_csv(io.StringIO(written)).equals(
+            pd.read_csv(io.StringIO(expected.to_csv(index=False)))
+        )
+
+    def test_save_reports_in_order(self):
+        """Test that saving many reports returns their paths in the order given"""
+        names = [f"test_{num}" for num in range(20)]
+        paths = list(
+            save_reports(((self.report_input, name) for name in names), max_workers=3)
+        )
+        try:
+            assert [os.path.basename(path) for path in paths] == [
+                f"{name}.csv" for name in names
+            ]
+            for path in paths:
+                assert pd.read_csv(path).equals(self.expected_output)
+        finally:
+            for path in paths:
+                os.remove(path)
+
+    def test_save_reports_bounded_workers(self, mocker):
+        """Test that no more than max_workers reports are written at once"""
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def slow_save(table, file_name, money_cols):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return file_name
+
+        mocker.patch(
+            "choc_an_simulator.database_management.reports.save_report",
+            side_effect=slow_save,
+        )
+        reports = ((self.report_input, str(num)) for num in range(12))
+        assert list(save_reports(reports, max_workers=2)) == [
+            str(num) for num in range(12)
+        ]
+        assert active[1] <= 2
+
+    def test_save_reports_bad_path(self):
+        """Test saving many reports when one can't be saved"""
+        with pytest.raises(IOError):
+            list(save_reports([(self.report_input, "directory/test")]))
+
+
+def test_migrate_provider_directory_prices(monkeypatch, tmp_path):
+    """Test migrating a provider directory with prices in dollars & cents columns"""
+    monkeypatch.setattr(_parquet_utils, "_PARQUET_DIR_", str(tmp_path))
+    pd.DataFrame(
+        {
+            "service_id": [100001, 100002],
+            "service_name": ["S 1", "S 2"],
+            "price_dollars": [50, 0],
+            "price_cents": [45, 5],
+        }
+    ).to_parquet(os.path.join(tmp_path, "provider_directory.pkt"))
+
+    assert migrate_provider_directory_prices()
+    assert not migrate_provider_directory_prices()
+    migrated = load_records_from_file(PROVIDER_DIRECTORY_INFO)
+    assert migrated.columns.tolist() == ["service_id", "service_name", "price"]
+    assert migrated["price"].tolist() == [5045, 5]
+
+
+def test_migrate_provider_directory_large_prices(monkeypatch, tmp_path):
+    """Test migrating legacy prices up to the price limit, and rejecting those above it"""
+    monkeypatch.setattr(_parquet_utils, "_PARQUET_DIR_", str(tmp_path))
+    path = os.path.join(tmp_path, "provider_directory.pkt")
+    legacy = pd.DataFrame(
+        {
+            "service_id": [100001, 100002],
+            "service_name": ["S 1", "S 2"],
+            "price_dollars": [999, 1000],
+            "price_cents": [99, 0],
+        }
+    )
+    legacy.to_parquet(path)
+    with pytest.raises(RecordLimitError, match="100002"):
+        migrate_provider_directory_prices()
+    assert pd.read_parquet(path).equals(legacy)
+
+    legacy.iloc[:1].to_parquet(path)
+    assert migrate_provider_directory_prices()
+    assert load_records_from_file(PROVIDER_DIRECTORY_INFO)["price"].tolist() == [99999]
+
+
+def _member_records(member_ids, suspended) -> pd.DataFrame:
+    """Members with the given IDs and suspensions."""
+    return pd.DataFrame(
+        {
+            "member_id": member_ids,
+            "name": "Name",
+            "address": "Street",
+            "city": "Portland",
+            "state": "OR",
+            "zipcode": 97211,
+            "suspended": suspended,
+        }
+    )
+
+
+@pytest.fixture()
+def members_dir(monkeypatch, tmp_path):
+    """Empty storage directory for the members table."""
+    monkeypatch.setattr(_parquet_utils, "_PARQUET_DIR_", str(tmp_path))
+    monkeypatch.setattr(_eligibility, "_current_eligibility", None)
+    return tmp_path
+
+
+def test_lookup_member_eligibility(members_dir):
+    """Test looking up members' eligibility from the sidecar written with the members"""
+    assert lookup_member_eligibility(123456789) is None
+    add_records_to_file(
+        _member_records([300000000, 100000000, 200000000], [False, False, True]),
+        MEMBER_INFO,
+    )
+    assert os.path.exists(os.path.join(members_dir, "members.elig"))
+    assert lookup_member_eligibility(100000000) is True
+    assert lookup_member_eligibility(200000000) is False
+    assert lookup_member_eligibility(300000000) is True
+    assert lookup_member_eligibility(150000000) is None
+    assert lookup_member_eligibility(999999999) is None
+    assert lookup_member_eligibility(None) is None
+
+
+def test_lookup_member_eligibility_after_writes(members_dir):
+    """Test that the eligibility sidecar follows appends, overwrites and outside changes"""
+    add_records_to_file(_member_records([100000000], [False]), MEMBER_INFO)
+    assert lookup_member_eligibility(100000000) is True
+
+    add_records_to_file(_member_records([200000000], [True]), MEMBER_INFO)
+    assert lookup_member_eligibility(200000000) is False
+
+    _overwrite_records_to_file_(
+        _member_records([100000000, 200000000], [True, False]), MEMBER_INFO
+    )
+    assert lookup_member_eligibility(100000000) is False
+    assert lookup_member_eligibility(200000000) is True
+
+    # Files changed without going through the database functions are noticed too
+    os.remove(os.path.join(members_dir, "members.elig"))
+    _member_records([300000000], [False]).to_parquet(
+        os.path.join(members_dir, "members.pkt"), schema=MEMBER_INFO.schema
+    )
+    assert lookup_member_eligibility(100000000) is None
+    assert lookup_member_eligibility(300000000) is True
+
+
+def test_lookup_members_eligibility(members_dir):
+    """Test looking up many members' eligibility at once"""
+    add_records_to_file(
+        _member_records([100000000, 200000000], [False, True]), MEMBER_INFO
+    )
+    eligibility = lookup_members_eligibility(
+        pd.Series([200000000, None, 100000000, 300000000], index=[4, 3, 2, 1])
+    )
+    assert eligibility.index.tolist() == [4, 3, 2, 1]
+    assert eligibility.tolist() == [False, pd.NA, True, pd.NA]
+
+
+def test_ipc_mirror(members_dir, no_table_cache, monkeypatch):
+    """Test that mirrored tables are loaded from their Arrow mirror, not their Parquet files"""
+    add_records_to_file(_member_records([100000000], [False]), MEMBER_INFO)
+    add_records_to_file(_member_records([200000000], [True]), MEMBER_INFO)
+    # Appends leave the mirror to be rebuilt by the next read
+    assert not os.path.exists(os.path.join(members_dir, "members.arrow"))
+    load_table(MEMBER_INFO)
+    assert os.path.exists(os.path.join(members_dir, "members.arrow"))
+
+    def read_table(*args, **kwargs):
+        raise AssertionError("Parquet file read")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(pq, "read_table", read_table)
+        members = load_records_from_file(MEMBER_INFO)
+        assert members["member_id"].tolist() == [100000000, 200000000]
+        assert load_records_from_file(
+            MEMBER_INFO, eq_cols={"suspended": True}, columns=["member_id"]
+        )["member_id"].tolist() == [200000000]
+
+    # Files changed without going through the database functions are noticed too
+    _member_records([300000000], [False]).to_parquet(
+        os.path.join(members_dir, "members.pkt"), schema=MEMBER_INFO.schema
+    )
+    shutil.rmtree(os.path.join(members_dir, "members.appends"))
+    assert load_records_from_file(MEMBER_INFO)["member_id"].tolist() == [300000000]
+
+
+def test_append_leaves_sidecars_stale(members_dir, mocker):
+    """Test that appending records doesn't read the whole table to rebuild its sidecars"""
+    add_records_to_file(_member_records([100000000], [False]), MEMBER_INFO)
+    assert lookup_member_eligibility(100000000) is True
+    read_table = mocker.spy(_write_records, "_read_table_")
+    write_eligibility = mocker.spy(_write_records, "_write_member_eligibility_")
+    add_records_to_file(_member_records([200000000], [True]), MEMBER_INFO)
+    assert read_table.call_count == 0
+    assert write_eligibility.call_count == 0
+
+    # The sidecars are rebuilt when they're next read
+    assert lookup_member_eligibility(200000000) is False
+    assert load_table(MEMBER_INFO).column("member_id").to_pylist() == [
+        100000000,
+        200000000,
+    ]
+
+
+def test_contains_keys(test_file, test_table_info):
+    """Test checking which of many keys are in a table"""
+    assert contains_keys(test_table_info, [2, 99, 1]).tolist() == [True, False, True]
+    assert contains_keys(test_table_info, []).tolist() == []
+
+
+def test_contains_key(test_file, test_table_info):
+    """Test checking whether a single key is in a table"""
+    assert contains_key(test_table_info, 2)
+    assert not contains_key(test_table_info, 99)
+
+
+def test_load_record_by_key(test_file, test_table_info, test_records_additional):
+    """Test loading one record by its key, including from an append fragment"""
+    add_records_to_file(test_records_additional, test_table_info)
+    assert load_record_by_key(test_table_info, 2)["value"] == 2.2
+    assert load_record_by_key(test_table_info, 3)["value"] == 3.0
+    assert load_record_by_key(test_table_info, 99) is None
+
+
+class TestTransaction:
+    """Validate committing, rolling back and recovering transactions."""
+
+    def test_transaction_commit(self, members_dir, test_table_info, test_records):
+        """Test that changes to several tables are written together on commit"""
+        add_records_to_file(_member_records([100000000], [False]), MEMBER_INFO)
+        with Transaction() as transaction:
+            transaction.add_records(test_records, test_table_info)
+            transaction.update_record(100000000, MEMBER_INFO, suspended=True)
+            transaction.add_records(_member_records([200000000], [False]), MEMBER_INFO)
+            assert transaction.remove_records([1], test_table_info) == 1
+            assert transaction.load_records(test_table_info)["ID"].tolist() == [2]
+            assert load_records_from_file(MEMBER_INFO)["suspended"].tolist() == [False]
+
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [2]
+        members = load_records_from_file(MEMBER_INFO)
+        assert members["suspended"].tolist() == [True, False]
+        assert lookup_member_eligibility(100000000) is False
+        assert lookup_member_eligibility(200000000) is True
+        assert not os.path.exists(os.path.join(members_dir, "members.appends"))
+        assert sorted(os.listdir(members_dir)) == [
+            "members.arrow",
+            "members.elig",
+            "members.idx",
+            "members.pkt",
+            "test.idx",
+            "test.pkt",
+        ]
+
+    def test_transaction_rollback(self, members_dir, test_table_info, test_records):
+        """Test that nothing is written if the transaction raises an exception"""
+        with pytest.raises(RuntimeError):
+            with Transaction() as transaction:
+                transaction.add_records(test_records, test_table_info)
+                raise RuntimeError("Abandon the transaction")
+        assert load_records_from_file(test_table_info).empty
+
+    def test_transaction_duplicates(self, members_dir, test_table_info, test_records):
+        """Test that staged records are checked for duplicate indices"""
+        transaction = Transaction()
+        transaction.add_records(test_records, test_table_info)
+        with pytest.raises(ValueError):
+            transaction.add_records(test_records, test_table_info)
+
+    def test_transaction_write_error(
+        self, members_dir, test_table_info, test_records, mocker
+    ):
+        """Test that a failed commit writes nothing, and keeps the changes staged"""
+        transaction = Transaction()
+        transaction.add_records(_member_records([100000000], [False]), MEMBER_INFO)
+        transaction.add_records(test_records, test_table_info)
+        mocker.patch(
+            "pyarrow.parquet.write_table",
+            side_effect=[None, pa.ArrowIOError("Disk full")],
+        )
+        with pytest.raises(pa.ArrowIOError):
+            transaction.commit()
+        assert os.listdir(members_dir) == []
+
+        mocker.stopall()
+        transaction.commit()
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1, 2]
+
+    def test_recover_transactions(self, members_dir, test_table_info, test_records):
+        """Test finishing a commit that was interrupted after its journal was written"""
+        staged_path = os.path.join(members_dir, "test.pkt.staged")
+        test_records.to_parquet(staged_path, schema=test_table_info.schema)
+        with open(os.path.join(members_dir, "transaction.journal"), "w") as journal:
+            json.dump({"tables": ["test"]}, journal)
+
+        assert recover_transactions()
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1, 2]
+        assert os.listdir(members_dir) == ["test.pkt"]
+        assert not recover_transactions()
+
+    def test_recover_transactions_uncommitted(self, members_dir, test_records):
+        """Test that files staged by a transaction that never committed are removed"""
+        test_records.to_parquet(os.path.join(members_dir, "test.pkt.staged"))
+        assert not recover_transactions()
+        assert os.listdir(members_dir) == []
+
+
+@pytest.fixture()
+def log_table_info() -> TableInfo:
+    """Fixture of a TableInfo object whose added records go to a write-ahead log."""
+    return TableInfo(
+        name="test",
+        schema=pa.schema([("ID", pa.int64()), ("value", pa.float64())]),
+        numeric_limits={"value": range(0, 4)},
+        unique_index=False,
+        write_ahead_log=True,
+    )
+
+
+class TestWriteAheadLog:
+    """Validate logging, reading and folding records of tables with a write-ahead log."""
+
+    def test_write_ahead_log_merged_on_read(
+        self, members_dir, log_table_info, test_records, test_records_additional
+    ):
+        """Test that logged records are read after those in the Parquet file"""
+        _overwrite_records_to_file_(test_records, log_table_info)
+        add_records_to_file(test_records_additional, log_table_info)
+        add_records_to_file(test_records_additional, log_table_info)
+
+        assert sorted(os.listdir(members_dir)) == ["test.idx", "test.pkt", "test.wal"]
+        records = load_records_from_file(log_table_info)
+        assert records["ID"].tolist() == [1, 2, 3, 3]
+        assert load_records_from_file(log_table_info, gt_cols={"ID": 2})[
+            "value"
+        ].tolist() == [3.0, 3.0]
+        assert contains_key(log_table_info, 3)
+        assert load_record_by_key(log_table_info, 3)["value"] == 3.0
+        assert _find_key_positions_(log_table_info, 3) == [2, 3]
+
+    def test_write_ahead_log_only(self, members_dir, log_table_info, test_records):
+        """Test reading a table whose records are all in its write-ahead log"""
+        add_records_to_file(test_records, log_table_info)
+        assert os.listdir(members_dir) == ["test.wal"]
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2]
+
+    def test_write_ahead_log_date64(self, members_dir):
+        """Test reading logged date64 records after ones read back from Parquet as date32"""
+        table_info = TableInfo(
+            name="test",
+            schema=pa.schema([("ID", pa.int64()), ("entered", pa.date64())]),
+            write_ahead_log=True,
+        )
+        _overwrite_records_to_file_(
+            pd.DataFrame({"ID": [1], "entered": [date(2024, 1, 1)]}), table_info
+        )
+        add_records_to_file(
+            pd.DataFrame({"ID": [2], "entered": [date(2024, 1, 2)]}), table_info
+        )
+        records = load_records_from_file(table_info)
+        assert records["entered"].tolist() == [date(2024, 1, 1), date(2024, 1, 2)]
+
+    def test_fold_write_ahead_log(
+        self, members_dir, log_table_info, test_records, test_records_additional
+    ):
+        """Test that folding moves logged records to a Parquet fragment, exactly once"""
+        _overwrite_records_to_file_(test_records, log_table_info)
+        add_records_to_file(test_records_additional, log_table_info)
+        folding_path = _write_ahead_log_("test").detach()
+        shutil.copy(folding_path, members_dir / "backup")
+
+        _write_records._fold_write_ahead_log_(log_table_info)
+        assert not os.path.exists(folding_path)
+        assert len(_list_append_fragments_("test")) == 1
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2, 3]
+
+        # The process died after writing the fragment, but before removing the log
+        os.replace(members_dir / "backup", folding_path)
+        _write_records._fold_write_ahead_log_(log_table_info)
+        assert len(_list_append_fragments_("test")) == 1
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2, 3]
+
+    def test_fold_write_ahead_log_in_background(
+        self, members_dir, log_table_info, test_records, monkeypatch
+    ):
+        """Test that a log is folded in the background once it's large enough"""
+        monkeypatch.setattr(_write_records, "_WAL_FOLD_BYTES_", 0)
+        add_records_to_file(test_records, log_table_info)
+        _write_records._fold_threads["test"].join()
+        assert _list_write_ahead_logs_("test") == []
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2]
+
+    def test_write_ahead_log_torn_tail(
+        self, members_dir, log_table_info, test_records, test_records_additional
+    ):
+        """Test that a partly written commit is ignored, and dropped on the next append"""
+        add_records_to_file(test_records, log_table_info)
+        _write_ahead_log_("test").detach()
+        _write_records._fold_write_ahead_log_(log_table_info)
+        add_records_to_file(test_records_additional, log_table_info)
+        wal_path = members_dir / "test.wal"
+        complete_size = os.path.getsize(wal_path)
+        with open(wal_path, "ab") as log_file:
+            log_file.write(b"\x10\x00\x00\x00partial")
+        _write_ahead_log_("test").detach()
+        os.replace(_list_write_ahead_logs_("test")[0], wal_path)
+
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2, 3]
+        add_records_to_file(test_records_additional, log_table_info)
+        assert os.path.getsize(wal_path) == 2 * complete_size
+        assert load_records_from_file(log_table_info)["ID"].tolist() == [1, 2, 3, 3]
+
+    def test_write_ahead_log_group_commit(
+        self, members_dir, log_table_info, test_records, mocker
+    ):
+        """Test that concurrent commits share fsyncs"""
+        fsync = mocker.patch("os.fsync", side_effect=lambda _: time.sleep(0.05))
+        threads = [
+            threading.Thread(
+                target=add_records_to_file, args=(test_records, log_table_info)
+            )
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(load_records_from_file(log_table_info)) == 16
+        assert fsync.call_count < len(threads)
+
+    def test_compaction_keeps_concurrent_appends(
+        self, members_dir, log_table_info, monkeypatch
+    ):
+        """Test that no logged record is lost while folds, compactions & updates run"""
+        monkeypatch.setattr(_write_records, "_MAX_APPEND_FRAGMENTS_", 1)
+        add_records_to_file(pd.DataFrame({"ID": [0], "value": [1.0]}), log_table_info)
+        added = [0]
+        stop = threading.Event()
+
+        def append():
+            while not stop.is_set():
+                record = pd.DataFrame({"ID": [len(added)], "value": [1.0]})
+                add_records_to_file(record, log_table_info)
+                added.append(len(added))
+
+        thread = threading.Thread(target=append)
+        thread.start()
+        try:
+            for _ in range(20):
+                _write_records._fold_write_ahead_log_(log_table_info)
+                update_record(0, log_table_info, value=2.0)
+        finally:
+            stop.set()
+            thread.join()
+        records = load_records_from_file(log_table_info)
+        assert sorted(records["ID"].tolist()) == added
+        assert records["value"].tolist()[0] == 2.0
+
+
+@pytest.fixture()
+def partitioned_table_info() -> TableInfo:
+    """Fixture of a TableInfo object whose records are partitioned by month."""
+    return TableInfo(
+        name="test",
+        schema=pa.schema(
+            [("ID", pa.int64()), ("day", pa.date32()), ("value", pa.float64())]
+        ),
+        partition_col="day",
+    )
+
+
+@pytest.fixture()
+def partitioned_records() -> pd.DataFrame:
+    """Fixture of records in the January & February 2024 partitions."""
+    return pd.DataFrame(
+        {
+            "ID": [1, 2, 3],
+            "day": [date(2024, 1, 31), date(2024, 2, 1), date(2024, 1, 5)],
+            "value": [1.1, 2.2, 3.3],
+        }
+    )
+
+
+class TestPartitionedTables:
+    """Validate storing, reading and rewriting date-partitioned tables."""
+
+    def test_partitioned_add_and_load(
+        self, members_dir, partitioned_table_info, partitioned_records
+    ):
+        """Test that records are stored in their month's partition, and read in order"""
+        add_records_to_file(partitioned_records, partitioned_table_info)
+        assert sorted(os.listdir(members_dir / "test" / "year=2024")) == [
+            "month=01",
+            "month=02",
+        ]
+        assert load_records_from_file(partitioned_table_info)["ID"].tolist() == [
+            1,
+            3,
+            2,
+        ]
+        assert load_record_by_key(partitioned_table_info, 2)["value"] == 2.2
+        with pytest.raises(ValueError):
+            add_records_to_file(partitioned_records, partitioned_table_info)
+
+    def test_partitioned_load_skips_partitions(
+        self, members_dir, partitioned_table_info, partitioned_records
+    ):
+        """Test that loads filtered on the partition column only open matching partitions"""
+        _overwrite_records_to_file_(partitioned_records, partitioned_table_info)
+        january = members_dir / "test" / "year=2024" / "month=01" / "part.pkt"
+        january.write_bytes(b"corrupted")
+
+        records = load_records_from_file(
+            partitioned_table_info, eq_cols={"day": date(2024, 2, 1)}
+        )
+        assert records["ID"].tolist() == [2]
+        with pytest.raises(pa.ArrowInvalid):
+            load_records_from_file(partitioned_table_info)
+
+    def test_partitioned_by_week(self, members_dir, partitioned_records):
+        """Test that tables can be partitioned by ISO week"""
+        table_info = TableInfo(
+            name="test",
+            schema=pa.schema(
+                [("ID", pa.int64()), ("day", pa.date32()), ("value", pa.float64())]
+            ),
+            partition_col="day",
+            partition_period="week",
+        )
+        add_records_to_file(partitioned_records, table_info)
+        assert sorted(os.listdir(members_dir / "test" / "year=2024")) == [
+            "week=01",
+            "week=05",
+        ]
+        records = load_records_from_file(table_info, lt_cols={"day": date(2024, 1, 7)})
+        assert records["ID"].tolist() == [3]
+
+    def test_partitioned_update_only_rewrites_partition(
+        self, members_dir, partitioned_table_info, partitioned_records
+    ):
+        """Test that updating a record leaves the other partitions' files untouched"""
+        _overwrite_records_to_file_(partitioned_records, partitioned_table_info)
+        january = members_dir / "test" / "year=2024" / "month=01" / "part.pkt"
+        january_mtime = os.stat(january).st_mtime_ns
+
+        update_record(2, partitioned_table_info, value=4.4)
+        assert os.stat(january).st_mtime_ns == january_mtime
+        records = load_records_from_file(partitioned_table_info)
+        assert records["value"].tolist() == [1.1, 3.3, 4.4]
+
+        update_record(2, partitioned_table_info, day=date(2024, 1, 2))
+        assert os.listdir(members_dir / "test" / "year=2024") == ["month=01"]
+        records = load_records_from_file(partitioned_table_info)
+        assert records["ID"].tolist() == [1, 3, 2]
+
+    def test_partitioned_transaction(
+        self, members_dir, partitioned_table_info, partitioned_records
+    ):
+        """Test that a transaction only replaces the partitions it changes"""
+        _overwrite_records_to_file_(partitioned_records, partitioned_table_info)
+        february = members_dir / "test" / "year=2024" / "month=02" / "part.pkt"
+        february_mtime = os.stat(february).st_mtime_ns
+
+        with Transaction() as transaction:
+            transaction.remove_records([3], partitioned_table_info)
+        assert os.stat(february).st_mtime_ns == february_mtime
+        records = load_records_from_file(partitioned_table_info)
+        assert records["ID"].tolist() == [1, 2]
+
+    def test_partitioned_transaction_fsyncs(
+        self, members_dir, partitioned_table_info, partitioned_records, mocker
+    ):
+        """Test that each directory of a commit is flushed once, including on recovery"""
+        _overwrite_records_to_file_(partitioned_records, partitioned_table_info)
+        fsync_dir = mocker.spy(transactions, "_fsync_dir")
+        fsync = mocker.spy(os, "fsync")
+        with Transaction() as transaction:
+            transaction.update_record(1, partitioned_table_info, value=0.5)
+            transaction.update_record(2, partitioned_table_info, value=0.5)
+        partitions = [
+            str(members_dir / "test" / "year=2024" / month)
+            for month in ["month=01", "month=02"]
+        ]
+        storage = str(members_dir)
+        fsynced_dirs = [call.args[0] for call in fsync_dir.call_args_list]
+        # The staged files' directories, the journal's, then every directory renamed into
+        assert fsynced_dirs == partitions + [storage] + [storage] + partitions
+        # Each staged file and the journal are flushed once
+        assert fsync.call_count == len(partitions) + 1 + len(fsynced_dirs)
+        records = load_records_from_file(partitioned_table_info)
+        assert records["value"].tolist() == [0.5, 3.3, 0.5]
+
+    def test_migrate_partitioned_tables(self, members_dir):
+        """Test splitting a service log stored in one file into its partitions"""
+        service_log = pd.DataFrame(
+            {
+                "entry_datetime_utc": [datetime(2024, 2, 1), datetime(2024, 3, 1)],
+                "service_date_utc": [date(2024, 1, 30), date(2024, 2, 28)],
+                "provider_id": [100000000, 100000000],
+                "member_id": [200000000, 200000000],
+                "service_id": [100001, 100001],
+                "comments": ["first", None],
+            }
+        )
+        service_log.to_parquet(members_dir / "service_log.pkt")
+
+        assert migrate_partitioned_tables()
+        assert not migrate_partitioned_tables()
+        assert os.listdir(members_dir) == ["service_log"]
+        migrated = load_records_from_file(SERVICE_LOG_INFO)
+        assert migrated["comments"].tolist() == ["first", None]
+        february = load_records_from_file(
+            SERVICE_LOG_INFO, gt_cols={"service_date_utc": date(2024, 2, 1)}
+        )
+        assert february["service_date_utc"].tolist() == [date(2024, 2, 28)]
+
+
+@pytest.fixture()
+def sorted_table_info() -> TableInfo:
+    """Fixture of a TableInfo object whose files are sorted, compressed and indexed."""
+    return TableInfo(
+        name="test",
+        schema=pa.schema(
+            [("ID", pa.int64()), ("day", pa.date32()), ("value", pa.float64())]
+        ),
+        parquet_options=ParquetOptions(
+            sort_keys=("day", "ID"),
+            row_group_size=2,
+            compression="zstd",
+            compression_level=3,
+            dictionary_cols=("day",),
+            page_index=True,
+            bloom_filter_cols=("ID",),
+        ),
+    )
+
+
+class TestParquetOptions:
+    """Validate that Parquet files are laid out by their table's options."""
+
+    def test_parquet_options_layout(
+        self, members_dir, sorted_table_info, partitioned_records
+    ):
+        """Test that files are sorted, split into row groups, compressed and indexed"""
+        _overwrite_records_to_file_(partitioned_records, sorted_table_info)
+        metadata = pq.ParquetFile(members_dir / "test.pkt").metadata
+        assert metadata.num_row_groups == 2
+        row_group = metadata.row_group(0)
+        assert [col.column_index for col in row_group.sorting_columns] == [1, 0]
+        assert row_group.column(0).compression == "ZSTD"
+        assert row_group.column(0).has_column_index
+        assert not row_group.column(0).has_dictionary_page
+        assert row_group.column(1).has_dictionary_page
+        if _write_records._BLOOM_FILTERS_SUPPORTED:
+            assert row_group.column(0).bloom_filter_length > 0
+            assert row_group.column(2).bloom_filter_length is None
+
+        assert load_records_from_file(sorted_table_info)["ID"].tolist() == [3, 1, 2]
+        assert load_record_by_key(sorted_table_info, 1)["value"] == 1.1
+        records = load_records_from_file(
+            sorted_table_info, gt_cols={"day": date(2024, 1, 31)}
+        )
+        assert records["ID"].tolist() == [2]
+
+    def test_parquet_options_appends(
+        self, members_dir, sorted_table_info, partitioned_records, monkeypatch
+    ):
+        """Test that append fragments & compacted files are laid out like the file"""
+        monkeypatch.setattr(_write_records, "_MAX_APPEND_FRAGMENTS_", 2)
+        add_records_to_file(partitioned_records.iloc[:2], sorted_table_info)
+        fragment = _list_append_fragments_(sorted_table_info.name)[0]
+        assert pq.ParquetFile(fragment).metadata.row_group(0).sorting_columns
+        add_records_to_file(partitioned_records.iloc[2:], sorted_table_info)
+        assert _list_append_fragments_(sorted_table_info.name) == []
+        assert load_records_from_file(sorted_table_info)["ID"].tolist() == [3, 1, 2]
+        assert load_record_by_key(sorted_table_info, 3)["value"] == 3.3
+
+    def test_parquet_options_transaction(
+        self, members_dir, sorted_table_info, partitioned_records
+    ):
+        """Test that files committed by a transaction are laid out by their options"""
+        with Transaction() as transaction:
+            transaction.add_records(partitioned_records, sorted_table_info)
+        metadata = pq.ParquetFile(members_dir / "test.pkt").metadata
+        assert metadata.row_group(0).column(0).compression == "ZSTD"
+        assert load_records_from_file(sorted_table_info)["ID"].tolist() == [3, 1, 2]
+        assert load_record_by_key(sorted_table_info, 2)["value"] == 2.2
+
+    def test_service_log_sorted(self, members_dir):
+        """Test that the service log's partitions are sorted by service date & provider"""
+        service_log = pd.DataFrame(
+            {
+                "entry_datetime_utc": [datetime(2024, 2, d) for d in (1, 2, 3)],
+                "service_date_utc": [date(2024, 1, day) for day in (30, 2, 2)],
+                "provider_id": [100000000, 100000002, 100000001],
+                "member_id": [200000000, 200000000, 200000000],
+                "service_id": [100001, 100001, 100001],
+                "comments": ["first", "second", "third"],
+            }
+        )
+        _overwrite_records_to_file_(service_log, SERVICE_LOG_INFO)
+        assert load_records_from_file(SERVICE_LOG_INFO)["comments"].tolist() == [
+            "third",
+            "second",
+            "first",
+        ]
+
+    def test_parquet_options_partitions_unchanged(
+        self, members_dir, sorted_table_info, partitioned_records
+    ):
+        """Test that sorted partitions whose records don't change aren't rewritten"""
+        table_info = replace(sorted_table_info, partition_col="day")
+        _overwrite_records_to_file_(partitioned_records, table_info)
+        january = members_dir / "test" / "year=2024" / "month=01" / "part.pkt"
+        january_mtime = os.stat(january).st_mtime_ns
+        _overwrite_records_to_file_(partitioned_records, table_info)
+        assert os.stat(january).st_mtime_ns == january_mtime
+
+
+@pytest.fixture(params=["sqlite", "duckdb"])
+def storage_engine(request, members_dir):
+    """Each storage engine, holding a database in an empty storage directory."""
+    if request.param == "duckdb":
+        pytest.importorskip("duckdb")
+        engine = DuckDBEngine(str(members_dir / "choc_an.duckdb"))
+    else:
+        engine = SQLiteEngine(str(members_dir / "choc_an.sqlite"))
+    set_storage_engine(engine)
+    yield engine
+    set_storage_engine("parquet")
+    engine.close()
+
+
+class TestStorageEngines:
+    """Validate keeping the database in a storage engine instead of Parquet files."""
+
+    def test_engine_add_and_load(
+        self, storage_engine, test_table_info, test_records, test_records_additional
+    ):
+        """Test that records are added to and loaded from the engine, in order"""
+        assert load_records_from_file(test_table_info).empty
+        add_records_to_file(test_records, test_table_info)
+        add_records_to_file(test_records_additional, test_table_info)
+        assert not os.path.exists(_convert_parquet_name_to_path_(test_table_info.name))
+        records = load_records_from_file(test_table_info)
+        assert records["ID"].tolist() == [1, 2, 3]
+        assert records["value"].tolist() == [1.1, 2.2, 3.0]
+        with pytest.raises(ValueError):
+            add_records_to_file(test_records, test_table_info)
+
+        filtered = load_records_from_file(
+            test_table_info, gt_cols={"value": 1.5}, columns=["ID"]
+        )
+        assert filtered.to_dict("list") == {"ID": [2, 3]}
+
+    def test_engine_reads_in_sql(self, storage_engine, test_table_info, test_records):
+        """Test that filters and columns are run by the engine, not after reading the table"""
+        add_records_to_file(test_records, test_table_info)
+        table = storage_engine.read_table(test_table_info, ["value"], [("ID", ">", 1)])
+        assert table.to_pydict() == {"value": [2.2]}
+        with pytest.raises(KeyError):
+            storage_engine.read_table(test_table_info, ["missing"])
+        with pytest.raises(KeyError):
+            storage_engine.read_table(test_table_info, None, [("missing", "==", 1)])
+
+        if isinstance(storage_engine, SQLiteEngine):
+            statements = []
+            storage_engine._connection.set_trace_callback(statements.append)
+            load_records_from_file(
+                test_table_info, lt_cols={"value": 1.5}, columns=["ID"]
+            )
+            storage_engine._connection.set_trace_callback(None)
+            assert any(
+                'SELECT "ID" FROM' in sql and 'WHERE "value" < 1.5' in sql
+                for sql in statements
+            )
+
+    def test_engine_data_version(self, storage_engine, test_table_info, test_records):
+        """Test that the data version changes when another connection writes the database"""
+        add_records_to_file(test_records, test_table_info)
+        version = storage_engine.data_version(test_table_info)
+        assert storage_engine.data_version(test_table_info) == version
+        other = type(storage_engine)(storage_engine.path)
+        try:
+            other.remove_records(test_table_info, [1])
+        finally:
+            other.close()
+        assert storage_engine.data_version(test_table_info) != version
+
+    def test_engine_is_abstract(self):
+        """Test that engines must implement every method of the interface"""
+        with pytest.raises(TypeError):
+            StorageEngine()
+
+    def test_engine_keys(self, storage_engine, test_table_info, test_records):
+        """Test looking up keys and records by key in the engine"""
+        add_records_to_file(test_records, test_table_info)
+        assert contains_keys(test_table_info, [2, 99, 1]).tolist() == [
+            True,
+            False,
+            True,
+        ]
+        assert contains_key(test_table_info, 1)
+        assert not contains_key(test_table_info, "not a key")
+        assert load_record_by_key(test_table_info, 2)["value"] == 2.2
+        assert load_record_by_key(test_table_info, 99) is None
+
+    def test_engine_edits(self, storage_engine, test_table_info, test_records):
+        """Test updating and removing records in the engine"""
+        add_records_to_file(test_records, test_table_info)
+        version = table_version(test_table_info)
+        assert update_record(2, test_table_info, value=0.5)["value"] == 0.5
+        assert table_version(test_table_info) != version
+        with pytest.raises(IndexError):
+            update_record(99, test_table_info, value=0.5)
+        with pytest.raises(ValueError):
+            update_record(2, test_table_info, ID=1)
+        assert update_records({1: {"value": 0.25}}, test_table_info) == {1: True}
+        assert load_records_from_file(test_table_info)["value"].tolist() == [0.25, 0.5]
+
+        assert remove_records([1, 99], test_table_info) == {1: True, 99: False}
+        assert not remove_record(1, test_table_info)
+        assert remove_record(2, test_table_info)
+        assert load_records_from_file(test_table_info).empty
+
+    def test_engine_transaction(self, storage_engine, test_table_info, test_records):
+        """Test that a transaction's tables are written to the engine together"""
+        with Transaction() as transaction:
+            transaction.add_records(test_records, test_table_info)
+            transaction.add_records(_member_records([100000000], [True]), MEMBER_INFO)
+        assert load_records_from_file(test_table_info)["ID"].tolist() == [1, 2]
+        assert lookup_member_eligibility(100000000) is False
+
+        add_records_to_file(_member_records([200000000], [False]), MEMBER_INFO)
+        assert lookup_members_eligibility(
+            pd.Series([200000000, 100000000, 300000000])
+        ).tolist() == [True, False, pd.NA]
+        assert not migrate_partitioned_tables()
+
 
 def test_convert_name_to_path():
     """Test of the _convert_name_to_path_ function"""
@@ -1,4 +1,5 @@
 """Tests of functions in the login module."""
+import asyncio
 from unittest.mock import patch
 
 import pandas as pd
@@ -6,7 +7,10 @@ import pyarrow as pa
 import pytest
 from pyarrow import ArrowIOError
 
+from choc_an_simulator import login
 from choc_an_simulator.login import (
+    authenticate_user,
+    authenticate_user_async,
     generate_secure_password,
     login_menu,
     secure_password_verification,
@@ -16,6 +20,14 @@ from choc_an_simulator.login import (
 CAS_LOG_PATH = "choc_an_simulator.login"
 
 
+@pytest.fixture(autouse=True)
+def clear_user_credentials():
+    """Forget users' credentials loaded by other tests."""
+    login._USER_CREDENTIALS.clear()
+    yield
+    login._USER_CREDENTIALS.clear()
+
+
 def mocked_user_and_hashed_pass(*args, **kwargs):
     """Fixture for user_id and hashed password."""
     df = pd.DataFrame(
@@ -47,7 +59,11 @@ def mocked_user_and_hashed_pass(*args, **kwargs):
         }
     )
 
-    return df[df["id"] == kwargs["eq_cols"]["id"]]
+    if "eq_cols" in kwargs:
+        df = df[df["id"] == kwargs["eq_cols"]["id"]]
+    if kwargs.get("columns") is not None:
+        df = df[kwargs["columns"]]
+    return df
 
 
 @pytest.mark.parametrize(
@@ -65,8 +81,7 @@ def test_login_menu_correct_password(user_type, endpoint_func_name, mocker):
         f"{CAS_LOG_PATH}.generate_secure_password",
         return_value=("hashedpassword123"),
     )
-    mocker.patch(f"{CAS_LOG_PATH}.secure_password_verification", return_value=True)
-    mocker.patch(f"{CAS_LOG_PATH}.user_type_authorization", return_value=user_type)
+    mocker.patch(f"{CAS_LOG_PATH}.authenticate_user", return_value=(True, user_type))
 
     expected = mocker.patch(f"{endpoint_func_name}")
 
@@ -84,8 +99,7 @@ def test_login_menu_correct_password_unknown_user_type(mocker, capsys):
         f"{CAS_LOG_PATH}.generate_secure_password",
         return_value=("hashedpassword123"),
     )
-    mocker.patch(f"{CAS_LOG_PATH}.secure_password_verification", return_value=True)
-    mocker.patch(f"{CAS_LOG_PATH}.user_type_authorization", return_value=5)
+    mocker.patch(f"{CAS_LOG_PATH}.authenticate_user", return_value=(True, 5))
 
     login_menu()
 
@@ -101,8 +115,7 @@ def test_login_menu_incorrect_password(mocker, capsys):
         f"{CAS_LOG_PATH}.generate_secure_password",
         return_value=("hashedpassword123"),
     )
-    mocker.patch(f"{CAS_LOG_PATH}.secure_password_verification", return_value=False)
-    mocker.patch(f"{CAS_LOG_PATH}.user_type_authorization", return_value=0)
+    mocker.patch(f"{CAS_LOG_PATH}.authenticate_user", return_value=(False, None))
 
     # KeyboardInterrupt after first attempt
     mocker.patch(
@@ -188,6 +201,72 @@ def test_user_type_authorization(mock_load_records_from_file, user_id, expected_
 def test_user_type_authorization_db_error(mock_load_records_from_file, capsys):
     """Verify db error is printed to console."""
     expected = "\033[93mThere was an issue accessing the database.\n\tError: \x1b[0m\n"
-    user_type_authorization(user_id=123456789)
+    assert user_type_authorization(user_id=123456789) is None
     captured = capsys.readouterr()
     assert captured.out == expected
+
+
+@patch(
+    "choc_an_simulator.login.load_records_from_file",
+    side_effect=mocked_user_and_hashed_pass,
+)
+def test_user_type_authorization_no_user(mock_load_records_from_file):
+    """Verify that a user who doesn't exist has no user type."""
+    assert user_type_authorization(user_id=123456789) is None
+
+
+@pytest.mark.parametrize(
+    "user_id, password, expected",
+    [
+        (940672921, "password1", (True, 0)),
+        (265608022, "Th1s1sTh3m0stS3cur3!", (True, 1)),
+        (940672921, "wrong password", (False, None)),
+        (123456789, "password1", (False, None)),
+    ],
+)
+@patch(
+    "choc_an_simulator.login.load_records_from_file",
+    side_effect=mocked_user_and_hashed_pass,
+)
+def test_authenticate_user(mock_load_records_from_file, user_id, password, expected):
+    """Verify that authenticating returns the verification result and the user type."""
+    assert authenticate_user(user_id, password) == expected
+
+
+@patch(
+    "choc_an_simulator.login.load_records_from_file",
+    side_effect=mocked_user_and_hashed_pass,
+)
+def test_authenticate_user_loads_users_once(mock_load_records_from_file, mocker):
+    """Verify that users are only reloaded when the providers file changes."""
+    mocker.patch(f"{CAS_LOG_PATH}.table_version", return_value=1)
+    authenticate_user(940672921, "password1")
+    authenticate_user(265608022, "Th1s1sTh3m0stS3cur3!")
+    assert mock_load_records_from_file.call_count == 1
+
+    mocker.patch(f"{CAS_LOG_PATH}.table_version", return_value=2)
+    authenticate_user(940672921, "password1")
+    assert mock_load_records_from_file.call_count == 2
+
+
+@patch(
+    "choc_an_simulator.login.load_records_from_file",
+    side_effect=mocked_user_and_hashed_pass,
+)
+def test_authenticate_user_async(mock_load_records_from_file, mocker):
+    """Verify that passwords checked by a pool return the verification result and user type."""
+    pool = mocker.Mock()
+    pool.verify = mocker.AsyncMock(side_effect=[True, False])
+    assert asyncio.run(authenticate_user_async(940672921, "password1", pool)) == (
+        True,
+        0,
+    )
+    assert asyncio.run(authenticate_user_async(940672921, "wrong", pool)) == (
+        False,
+        None,
+    )
+    assert asyncio.run(authenticate_user_async(123456789, "password1", pool)) == (
+        False,
+        None,
+    )
+    assert pool.verify.call_count == 2
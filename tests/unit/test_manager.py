@@ -87,6 +87,7 @@ def test_prompt_provider_directory_options(
         ("Member", f"{CAS_MGR_PATH}.generate_member_report"),
         ("Provider", f"{CAS_MGR_PATH}.generate_provider_report"),
         ("Summary", f"{CAS_MGR_PATH}.generate_summary_report"),
+        ("All Weekly", f"{CAS_MGR_PATH}.generate_weekly_reports"),
     ],
 )
 @pytest.mark.usefixtures("assert_menu_endpoint")
@@ -581,6 +582,18 @@ class TestAddProviderDirectoryRecord:
             in capsys.readouterr().out
         )
 
+    def test_add_provider_directory_record_price(self, mocker, capsys):
+        """Test that the price is prompted for in dollars and cents, and saved in cents."""
+        mocker.patch(
+            "choc_an_simulator.manager.generate_unique_id", return_value=100001
+        )
+        mocker.patch("choc_an_simulator.manager.prompt_str", return_value="S")
+        mocker.patch("choc_an_simulator.manager.prompt_int", side_effect=[12, 5])
+        mock_add = mocker.patch("choc_an_simulator.manager.add_records_to_file")
+        add_provider_directory_record()
+        assert mock_add.call_args[0][0]["price"].tolist() == [1205]
+        assert "Service #100001 Added." in capsys.readouterr().out
+
 
 # class TestUpdateProviderDirectoryRecord:
 def test_update_provider_directory_load_io_error(mocker, capsys) -> None:
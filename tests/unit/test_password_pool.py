@@ -0,0 +1,70 @@
+"""Tests of functions in the password_pool module."""
+import asyncio
+
+import bcrypt
+import pytest
+
+from choc_an_simulator import password_pool
+from choc_an_simulator.password_pool import (
+    PasswordPool,
+    bcrypt_rounds,
+    check_password,
+    hash_password,
+    set_bcrypt_rounds,
+)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """Pool of two worker processes, hashing with the lowest cost factor."""
+    with PasswordPool(max_workers=2, rounds=4) as pool:
+        yield pool
+
+
+def test_hash_password_rounds():
+    """Verify that password hashes use the given cost factor, and can be checked."""
+    password_hash, salt = hash_password(b"password1", rounds=5)
+    assert password_hash.startswith(b"$2b$05$")
+    assert password_hash.startswith(salt)
+    assert check_password(b"password1", password_hash)
+    assert not check_password(b"password2", password_hash)
+
+
+def test_set_bcrypt_rounds(monkeypatch):
+    """Verify that the configured cost factor is used by default."""
+    monkeypatch.setattr(password_pool, "_bcrypt_rounds", bcrypt_rounds())
+    set_bcrypt_rounds(4)
+    assert bcrypt_rounds() == 4
+    assert hash_password(b"password1")[0].startswith(b"$2b$04$")
+
+
+@pytest.mark.parametrize("rounds", [3, 32])
+def test_set_bcrypt_rounds_out_of_range(rounds):
+    """Verify that cost factors bcrypt doesn't accept are rejected."""
+    with pytest.raises(ValueError):
+        set_bcrypt_rounds(rounds)
+    with pytest.raises(ValueError):
+        PasswordPool(rounds=rounds)
+
+
+def test_verify_many(pool):
+    """Verify that a batch of passwords is checked in order."""
+    password_hash = bcrypt.hashpw(b"password1", bcrypt.gensalt(rounds=4))
+    credentials = [(b"password1", password_hash), (b"wrong", password_hash)] * 3
+    assert pool.verify_many(credentials) == [True, False] * 3
+    assert pool.verify_many([]) == []
+
+
+def test_async_hash_and_verify(pool):
+    """Verify that passwords can be hashed and checked concurrently from asyncio."""
+
+    async def hash_and_verify():
+        password_hash, _ = await pool.hash_password(b"password1")
+        return password_hash, await asyncio.gather(
+            pool.verify(b"password1", password_hash),
+            pool.verify(b"wrong", password_hash),
+        )
+
+    password_hash, results = asyncio.run(hash_and_verify())
+    assert password_hash.startswith(b"$2b$04$")
+    assert results == [True, False]
@@ -14,9 +14,7 @@ from choc_an_simulator.provider import (
 )
 from definitions import PROVIDER_DIR_CSV
 from choc_an_simulator.provider import (
-    SERVICE_LOG_INFO,
     PROVIDER_DIRECTORY_INFO,
-    MEMBER_INFO,
     USER_INFO,
 )
 from pyarrow import ArrowIOError
@@ -41,51 +39,24 @@ def test_show_provider_menu(
 
 
 @pytest.mark.parametrize(
-    "member_info,member_id,expected_out",
+    "eligible,expected_out",
     [
         # Valid Member
-        (
-            DataFrame(
-                {
-                    "member_id": [123456789],
-                    "name": ["Name"],
-                    "address": ["Street"],
-                    "city": ["Portland"],
-                    "state": ["OR"],
-                    "zipcode": [97211],
-                    "suspended": [False],
-                }
-            ),
-            123456789,
-            "\033[92mValid\033[0m\n",
-        ),
+        (True, "\033[92mValid\033[0m\n"),
         # Suspended Member
-        (
-            DataFrame(
-                {
-                    "member_id": [123456789],
-                    "name": ["Name"],
-                    "address": ["Street"],
-                    "city": ["Portland"],
-                    "state": ["OR"],
-                    "zipcode": [97211],
-                    "suspended": [True],
-                }
-            ),
-            123456789,
-            "\033[93mSuspended\033[0m\n",
-        ),
+        (False, "\033[93mSuspended\033[0m\n"),
         # Invalid Member
-        (DataFrame(), 123456789, "\033[91mInvalid\033[0m\n"),
+        (None, "\033[91mInvalid\033[0m\n"),
     ],
 )
-def test_check_in_member(member_info, member_id, expected_out, capsys, mocker):
+def test_check_in_member(eligible, expected_out, capsys, mocker):
     """Tests the check_in_member function."""
-    mocker.patch("choc_an_simulator.provider.prompt_int", return_value=member_id)
-    mocker.patch(
-        "choc_an_simulator.provider.load_records_from_file", return_value=member_info
+    mocker.patch("choc_an_simulator.provider.prompt_int", return_value=123456789)
+    lookup = mocker.patch(
+        "choc_an_simulator.provider.lookup_member_eligibility", return_value=eligible
     )
     check_in_member()
+    lookup.assert_called_once_with(123456789)
     captured_out, _ = capsys.readouterr()
     assert captured_out == expected_out
 
@@ -242,36 +213,28 @@ def test_record_service_billing(
         raise_error_at: Specifies at which point to simulate a data loading error.
         raise_add_records_error: Boolean indicating whether to simulate an error in data saving.
     """
-    # Predefined dataframes to return for successful data loading operations
-    dataframes_to_return = [
-        # Member information dataframe
-        pd.DataFrame({"member_id": [member_id]}),
-        # Provider information dataframe
-        pd.DataFrame({"id": [provider_id]}),
-        # Service information dataframe
-        pd.DataFrame(
-            {
-                "service_id": [555555],
-                "service_name": ["Test service"],
-                "price_dollars": [100],
-                "price_cents": [50],
-            }
-        ),
-    ]
 
-    # Simulate data loading errors based on the raise_error_at parameter
-    def dataframes_side_effect(*args, **kwargs):
-        if raise_error_at == "members" and args[0] == MEMBER_INFO:
+    # Keyed lookups, simulating data loading errors based on the raise_error_at parameter
+    def member_eligibility_side_effect(key):
+        if raise_error_at == "members":
             raise ArrowIOError("Failed to load member information from the file")
-        elif raise_error_at == "providers" and args[0] == USER_INFO:
+        return True if key == member_id else None
+
+    def contains_key_side_effect(table_info, key):
+        if raise_error_at == "providers" and table_info == USER_INFO:
             raise ArrowIOError("Failed to load user information from the file")
-        elif raise_error_at == "services" and args[0] == PROVIDER_DIRECTORY_INFO:
+        return key == provider_id
+
+    def load_record_side_effect(table_info, key):
+        if raise_error_at == "services" and table_info == PROVIDER_DIRECTORY_INFO:
             raise ArrowIOError(
                 "Failed to load provider directory information from the file"
             )
-        elif raise_error_at == "log" and args[0] == SERVICE_LOG_INFO:
-            raise ArrowIOError("Failed to add service log information to the file")
-        return dataframes_to_return.pop(0)
+        if key != 555555:
+            return None
+        return pd.Series(
+            {"service_id": 555555, "service_name": "Test service", "price": 10050}
+        )
 
     # Mock the add_records_to_file function to simulate errors in data saving if required
     if raise_add_records_error:
@@ -295,11 +258,21 @@ def test_record_service_billing(
         return_value=datetime.strptime("11-26-2023", "%m-%d-%Y"),
     )
     mocker.patch(
-        "choc_an_simulator.provider.load_records_from_file",
-        side_effect=dataframes_side_effect,
+        "choc_an_simulator.provider.lookup_member_eligibility",
+        side_effect=member_eligibility_side_effect,
+    )
+    mocker.patch(
+        "choc_an_simulator.provider.contains_key",
+        side_effect=contains_key_side_effect,
+    )
+    mocker.patch(
+        "choc_an_simulator.provider.load_record_by_key",
+        side_effect=load_record_side_effect,
     )
+    load_records = mocker.patch("choc_an_simulator.provider.load_records_from_file")
 
     record_service_billing_entry()
+    load_records.assert_not_called()
 
     # Capture the stdout and stderr
     captured = capsys.readouterr()
@@ -313,7 +286,13 @@ def test_request_provider_directory(mocker, capsys) -> None:
     """Verify correct file creation for request_provider_directory and output of filepath"""
     expected_save_path = PROVIDER_DIR_CSV
 
-    mock_df = DataFrame({"service_id": [0, 1], "service_name": ["name 0", "name 1"]})
+    mock_df = DataFrame(
+        {
+            "service_id": [0, 1],
+            "service_name": ["name 0", "name 1"],
+            "price": [150, 2000],
+        }
+    )
 
     mocker.patch(
         "choc_an_simulator.provider.load_records_from_file",
@@ -330,8 +309,9 @@ def test_request_provider_directory(mocker, capsys) -> None:
         os.path.sep, "/"
     ), f"file path not found in captured output: {captured.out}"
 
+    # Prices are saved as dollars & cents
     saved_df = read_csv(expected_save_path)
-    assert saved_df.equals(mock_df)
+    assert saved_df.equals(mock_df.assign(price=[1.50, 20.00]))
     os.remove(expected_save_path)
 
 
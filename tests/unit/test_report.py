@@ -8,10 +8,12 @@ from pyarrow import ArrowIOError
 import pytest
 from _pytest.fixtures import fixture
 
+from choc_an_simulator import report
 from choc_an_simulator.report import (
     generate_member_report,
     generate_provider_report,
     generate_summary_report,
+    generate_weekly_reports,
 )
 from choc_an_simulator.schemas import TableInfo
 
@@ -144,33 +146,38 @@ test_provider_directory_info = pd.DataFrame(
             "Service 5",
             "Service 6",
         ],
-        "price_cents": [33, 15, 99, 75, 50, 25],
-        "price_dollars": [100, 200, 300, 400, 500, 600],
+        "price": [10033, 20015, 30099, 40075, 50050, 60025],
     }
 )
 
 
-def load_records_from_file_side_effect(*args, **kwargs):
+def load_table_side_effect(*args, **kwargs):
     """
-    Side effect for the load_records_from_file function.
+    Side effect for the load_table function.
 
     Returns-
         test_user_info: If the table_info argument is "providers"
         test_member_info: If the table_info argument is "members"
         test_service_log_info: If the table_info argument is "service_log"
         test_provider_directory_info: If the table_info argument is "provider_directory"
+        Only the columns in the "columns" argument are returned, if it's given.
     """
     # Get the table_info argument
     table_info: TableInfo = args[0]
 
+    records = None
     if table_info.name == "service_log":
-        return test_service_log_info
+        records = test_service_log_info
     elif table_info.name == "members":
-        return test_member_info
+        records = test_member_info
     elif table_info.name == "providers":
-        return test_user_info
+        records = test_user_info
     elif table_info.name == "provider_directory":
-        return test_provider_directory_info
+        records = test_provider_directory_info
+
+    if kwargs.get("columns") is not None:
+        records = records[kwargs["columns"]]
+    return pa.Table.from_pandas(records, preserve_index=False)
 
 
 def save_report_side_effect(*args, **kwargs):
@@ -187,6 +194,17 @@ def save_report_side_effect(*args, **kwargs):
     return f"/path/to/report/{report_file_path}.csv"
 
 
+def save_reports_side_effect(reports, *args, **kwargs):
+    """
+    Side effect for the save_reports function.
+
+    Returns-
+        Saves each report in order with the mocked save_report, and returns the mocked file paths.
+
+    """
+    return (report.save_report(table, file_name) for table, file_name in reports)
+
+
 @fixture
 def expected_member_report_df():
     """Fixture for the expected report."""
@@ -225,12 +243,12 @@ def expected_summary_report_df():
                 "Zelda Hammersmith",
                 "Ray Donald",
             ],
-            "Total fee for the week": [300.48, 300.99, 901.25, 600.25],
+            "Total fee for the week": [30048, 30099, 90125, 60025],
             "Total number of consultations with members": [2.0, 1.0, 2.0, 1.0],
         }
     )
 
-    summary_df.loc["Total"] = [4.0, 2102.9700000000003, 6.0]
+    summary_df.loc["Total"] = [4.0, 210297, 6.0]
     return summary_df
 
 
@@ -245,12 +263,12 @@ def expected_summary_report_total_consults_over_999_df():
                 "Zelda Hammersmith",
                 "Ray Donald",
             ],
-            "Total fee for the week": [300.48, 300.99, 901.25, 600.25],
+            "Total fee for the week": [30048, 30099, 90125, 60025],
             "Total number of consultations with members": [999.0, 999.0, 999.0, 999.0],
         }
     )
 
-    summary_df.loc["Total"] = [4.0, 2102.9700000000003, 3996]
+    summary_df.loc["Total"] = [4.0, 210297, 3996]
     return summary_df
 
 
@@ -265,12 +283,12 @@ def expected_summary_report_total_fee_over_99999_99_df():
                 "Zelda Hammersmith",
                 "Ray Donald",
             ],
-            "Total fee for the week": [99999.99, 99999.99, 99999.99, 99999.99],
+            "Total fee for the week": [9999999, 9999999, 9999999, 9999999],
             "Total number of consultations with members": [2.0, 1.0, 2.0, 1.0],
         }
     )
 
-    summary_df.loc["Total"] = [4.0, 399999.96, 6.0]
+    summary_df.loc["Total"] = [4.0, 39999996, 6.0]
     return summary_df
 
 
@@ -347,12 +365,12 @@ def expected_provider_report_df():
             ],
             "Service Code": [889804, 951175, 495644, 427757, 805554, 708195],
             "Fee to be paid": [
-                100.33000,
-                200.15000,
-                300.99000,
-                500.50000,
-                400.75000,
-                600.25000,
+                10033,
+                20015,
+                30099,
+                50050,
+                40075,
+                60025,
             ],
             "Total number of consultations with members": [
                 2.0,
@@ -362,7 +380,7 @@ def expected_provider_report_df():
                 2.0,
                 1.0,
             ],
-            "Total fee for the week": [300.48, 300.48, 300.99, 901.25, 901.25, 600.25],
+            "Total fee for the week": [30048, 30048, 30099, 90125, 90125, 60025],
         }
     )
 
@@ -440,12 +458,12 @@ def expected_provider_report_total_fee_over_99999_99_df():
             ],
             "Service Code": [889804, 951175, 495644, 427757, 805554, 708195],
             "Fee to be paid": [
-                100.33000,
-                200.15000,
-                300.99000,
-                500.50000,
-                400.75000,
-                600.25000,
+                10033,
+                20015,
+                30099,
+                50050,
+                40075,
+                60025,
             ],
             "Total number of consultations with members": [
                 2.0,
@@ -456,12 +474,12 @@ def expected_provider_report_total_fee_over_99999_99_df():
                 1.0,
             ],
             "Total fee for the week": [
-                99999.99,
-                99999.99,
-                99999.99,
-                99999.99,
-                99999.99,
-                99999.99,
+                9999999,
+                9999999,
+                9999999,
+                9999999,
+                9999999,
+                9999999,
             ],
         }
     )
@@ -540,12 +558,12 @@ def expected_provider_report_total_consults_over_999_df():
             ],
             "Service Code": [889804, 951175, 495644, 427757, 805554, 708195],
             "Fee to be paid": [
-                100.33000,
-                200.15000,
-                300.99000,
-                500.50000,
-                400.75000,
-                600.25000,
+                10033,
+                20015,
+                30099,
+                50050,
+                40075,
+                60025,
             ],
             "Total number of consultations with members": [
                 999.000,
@@ -555,7 +573,7 @@ def expected_provider_report_total_consults_over_999_df():
                 999.000,
                 999.000,
             ],
-            "Total fee for the week": [300.48, 300.48, 300.99, 901.25, 901.25, 600.25],
+            "Total fee for the week": [30048, 30048, 30099, 90125, 90125, 60025],
         }
     )
 
@@ -565,11 +583,12 @@ def expected_output_for_member():
     """Fixture for the expected output."""
     current_date = datetime.now().strftime("%m-%d-%Y")
     return "".join(
-        [
-            f"Member Report saved to /path/to/report/John Doe_{current_date}.csv\n",
-            f"Member Report saved to /path/to/report/Bob Henderson_{current_date}.csv\n",
-            f"Member Report saved to /path/to/report/Alex Smith_{current_date}.csv\n",
-            f"Member Report saved to /path/to/report/Jane Doe_{current_date}.csv\n",
+        f"Member Report saved to /path/to/report/{name}_{current_date}.csv\n"
+        for name in [
+            "John Doe_137002632",
+            "Bob Henderson_367868907",
+            "Alex Smith_752880910",
+            "Jane Doe_989635272",
         ]
     )
 
@@ -588,23 +607,26 @@ def expected_output_for_provider():
     """Fixture for the expected output."""
     current_date = datetime.now().strftime("%m-%d-%Y")
     return "".join(
-        [
-            f"Provider Report saved to /path/to/report/Karla Tanners_{current_date}.csv\n",
-            f"Provider Report saved to /path/to/report/Case Hall_{current_date}.csv\n",
-            f"Provider Report saved to /path/to/report/Zelda Hammersmith_{current_date}.csv\n",
-            f"Provider Report saved to /path/to/report/Ray Donald_{current_date}.csv\n",
+        f"Provider Report saved to /path/to/report/{name}_{current_date}.csv\n"
+        for name in [
+            "Karla Tanners_483185890",
+            "Case Hall_940672921",
+            "Zelda Hammersmith_385685178",
+            "Ray Donald_637066975",
         ]
     )
 
 
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
 )
 def test_generate_member_report(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_save_report,
+    mock_save_reports,
     expected_member_report_df,
     expected_output_for_member,
     capsys,
@@ -622,8 +644,8 @@ def test_generate_member_report(
     assert actual_df.equals(expected_member_report_df)
 
 
-@patch("choc_an_simulator.report.load_records_from_file", return_value=pd.DataFrame())
-def test_generate_member_report_no_members(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", return_value=pa.table({}))
+def test_generate_member_report_no_members(mock_load_table, capsys):
     """
     Test the generate_member_report function with no members having had a service in the last
     7 days.
@@ -636,8 +658,8 @@ def test_generate_member_report_no_members(mock_load_records_from_file, capsys):
     assert captured.out == expected_output
 
 
-@patch("choc_an_simulator.report.load_records_from_file", side_effect=ArrowIOError)
-def test_generate_member_report_arrow_io_error(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", side_effect=ArrowIOError)
+def test_generate_member_report_arrow_io_error(mock_load_table, capsys):
     """Test the generate_member_report function with a KeyError."""
     expected = "\033[93mThere was an issue accessing the database.\n\tError: \x1b[0m\n"
     generate_member_report()
@@ -645,14 +667,40 @@ def test_generate_member_report_arrow_io_error(mock_load_records_from_file, caps
     assert captured.out == expected
 
 
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
+)
+def test_generate_reports_shared_names(
+    mock_load_table, mock_save_report, mock_save_reports, monkeypatch, capsys
+):
+    """Test that members or providers with the same name get separate report files."""
+    monkeypatch.setitem(
+        globals(), "test_member_info", test_member_info.assign(name="John Doe")
+    )
+    monkeypatch.setitem(
+        globals(), "test_user_info", test_user_info.assign(name="Case Hall")
+    )
+    generate_member_report()
+    generate_provider_report()
+
+    file_names = [call[0][1] for call in mock_save_report.call_args_list]
+    assert len(file_names) == 8
+    assert len(set(file_names)) == len(file_names)
+
+
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
+@patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
+@patch(
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
 )
 def test_generate_provider_report(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_save_report,
+    mock_save_reports,
     expected_provider_report_df,
     expected_output_for_provider,
     capsys,
@@ -672,16 +720,21 @@ def test_generate_provider_report(
     assert actual_df.equals(expected_provider_report_df)
 
 
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
+)
+@patch(
+    "choc_an_simulator.report.calculate_total_fee",
+    side_effect=lambda fee_sums: pa.array([99999999] * len(fee_sums)),
 )
-@patch("choc_an_simulator.report.calculate_total_fee", return_value=999999.00)
 def test_generate_provider_report_has_total_fees_over_99999_99(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_sum,
     mock_save_report,
+    mock_save_reports,
     expected_provider_report_total_fee_over_99999_99_df,
     expected_output_for_provider,
     capsys,
@@ -701,16 +754,21 @@ def test_generate_provider_report_has_total_fees_over_99999_99(
     assert actual_df.equals(expected_provider_report_total_fee_over_99999_99_df)
 
 
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
+)
+@patch(
+    "choc_an_simulator.report.calculate_num_of_consultations",
+    side_effect=lambda service_counts: pa.array([1000] * len(service_counts)),
 )
-@patch("choc_an_simulator.report.len", return_value=1000)
 def test_generate_provider_report_has_total_consults_over_999(
-    mock_load_records_from_file,
-    mock_len,
+    mock_load_table,
+    mock_calculate_num_of_consultations,
     mock_save_report,
+    mock_save_reports,
     expected_output_for_provider,
     expected_provider_report_total_consults_over_999_df,
     capsys,
@@ -730,8 +788,8 @@ def test_generate_provider_report_has_total_consults_over_999(
     assert actual_df.equals(expected_provider_report_total_consults_over_999_df)
 
 
-@patch("choc_an_simulator.report.load_records_from_file", return_value=pd.DataFrame())
-def test_generate_provider_report_no_providers(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", return_value=pa.table({}))
+def test_generate_provider_report_no_providers(mock_load_table, capsys):
     """
     Test the generate_member_report function with no members having had a service in the last
     7 days.
@@ -744,8 +802,8 @@ def test_generate_provider_report_no_providers(mock_load_records_from_file, caps
     assert captured.out == expected_output
 
 
-@patch("choc_an_simulator.report.load_records_from_file", side_effect=ArrowIOError)
-def test_generate_provider_report_arrow_io_error(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", side_effect=ArrowIOError)
+def test_generate_provider_report_arrow_io_error(mock_load_table, capsys):
     """Test the generate_member_report function with a KeyError."""
     expected = "\033[93mThere was an issue accessing the database.\n\tError: \x1b[0m\n"
     generate_provider_report()
@@ -755,11 +813,11 @@ def test_generate_provider_report_arrow_io_error(mock_load_records_from_file, ca
 
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
 )
 def test_generate_summary_report(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_save_report,
     expected_summary_report_df,
     expected_output_for_summary,
@@ -776,8 +834,8 @@ def test_generate_summary_report(
     assert_frame_equal(actual_df, expected_summary_report_df)
 
 
-@patch("choc_an_simulator.report.load_records_from_file", side_effect=ArrowIOError)
-def test_generate_summary_report_arrow_io_error(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", side_effect=ArrowIOError)
+def test_generate_summary_report_arrow_io_error(mock_load_table, capsys):
     """Test the generate_member_report function with a KeyError."""
     expected = "\033[93mThere was an issue accessing the database.\n\tError: \x1b[0m\n"
     generate_summary_report()
@@ -785,8 +843,8 @@ def test_generate_summary_report_arrow_io_error(mock_load_records_from_file, cap
     assert captured.out == expected
 
 
-@patch("choc_an_simulator.report.load_records_from_file", return_value=pd.DataFrame())
-def test_generate_summary_report_no_members(mock_load_records_from_file, capsys):
+@patch("choc_an_simulator.report.load_table", return_value=pa.table({}))
+def test_generate_summary_report_no_members(mock_load_table, capsys):
     """
     Test the generate_member_report function with no members having had a service in the last
     7 days.
@@ -800,13 +858,16 @@ def test_generate_summary_report_no_members(mock_load_records_from_file, capsys)
 
 
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
-@patch("choc_an_simulator.report.calculate_num_of_consultations", return_value=1000)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.calculate_num_of_consultations",
+    side_effect=lambda service_counts: pa.array([1000] * len(service_counts)),
+)
+@patch(
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
 )
 def test_generate_summary_report_provider_has_total_consults_over_999(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_calculate_num_of_consultations,
     mock_save_report,
     expected_summary_report_total_consults_over_999_df,
@@ -824,13 +885,16 @@ def test_generate_summary_report_provider_has_total_consults_over_999(
 
 
 @patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
-@patch("choc_an_simulator.report.calculate_total_fee", return_value=999999.99)
 @patch(
-    "choc_an_simulator.report.load_records_from_file",
-    side_effect=load_records_from_file_side_effect,
+    "choc_an_simulator.report.calculate_total_fee",
+    side_effect=lambda fee_sums: pa.array([99999999] * len(fee_sums)),
+)
+@patch(
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
 )
 def test_generate_summary_report_provider_has_total_fees_over_99999_99(
-    mock_load_records_from_file,
+    mock_load_table,
     mock_calculate_total_fee,
     mock_save_report,
     expected_summary_report_total_fee_over_99999_99_df,
@@ -846,3 +910,37 @@ def test_generate_summary_report_provider_has_total_fees_over_99999_99(
     actual_df = mock_save_report.call_args_list[0][0][0]
 
     assert_frame_equal(actual_df, expected_summary_report_total_fee_over_99999_99_df)
+
+
+@patch("choc_an_simulator.report.save_reports", side_effect=save_reports_side_effect)
+@patch("choc_an_simulator.report.save_report", side_effect=save_report_side_effect)
+@patch(
+    "choc_an_simulator.report.load_table",
+    side_effect=load_table_side_effect,
+)
+def test_generate_weekly_reports(
+    mock_load_table,
+    mock_save_report,
+    mock_save_reports,
+    expected_output_for_member,
+    expected_output_for_provider,
+    expected_output_for_summary,
+    expected_summary_report_df,
+    capsys,
+):
+    """Test that generate_weekly_reports loads each table once, and saves every report."""
+    generate_weekly_reports()
+    captured = capsys.readouterr().out
+
+    assert captured == (
+        expected_output_for_member
+        + expected_output_for_provider
+        + expected_output_for_summary
+    )
+    loaded_tables = [call[0][0].name for call in mock_load_table.call_args_list]
+    assert sorted(loaded_tables) == sorted(
+        ["service_log", "providers", "provider_directory", "members"]
+    )
+    assert_frame_equal(
+        mock_save_report.call_args_list[-1][0][0], expected_summary_report_df
+    )
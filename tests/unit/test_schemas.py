@@ -4,7 +4,14 @@ from typing import Dict
 import pytest
 import pandas as pd
 import pyarrow as pa
-from choc_an_simulator.schemas import TableInfo
+from choc_an_simulator.schemas import (
+    ParquetOptions,
+    TableInfo,
+    RecordLimitError,
+    RecordNullError,
+    RecordTypeError,
+    RecordValidationError,
+)
 
 
 @pytest.fixture()
@@ -73,6 +80,37 @@ class TestTableInfo:
         """Test the check_dataframe function."""
         assert test_info.index_col() == "number"
 
+    def test_select(self, test_info):
+        """Test selecting a subset of columns."""
+        selected = test_info.select(["text"])
+        assert selected.name == test_info.name
+        assert selected.schema.names == ["text"]
+        assert selected.character_limits == {"text": range(3, 10)}
+        assert selected.numeric_limits == {}
+        with pytest.raises(KeyError):
+            test_info.select(["missing_column"])
+
+    def test_parquet_options(self, test_schema):
+        """Test that Parquet options are checked against, and selected with, the schema."""
+        options = ParquetOptions(
+            sort_keys=("number", "text"),
+            dictionary_cols=("text",),
+            bloom_filter_cols=("number",),
+        )
+        test_info = TableInfo("test", test_schema, parquet_options=options)
+        assert test_info.parquet_options.columns() == ["number", "text"]
+        selected = test_info.select(["number"]).parquet_options
+        assert selected.sort_keys == ()
+        assert selected.dictionary_cols == ()
+        assert selected.bloom_filter_cols == ("number",)
+        assert test_info.select(["text", "number"]).parquet_options == options
+        with pytest.raises(KeyError):
+            TableInfo(
+                "test",
+                test_schema,
+                parquet_options=ParquetOptions(sort_keys=("missing column",)),
+            )
+
     @pytest.mark.parametrize(
         "columns,includes",
         [
@@ -134,6 +172,43 @@ class TestTableInfo:
         with pytest.raises(error_type):
             test_info.check_dataframe(dataframe)
 
+    def test_check_dataframe_reports_all_limit_violations(self, test_info):
+        """Test that every row outside its limits is reported in a single error."""
+        dataframe = pd.DataFrame(
+            {"number": [200, 199, 300, 60000], "text": ["abc", "abc", "12", "abc"]},
+            index=[10, 11, 12, 13],
+        )
+        with pytest.raises(RecordLimitError) as err_info:
+            test_info.check_dataframe(dataframe)
+        assert err_info.value.violations == {"number": [11, 13], "text": [12]}
+        assert err_info.value.rows == [11, 13, 12]
+
+    def test_check_dataframe_reports_all_type_violations(self, test_info):
+        """Test that every row with a wrong type is reported in a single error."""
+        dataframe = pd.DataFrame({"number": [200, "a", 300, "b"], "text": ["abc"] * 4})
+        with pytest.raises(RecordTypeError) as err_info:
+            test_info.check_dataframe(dataframe)
+        assert err_info.value.violations == {"number": [1, 3]}
+
+    def test_check_dataframe_reports_null_violations(self):
+        """Test that missing values in non-nullable columns are reported."""
+        test_info = TableInfo(
+            "test",
+            pa.schema(
+                [
+                    pa.field("member_id", pa.int64(), nullable=False),
+                    pa.field("comments", pa.string()),
+                ]
+            ),
+        )
+        dataframe = pd.DataFrame(
+            {"member_id": [100000001, float("nan"), None], "comments": [None] * 3}
+        )
+        with pytest.raises(RecordNullError) as err_info:
+            test_info.check_dataframe(dataframe)
+        assert isinstance(err_info.value, RecordValidationError)
+        assert err_info.value.violations == {"member_id": [1, 2]}
+
     def test_check_series_valid(self, test_info):
         """Test a successful call to check_series()."""
         test_info.check_series(pd.Series({"number": 200, "text": "abc"}))